@@ -0,0 +1,702 @@
+import sys
+import time
+import tracemalloc
+import random
+import asyncio
+import io
+import os
+import tempfile
+import subprocess
+import statistics
+from anytree import PreOrderIter
+import pandas as pd
+from dialogengine import DialogEngine
+from buildcache import BuildCache
+from flowanalysis import DialogFlowAnalyzer
+from entrypath import EntryPathTable
+from flowrender import DialogFlowRenderer
+from hotreload import VersionedForestHolder
+from snapshotstore import SnapshotStore
+from parallelbuild import parallelBuild
+from instrumentation import PipelineInstrumentationSingleton, InMemorySink
+from tablestream import RowChunkStream, ingestRowStream
+from forestsnapshot import writeForestSnapshot, ForestSnapshot
+from dialogserving import DialogSessionServer, DialogTurn
+from syntheticsheet import faq_header, generateSyntheticFaqTable, _syntheticCaseId
+from chatdialogflow import DialogFlowForest, InputTableValidator, faq_column, root_reserved_case_id, isBlank, ParsedInputTable, WorkspaceCaseId, ButtonCaseIdListNode, ClonedDialogTree, DialogFlowDiffEngine, RowChangeSet, NodeToDrlRulePrinterSingleton, _extractInputColumns
+
+###############################################################################
+# Benchmarks for the dialog flow pipeline on synthetic FAQ sheets
+#
+# usage: python3 benchmark.py [benchmark name ...]
+
+###############################################################################
+# Row by row reference implementation, this is how the pre-scan and build passes used to read the table
+
+def _legacyIterrowsScan(df):
+    rowCount = 0
+    for index, row in df.iterrows():
+        workspace = row.iloc[faq_column.get("WORKSPACE")-1]
+        caseId = row.iloc[faq_column.get("CASE_ID")-1]
+        jumpToCase = row.iloc[faq_column.get("JUMP_TO_CASE")-1]
+        for columnStr in ["RESPONSE_ID_LIST", "ACTION_BUTTON_ID_LIST", "PROCEDURE_ADVISORY_ID_LIST", "BUTTON_CASE_ID_LIST"]:
+            label = row.iloc[faq_column.get(columnStr)-1]
+            if isBlank(label) == False:
+                idList = [item.strip() for item in label.split(",")]
+        rowCount = rowCount + 1
+    return rowCount
+
+def _timeIt(function, *args):
+    startTime = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - startTime
+
+def _preScan(df):
+    InputTableValidator().preScanPass(df)
+
+def _compileEachPassParsing(df):
+    validator = InputTableValidator()
+    validator.preScanPass(df)
+    validator.validationPass(df)
+    DialogFlowForest().buildForrestFromInputTable(df)
+
+def _compileSharedParse(df):
+    parsedTable = ParsedInputTable.fromDataFrame(df)
+    validator = InputTableValidator()
+    validator.preScanPass(parsedTable)
+    validator.validationPass(parsedTable)
+    DialogFlowForest().buildForrestFromInputTable(parsedTable)
+
+# The linear scan the button linking used to do for every child, kept as a reference for the scaling benchmark
+def _legacyLinearScanLink(forest, workspace):
+    nodeSet = set(forest.getNodeDict(workspace).values())
+    for node in nodeSet:
+        if isinstance(node, ButtonCaseIdListNode):
+            for buttonCaseId in node.getButtonCaseIdList():
+                for candidate in nodeSet:
+                    if candidate.name == str(WorkspaceCaseId(workspace, buttonCaseId)):
+                        break
+
+###############################################################################
+# Benchmarks
+
+def benchIngestion(fileStream):
+    print("# ingestion: rows/sec, iterrows() scan (before) vs columnar extraction and columnar pre-scan (after)", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 1000), (80, 1000)]:
+        df = generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace)
+        rowCount = len(df)
+
+        # the old pre-scan and build passes each did a full iterrows() scan before doing any of their own work
+        legacySeconds = _timeIt(_legacyIterrowsScan, df)
+        extractSeconds = _timeIt(_extractInputColumns, df)
+        preScanSeconds = _timeIt(_preScan, df)
+
+        print("rows=%d iterrows_scan=%.0f rows/s columnar_extract=%.0f rows/s pre_scan=%.0f rows/s" %
+              (rowCount, rowCount / legacySeconds, rowCount / extractSeconds, rowCount / preScanSeconds), file=fileStream)
+
+def benchSharedParse(fileStream):
+    print("# shared parse: validate + build seconds, data frame parsed by each pass vs parsed once", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(20, 500), (80, 500)]:
+        df = generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace)
+
+        eachPassSeconds = _timeIt(_compileEachPassParsing, df)
+        sharedSeconds = _timeIt(_compileSharedParse, df)
+
+        print("rows=%d each_pass_parse=%.3fs shared_parse=%.3fs" % (len(df), eachPassSeconds, sharedSeconds), file=fileStream)
+
+def benchNodeLookup(fileStream):
+    print("# node lookup: build (parse excluded) at 1k/10k/100k nodes, hash-indexed linking vs legacy linear scan", file=fileStream)
+    for nodeCount in [1000, 10000, 100000]:
+        parsedTable = ParsedInputTable.fromDataFrame(generateSyntheticFaqTable(1, nodeCount))
+
+        forest = DialogFlowForest()
+        buildSeconds = _timeIt(forest.buildForrestFromInputTable, parsedTable)
+        line = "nodes=%d build=%.3fs (%.2f us/node)" % (nodeCount, buildSeconds, buildSeconds * 1e6 / nodeCount)
+
+        # the quadratic reference becomes impractical past 10k nodes
+        if nodeCount <= 10000:
+            line = line + " legacy_linear_scan_link=%.3fs" % _timeIt(_legacyLinearScanLink, forest, "WS_0")
+        print(line, file=fileStream)
+
+def benchNodeMemory(fileStream):
+    print("# node memory: traced bytes per node retained by a built forest once the parsed table is released", file=fileStream)
+    for nodeCount in [10000, 100000]:
+        df = generateSyntheticFaqTable(10, nodeCount // 10)
+
+        tracemalloc.start()
+        startBytes = tracemalloc.get_traced_memory()[0]
+        parsedTable = ParsedInputTable.fromDataFrame(df)
+        forest = DialogFlowForest()
+        forest.buildForrestFromInputTable(parsedTable)
+        del parsedTable
+        forestBytes = tracemalloc.get_traced_memory()[0] - startBytes
+        tracemalloc.stop()
+
+        print("nodes=%d forest=%d bytes (%.0f bytes/node)" % (nodeCount, forestBytes, forestBytes / nodeCount), file=fileStream)
+
+def _buildForest(workspaceCount: int, rowsPerWorkspace: int, fanOut: int = 4):
+    forest = DialogFlowForest()
+    forest.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace, fanOut)))
+    return forest
+
+def benchClone(fileStream):
+    print("# clone: ClonedDialogTree snapshot seconds, full copy vs structure sharing", file=fileStream)
+    # fanOut 1 makes a single chain, far deeper than the default recursion limit
+    for nodeCount, fanOut in [(5000, 1), (50000, 4)]:
+        root = _buildForest(1, nodeCount, fanOut).getTreeRootsList()[0]
+
+        copySeconds = _timeIt(ClonedDialogTree, root)
+        shareSeconds = _timeIt(ClonedDialogTree, root, True)
+
+        print("nodes=%d fan_out=%d copy=%.3fs share_structure=%.6fs" % (nodeCount, fanOut, copySeconds, shareSeconds), file=fileStream)
+
+def _cloneAndMarkDelta(forest1, forest2):
+    for root1, root2 in zip(forest1.getTreeRootsList(), forest2.getTreeRootsList()):
+        clonedTree1 = ClonedDialogTree(root1)
+        clonedTree2 = ClonedDialogTree(root2)
+        clonedTree1.markMyDelta(clonedTree2)
+        clonedTree2.markMyDelta(clonedTree1)
+
+def benchDiff(fileStream):
+    print("# diff: two 50k-node snapshots, 10 edited rows in one workspace", file=fileStream)
+    df1 = generateSyntheticFaqTable(10, 5000)
+    df2 = df1.copy()
+    for index in range(100, 1100, 100):
+        df2.iloc[index, faq_column.get("RESPONSE_ID_LIST")-1] = "RESPONSE_EDITED_" + str(index)
+
+    forest1 = DialogFlowForest()
+    forest1.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(df1))
+    forest2 = DialogFlowForest()
+    forest2.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(df2))
+
+    diffEngine = DialogFlowDiffEngine()
+    delta = None
+    startTime = time.perf_counter()
+    delta = diffEngine.diff(forest1, forest2)
+    firstSeconds = time.perf_counter() - startTime
+    # subtree hashes are cached on each snapshot, later diffs only walk the changed paths
+    cachedSeconds = _timeIt(diffEngine.diff, forest1, forest2)
+    legacySeconds = _timeIt(_cloneAndMarkDelta, forest1, forest2)
+
+    print("changed=%d hash_and_diff=%.3fs diff_cached_hashes=%.4fs clone_and_mark_both_ways=%.3fs" %
+          (len(delta.getChangedDict()), firstSeconds, cachedSeconds, legacySeconds), file=fileStream)
+
+def _validateAndBuild(parsedTable):
+    validator = InputTableValidator()
+    validator.preScanPass(parsedTable)
+    validator.validationPass(parsedTable)
+    forest = DialogFlowForest()
+    forest.buildForrestFromInputTable(parsedTable)
+    return validator, forest
+
+def benchIncremental(fileStream):
+    print("# incremental: save-to-preview seconds after editing rows of an 80k-row sheet (parse excluded)", file=fileStream)
+    df1 = generateSyntheticFaqTable(80, 1000)
+    for editCount in [1, 10, 100]:
+        df2 = df1.copy()
+        for index in range(0, editCount * 700, 700):
+            df2.iloc[index, faq_column.get("RESPONSE_ID_LIST")-1] = "RESPONSE_EDITED_" + str(index)
+        parsedTable1 = ParsedInputTable.fromDataFrame(df1)
+        parsedTable2 = ParsedInputTable.fromDataFrame(df2)
+        validator, forest = _validateAndBuild(parsedTable1)
+        # row hashes of the previous version are computed when it is first loaded
+        parsedTable1.getRowHashDict()
+
+        fullSeconds = _timeIt(_validateAndBuild, parsedTable2)
+        startTime = time.perf_counter()
+        changeSet = RowChangeSet.fromTables(parsedTable1, parsedTable2)
+        detectSeconds = time.perf_counter() - startTime
+        startTime = time.perf_counter()
+        validator.applyChangeSet(parsedTable2, changeSet)
+        forest.applyChangeSet(changeSet)
+        applySeconds = time.perf_counter() - startTime
+
+        print("edited_rows=%d full_rebuild=%.3fs detect_changes=%.3fs apply_changes=%.4fs" % (editCount, fullSeconds, detectSeconds, applySeconds), file=fileStream)
+
+# (context, button) turns of random conversations, every conversation starts at a workspace root
+def _randomTurnList(forest, dialogEngine, turnCount: int, seed: int = 7):
+    randomGenerator = random.Random(seed)
+    workspaceList = list(forest.getGraph().getRootDict().keys())
+    turnList = list()
+    action = dialogEngine.start(randomGenerator.choice(workspaceList))
+    while len(turnList) < turnCount:
+        buttonCaseIdList = action.buttonCaseIdList
+        if len(buttonCaseIdList) == 0:
+            action = dialogEngine.start(randomGenerator.choice(workspaceList))
+            continue
+        buttonCaseId = randomGenerator.choice(buttonCaseIdList)
+        turnList.append((action.nextWorkspaceCaseId, buttonCaseId))
+        action = dialogEngine.executeTurn(action.nextWorkspaceCaseId, buttonCaseId)
+    return turnList
+
+def _runTurns(dialogEngine, turnList):
+    for currentWorkspaceCaseId, buttonCaseId in turnList:
+        dialogEngine.executeTurn(currentWorkspaceCaseId, buttonCaseId)
+
+def benchEngine(fileStream):
+    print("# engine: compile seconds and turns/sec of the in-process dialog engine", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 1000), (80, 1000)]:
+        forest = _buildForest(workspaceCount, rowsPerWorkspace)
+        startTime = time.perf_counter()
+        dialogEngine = DialogEngine(forest)
+        compileSeconds = time.perf_counter() - startTime
+
+        turnList = _randomTurnList(forest, dialogEngine, 200000)
+        turnSeconds = _timeIt(_runTurns, dialogEngine, turnList)
+
+        print("nodes=%d compile=%.3fs turns=%d %.0f turns/s" % (workspaceCount * rowsPerWorkspace, compileSeconds, len(turnList), len(turnList) / turnSeconds), file=fileStream)
+
+# one simulated user: start, then follow random buttons, restart when a leaf is reached
+async def _sessionLoad(server, sessionId, workspaceList, turnCount, randomGenerator, latencyList):
+    action = (await server.startSessionBatch([(sessionId, randomGenerator.choice(workspaceList))]))[0].action
+    for turnIndex in range(turnCount):
+        if len(action.buttonCaseIdList) == 0:
+            action = (await server.startSessionBatch([(sessionId, randomGenerator.choice(workspaceList))]))[0].action
+        startTime = time.perf_counter()
+        result = await server.submitTurn(DialogTurn(sessionId, None, randomGenerator.choice(action.buttonCaseIdList)))
+        latencyList.append(time.perf_counter() - startTime)
+        action = result.action
+
+async def _serveLoad(dialogEngine, workspaceList, sessionCount, turnsPerSession):
+    server = DialogSessionServer(dialogEngine)
+    server.start()
+    randomGenerator = random.Random(7)
+    latencyList = []
+    startTime = time.perf_counter()
+    await asyncio.gather(*[_sessionLoad(server, "session_" + str(index), workspaceList, turnsPerSession, randomGenerator, latencyList)
+                           for index in range(sessionCount)])
+    seconds = time.perf_counter() - startTime
+    await server.stop()
+    return latencyList, seconds
+
+def benchServing(fileStream):
+    print("# serving: concurrent sessions on the batched async server, turn latency and throughput", file=fileStream)
+    forest = _buildForest(10, 1000)
+    dialogEngine = DialogEngine(forest)
+    workspaceList = list(forest.getGraph().getRootDict().keys())
+    for sessionCount in [1000, 10000]:
+        latencyList, seconds = asyncio.run(_serveLoad(dialogEngine, workspaceList, sessionCount, 20))
+        latencyList.sort()
+        print("sessions=%d turns=%d p50=%.3fms p99=%.3fms %.0f turns/s" % (sessionCount, len(latencyList),
+                                                                         latencyList[len(latencyList) // 2] * 1000,
+                                                                         latencyList[len(latencyList) * 99 // 100] * 1000,
+                                                                         len(latencyList) / seconds), file=fileStream)
+
+# print() per line and a rule per PreOrderIter visit of the projected trees, as process_faq.py used to do
+def _legacyPrintDrl(forest, fileStream):
+    printer = NodeToDrlRulePrinterSingleton()
+    printer.printHeader(fileStream)
+    for root in forest.getTreeRootsList():
+        for node in PreOrderIter(root):
+            print("# " + str(node), file=fileStream)
+            print("rule \"" + node.name + "\"", file=fileStream)
+            print("when", file=fileStream)
+            print("    $dialog: Dialog(current_case_id == " + node.getWorkspaceCaseId().getCaseId() + ")", file=fileStream)
+            print("then", file=fileStream)
+            if isinstance(node, ButtonCaseIdListNode):
+                print("    $dialog.getOutput().setButtons(RuleUtil.setButtons(" + str(list(node.getButtonCaseIdList())) + "))", file=fileStream)
+            if len(node.getRespondIdList()) > 0:
+                print("    $dialog.responds(" + node.getRespondIdList()[0] +")", file=fileStream)
+            print("end", file=fileStream)
+            print("##############", file=fileStream)
+
+def _bufferedDrl(forest, fileStream):
+    for workspace in forest.getGraph().getRootDict().keys():
+        NodeToDrlRulePrinterSingleton().printWorkspace(forest, workspace, fileStream)
+
+def benchDrl(fileStream):
+    print("# drl: rule generation, per line print() vs buffered templates vs per workspace files in a process pool", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 1000), (80, 1000)]:
+        forest = _buildForest(workspaceCount, rowsPerWorkspace)
+        # project the anytree trees up front, only the emission is timed
+        forest.getTreeRootsList()
+        legacySeconds = _timeIt(_legacyPrintDrl, forest, io.StringIO())
+        bufferedSeconds = _timeIt(_bufferedDrl, forest, io.StringIO())
+        with tempfile.TemporaryDirectory() as outputDirectory:
+            serialSeconds = _timeIt(NodeToDrlRulePrinterSingleton().generateDrlFiles, forest, outputDirectory)
+            parallelSeconds = _timeIt(NodeToDrlRulePrinterSingleton().generateDrlFiles, forest, outputDirectory, os.cpu_count())
+        print("nodes=%d legacy_print=%.3fs buffered=%.3fs files_serial=%.3fs files_parallel(%d)=%.3fs" % (workspaceCount * rowsPerWorkspace, legacySeconds, bufferedSeconds,
+                                                                                                       serialSeconds, os.cpu_count(), parallelSeconds), file=fileStream)
+
+def benchBuildCache(fileStream):
+    print("# buildcache: cold build, warm build of the unchanged file, rebuild after editing one workspace", file=fileStream)
+    workspaceCount, rowsPerWorkspace = 100, 200
+    df = generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace)
+    with tempfile.TemporaryDirectory() as workDirectory:
+        csvFilePath = os.path.join(workDirectory, "faq.csv")
+        df.to_csv(csvFilePath, index=False)
+        buildCache = BuildCache(os.path.join(workDirectory, "cache"))
+
+        coldSeconds = _timeIt(buildCache.buildFromFile, csvFilePath, pd.read_csv)
+        warmSeconds = _timeIt(buildCache.buildFromFile, csvFilePath, pd.read_csv)
+
+        editedDf = df.copy()
+        editedDf.iloc[0, faq_column.get("RESPONSE_ID_LIST") - 1] = "RESPONSE_EDITED"
+        editedDf.to_csv(csvFilePath, index=False)
+        editSeconds = _timeIt(buildCache.buildFromFile, csvFilePath, pd.read_csv)
+
+        # a new workspace on top moves every other workspace down the sheet, they are still hits
+        insertedRow = [None] * len(faq_header)
+        insertedRow[faq_column.get("WORKSPACE")-1] = "WS_NEW"
+        insertedRow[faq_column.get("CASE_ID")-1] = root_reserved_case_id
+        insertedRow[faq_column.get("RESPONSE_ID_LIST")-1] = "RESPONSE_NEW"
+        pd.concat([pd.DataFrame([insertedRow], columns=faq_header), editedDf]).to_csv(csvFilePath, index=False)
+        insertSeconds = _timeIt(buildCache.buildFromFile, csvFilePath, pd.read_csv)
+        insertedResult = buildCache.buildFromFile(csvFilePath, pd.read_csv)
+        forestSeconds = _timeIt(insertedResult.getForest)
+
+    print("workspaces=%d rows=%d cold=%.3fs warm=%.4fs one_workspace_edited=%.3fs row_inserted_on_top=%.3fs warm_forest_from_snapshots=%.3fs" %
+          (workspaceCount, len(df), coldSeconds, warmSeconds, editSeconds, insertSeconds, forestSeconds), file=fileStream)
+
+def _parseAndBuild(df):
+    forest = DialogFlowForest()
+    forest.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(df))
+    return forest
+
+def _openSnapshotAndLookUp(snapshotFilePath, workspaceCaseIdList):
+    with ForestSnapshot(snapshotFilePath) as snapshot:
+        for workspaceCaseId in workspaceCaseIdList:
+            snapshot.getNode(workspaceCaseId)
+            snapshot.getChildren(workspaceCaseId)
+
+def _openSnapshotToForest(snapshotFilePath):
+    with ForestSnapshot(snapshotFilePath) as snapshot:
+        return snapshot.toForest()
+
+def benchSnapshot(fileStream):
+    print("# snapshot: startup from a data frame vs mmap snapshot (1000 lookups) vs full forest out of the snapshot", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 1000), (80, 1000)]:
+        df = generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace)
+        forest = _parseAndBuild(df)
+        workspaceCaseIdList = random.Random(7).sample([node.getWorkspaceCaseId() for node in forest.getGraph().iterNodes()], 1000)
+        with tempfile.TemporaryDirectory() as snapshotDirectory:
+            snapshotFilePath = os.path.join(snapshotDirectory, "forest.dfsnap")
+            writeSeconds = _timeIt(writeForestSnapshot, forest, snapshotFilePath)
+            buildSeconds = _timeIt(_parseAndBuild, df)
+            lookUpSeconds = _timeIt(_openSnapshotAndLookUp, snapshotFilePath, workspaceCaseIdList)
+            toForestSeconds = _timeIt(_openSnapshotToForest, snapshotFilePath)
+            print("nodes=%d snapshot_bytes=%d write=%.3fs parse_and_build=%.3fs mmap_open_1000_lookups=%.4fs to_forest=%.3fs" % (workspaceCount * rowsPerWorkspace, os.path.getsize(snapshotFilePath),
+                                                                                                                                 writeSeconds, buildSeconds, lookUpSeconds, toForestSeconds), file=fileStream)
+
+def _wholeTableIngest(csvFilePath):
+    parsedTable = ParsedInputTable.fromDataFrame(pd.read_csv(csvFilePath, dtype=str))
+    validator = InputTableValidator()
+    validator.preScanPass(parsedTable)
+    validator.validationPass()
+    forest = DialogFlowForest()
+    forest.buildForrestFromInputTable(parsedTable)
+    return forest
+
+def _streamIngest(csvFilePath):
+    validator = InputTableValidator()
+    forest = DialogFlowForest()
+    ingestRowStream(RowChunkStream.fromCsv(csvFilePath), validator, forest)
+    return forest
+
+# traced peak bytes and bytes still held by the result
+def _tracePeak(function, *args):
+    tracemalloc.start()
+    result = function(*args)
+    retainedBytes, peakBytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peakBytes, retainedBytes
+
+def benchStreaming(fileStream):
+    print("# streaming: peak traced memory of whole table vs chunked CSV ingestion (validation + build)", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 2000), (40, 2000)]:
+        with tempfile.TemporaryDirectory() as workDirectory:
+            csvFilePath = os.path.join(workDirectory, "faq.csv")
+            generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace).to_csv(csvFilePath, index=False)
+            wholePeakBytes, forestBytes = _tracePeak(_wholeTableIngest, csvFilePath)
+            streamPeakBytes, streamForestBytes = _tracePeak(_streamIngest, csvFilePath)
+            wholeSeconds = _timeIt(_wholeTableIngest, csvFilePath)
+            streamSeconds = _timeIt(_streamIngest, csvFilePath)
+        print("rows=%d forest=%.1fMB whole_table_peak=%.1fMB (%.2fs) streaming_peak=%.1fMB (%.2fs)" % (workspaceCount * rowsPerWorkspace, forestBytes / 1e6,
+                                                                                                      wholePeakBytes / 1e6, wholeSeconds, streamPeakBytes / 1e6, streamSeconds), file=fileStream)
+
+def benchParallelBuild(fileStream):
+    print("# parallel: serial validation + build vs workspace sharded build in a process pool", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(80, 1000)]:
+        parsedTable = ParsedInputTable.fromDataFrame(generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace))
+        serialSeconds = _timeIt(_validateAndBuild, parsedTable)
+        line = "rows=%d serial=%.3fs" % (len(parsedTable), serialSeconds)
+        for processCount in sorted({1, 2, 4, os.cpu_count()}):
+            line = line + " processes(%d)=%.3fs" % (processCount, _timeIt(parallelBuild, parsedTable, processCount))
+        print(line + " cores=%d" % os.cpu_count(), file=fileStream)
+
+def _validate(parsedTable, maxErrorCount = None):
+    validator = InputTableValidator(maxErrorCount)
+    validator.preScanPass(parsedTable)
+    validator.validationPass()
+    return validator
+
+def benchValidation(fileStream):
+    print("# validation: pre-scan + validation of a clean sheet, of a sheet with a broken reference on every menu, and fail-fast at 10 errors", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(80, 1000), (400, 1000)]:
+        parsedTable = ParsedInputTable.fromDataFrame(generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace))
+        brokenTable = ParsedInputTable([row._replace(buttonCaseIdList=row.buttonCaseIdList + ["MISSING_CASE"]) if len(row.buttonCaseIdList) > 0 else row
+                                        for row in parsedTable])
+        cleanSeconds = _timeIt(_validate, parsedTable)
+        brokenSeconds = _timeIt(_validate, brokenTable)
+        failFastSeconds = _timeIt(_validate, brokenTable, 10)
+        issueCount = len(_validate(brokenTable).getIssueSet())
+        print("rows=%d clean=%.3fs broken=%.3fs (%d issues) fail_fast_10=%.4fs" % (len(parsedTable), cleanSeconds, brokenSeconds, issueCount, failFastSeconds), file=fileStream)
+
+def benchAnalysis(fileStream):
+    print("# analysis: reachability, SCC and depth/fan-out statistics over the whole forest", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 1000), (80, 1000)]:
+        forest = _buildForest(workspaceCount, rowsPerWorkspace)
+        analysisSeconds = _timeIt(DialogFlowAnalyzer().analyze, forest)
+        print("nodes=%d analyze=%.3fs (%.1f us/node)" % (workspaceCount * rowsPerWorkspace, analysisSeconds, analysisSeconds * 1e6 / (workspaceCount * rowsPerWorkspace)), file=fileStream)
+
+def benchInstrumentation(fileStream):
+    print("# instrumentation: validate + build with no sink, with an in-memory sink, and with memory capture on", file=fileStream)
+    instrumentation = PipelineInstrumentationSingleton()
+    for workspaceCount, rowsPerWorkspace in [(80, 1000)]:
+        parsedTable = ParsedInputTable.fromDataFrame(generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace))
+        offSeconds = _timeIt(_validateAndBuild, parsedTable)
+        memorySink = instrumentation.addSink(InMemorySink())
+        sinkSeconds = _timeIt(_validateAndBuild, parsedTable)
+        instrumentation.setCaptureMemory(True)
+        memorySink.clear()
+        memorySeconds = _timeIt(_validateAndBuild, parsedTable)
+        instrumentation.setCaptureMemory(False)
+        instrumentation.removeSink(memorySink)
+        print("rows=%d off=%.3fs sink=%.3fs (%d records) memory=%.3fs" % (len(parsedTable), offSeconds, sinkSeconds, len(memorySink.getRecordList()), memorySeconds), file=fileStream)
+        for stage, (wallSeconds, itemCount, peakBytes) in memorySink.getStageSummary().items():
+            print("    %-18s %.3fs %d items peak %.1fMB" % (stage, wallSeconds, itemCount, peakBytes / 1e6), file=fileStream)
+
+class _CountingStream(io.TextIOBase):
+    _charCount = 0
+
+    def __init__(self):
+        self._charCount = 0
+
+    def write(self, text):
+        self._charCount += len(text)
+        return len(text)
+
+    def getCharCount(self):
+        return self._charCount
+
+def _printAnytreeMermaid(forest):
+    forest.printMermaid(_CountingStream())
+
+def _streamMermaid(forest, maxDepth = None):
+    DialogFlowRenderer(forest).printMermaid(_CountingStream(), maxDepth=maxDepth)
+
+def benchRender(fileStream):
+    print("# render: anytree Mermaid of every root (with projection) vs streaming from the graph (whole forest, depth 3), and the delta view of 10 edited rows", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 5000)]:
+        df1 = generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace)
+        df2 = df1.copy()
+        for index in range(100, 1100, 100):
+            df2.iloc[index, faq_column.get("RESPONSE_ID_LIST")-1] = "RESPONSE_EDITED_" + str(index)
+        forest1 = DialogFlowForest()
+        forest1.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(df1))
+        forest2 = DialogFlowForest()
+        forest2.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(df2))
+
+        # the first anytree print includes projecting the forest, a separate forest so the peak includes it too
+        anytreeSeconds = _timeIt(_printAnytreeMermaid, forest1)
+        peakForest = DialogFlowForest()
+        peakForest.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(df1))
+        anytreePeak = _tracePeak(_printAnytreeMermaid, peakForest)[0]
+        streamSeconds = _timeIt(_streamMermaid, forest1)
+        streamPeak = _tracePeak(_streamMermaid, forest1)[0]
+        depthSeconds = _timeIt(_streamMermaid, forest1, 3)
+
+        renderer = DialogFlowRenderer(forest2)
+        delta = DialogFlowDiffEngine().diff(forest1, forest2)
+        deltaStream = _CountingStream()
+        deltaSeconds = _timeIt(renderer.printDeltaMermaid, deltaStream, delta)
+        print("nodes=%d anytree=%.3fs (peak %.1fMB) stream=%.3fs (peak %.1fMB) depth_3=%.4fs delta=%.4fs (%d nodes, %d chars)" %
+              (workspaceCount * rowsPerWorkspace, anytreeSeconds, anytreePeak / 1e6, streamSeconds, streamPeak / 1e6, depthSeconds, deltaSeconds,
+               len(renderer.getDeltaIncludeSet(delta)), deltaStream.getCharCount()), file=fileStream)
+
+# Fresh interpreter importing moduleList, prints import seconds, peak RSS in KB and whether pandas got loaded.
+# The peak is VmHWM of the new process, ru_maxrss would keep the high water mark of the forking parent.
+import_time_code = """
+import sys, time
+startTime = time.perf_counter()
+for module in sys.argv[1:]:
+    __import__(module)
+seconds = time.perf_counter() - startTime
+with open("/proc/self/status") as statusFile:
+    maxRssKb = [line.split()[1] for line in statusFile if line.startswith("VmHWM:")][0]
+print(seconds, maxRssKb, "pandas" in sys.modules)
+"""
+
+def _importTime(moduleList: list, runCount: int = 5):
+    resultList = []
+    for run in range(runCount):
+        completedProcess = subprocess.run([sys.executable, "-c", import_time_code] + moduleList, capture_output=True, text=True, check=True,
+                                          cwd=os.path.dirname(os.path.abspath(__file__)))
+        seconds, maxRssKb, pandasLoaded = completedProcess.stdout.split()
+        resultList.append((float(seconds), int(maxRssKb), pandasLoaded == "True"))
+    return statistics.median([result[0] for result in resultList]), max([result[1] for result in resultList]), resultList[0][2]
+
+def benchImportTime(fileStream):
+    print("# importtime: median import seconds and peak RSS of a fresh interpreter, runtime modules against build modules", file=fileStream)
+    for moduleList in [["chatdialogflow"], ["dialogengine", "forestsnapshot"], ["dialogserving"], ["tablestream"], ["buildcache", "parallelbuild"]]:
+        seconds, maxRssKb, pandasLoaded = _importTime(moduleList)
+        print("%-32s %.3fs rss=%.1fMB pandas=%s" % ("+".join(moduleList), seconds, maxRssKb / 1024, pandasLoaded), file=fileStream)
+
+# turns per second on whatever engine the holder serves, for secondCount seconds
+def _serveTurns(holder, turnList, secondCount: float):
+    turnCount = 0
+    endTime = time.perf_counter() + secondCount
+    while time.perf_counter() < endTime:
+        dialogEngine = holder.getDialogEngine()
+        for currentWorkspaceCaseId, buttonCaseId in turnList:
+            dialogEngine.executeTurn(currentWorkspaceCaseId, buttonCaseId)
+        turnCount += len(turnList)
+    return turnCount / secondCount
+
+def benchHotReload(fileStream):
+    print("# hotreload: background reload of a sheet with one workspace less, swap latency, memory of two resident versions, turns/s while building", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(10, 1000), (80, 1000)]:
+        parsedTable = ParsedInputTable.fromDataFrame(generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace))
+        nextParsedTable = ParsedInputTable([row for row in parsedTable if row.workspace != "WS_0"])
+
+        tracemalloc.start()
+        holder = VersionedForestHolder(parsedTable)
+        oneVersionBytes = tracemalloc.get_traced_memory()[0]
+        # a reader still holding version 1 keeps it resident next to version 2
+        firstVersion = holder.getCurrent()
+        tracemalloc.reset_peak()
+        reloadResult = holder.reload(nextParsedTable)
+        twoVersionBytes, reloadPeakBytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del firstVersion
+
+        turnList = _randomTurnList(holder.getCurrent().getForest(), holder.getDialogEngine(), 1000)
+        idleTurnRate = _serveTurns(holder, turnList, 0.5)
+        holder.reloadInBackground(parsedTable)
+        reloadingTurnRate = _serveTurns(holder, turnList, 0.5)
+        holder.waitForReload()
+
+        print("rows=%d build=%.3fs swap=%.1fus remapped_or_drained=%d one_version=%.1fMB two_versions=%.1fMB reload_peak=%.1fMB turns/s idle=%.0f during_reload=%.0f" %
+              (len(parsedTable), reloadResult.buildSeconds, reloadResult.swapSeconds * 1e6, len(reloadResult.remapDict), oneVersionBytes / 1e6,
+               twoVersionBytes / 1e6, reloadPeakBytes / 1e6, idleTurnRate, reloadingTurnRate), file=fileStream)
+
+def benchSnapshotStore(fileStream):
+    print("# snapshotstore: 10 releases with 5 edited rows each, bytes added per release and diff of the first and last release from the store", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(20, 1000)]:
+        randomGenerator = random.Random(7)
+        df = generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace)
+        with tempfile.TemporaryDirectory() as storeDirectory:
+            store = SnapshotStore(storeDirectory)
+            byteCountList = []
+            firstForest = None
+            for release in range(10):
+                if release > 0:
+                    df = df.copy()
+                    for rowIndex in randomGenerator.sample(range(len(df)), 5):
+                        df.iloc[rowIndex, faq_column.get("RESPONSE_ID_LIST")-1] = "RESPONSE_RELEASE_" + str(release) + "_" + str(rowIndex)
+                forest = DialogFlowForest()
+                forest.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(df))
+                if firstForest == None:
+                    firstForest = forest
+                byteCount = store.getStoredByteCount()
+                commitSeconds = _timeIt(store.commit, forest)
+                byteCountList.append(store.getStoredByteCount() - byteCount)
+
+            storedDiffSeconds = _timeIt(store.diff, 1, store.getVersionCount())
+            oldVersionGraph = store.getVersionGraph(1)
+            DialogFlowDiffEngine().diff(oldVersionGraph, store.getVersionGraph(store.getVersionCount()))
+            forestDiffSeconds = _timeIt(DialogFlowDiffEngine().diff, firstForest, forest)
+            print("rows=%d first_release=%.1fKB later_releases_avg=%.1fKB total=%.1fKB commit=%.3fs stored_diff=%.4fs (%d touched, %d of %d workspaces unpacked) forest_diff=%.3fs" %
+                  (len(df), byteCountList[0] / 1e3, sum(byteCountList[1:]) / len(byteCountList[1:]) / 1e3, store.getStoredByteCount() / 1e3, commitSeconds,
+                   storedDiffSeconds, len(store.diff(1, store.getVersionCount()).getTouchedSet()),
+                   len(oldVersionGraph.getUnpackedWorkspaceList()), len(oldVersionGraph.getWorkspaceList()), forestDiffSeconds), file=fileStream)
+
+# the question "which nodes use this response ID" as it was answered before the reverse indexes
+def _scanResponseId(forest, responseId):
+    return [node.getWorkspaceCaseId() for root in forest.getTreeRootsList() for node in PreOrderIter(root)
+            if responseId in node.getRespondIdList()]
+
+def _lookUpIndexes(forest, questionList):
+    for responseId, actionButtonId, procedureAdvisoryId, workspaceCaseId in questionList:
+        forest.getNodesByResponseId(responseId)
+        forest.getNodesByActionButtonId(actionButtonId)
+        forest.getNodesByAdvisoryId(procedureAdvisoryId)
+        forest.getReferrers(workspaceCaseId)
+
+def benchFlowIndex(fileStream):
+    print("# flowindex: reverse index lookups (response, action button, advisory, referrers) vs a PreOrderIter scan per question", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(20, 1000), (80, 1000)]:
+        parsedTable = ParsedInputTable.fromDataFrame(generateSyntheticFaqTable(workspaceCount, rowsPerWorkspace))
+        forest = DialogFlowForest()
+        buildSeconds = _timeIt(forest.buildForrestFromInputTable, parsedTable)
+
+        randomGenerator = random.Random(7)
+        questionList = []
+        for questionIndex in range(10000):
+            index = randomGenerator.randrange(1, rowsPerWorkspace)
+            questionList.append(("RESPONSE_" + str(index), "BUTTON_" + str(index), "CAROUSEL_" + str(index),
+                                 WorkspaceCaseId("WS_" + str(randomGenerator.randrange(workspaceCount)), _syntheticCaseId(index))))
+        lookupSeconds = _timeIt(_lookUpIndexes, forest, questionList)
+        forest.getTreeRootsList()
+        scanSeconds = _timeIt(_scanResponseId, forest, questionList[0][0])
+        assert sorted(_scanResponseId(forest, questionList[0][0]), key=str) == sorted(forest.getNodesByResponseId(questionList[0][0]), key=str)
+        print("rows=%d build=%.3fs lookup=%.2fus/question (4 indexes) scan=%.1fms/question (1 index)" %
+              (len(parsedTable), buildSeconds, lookupSeconds * 1e6 / len(questionList), scanSeconds * 1e3), file=fileStream)
+
+def _lookUpEntryPaths(entryPathTable, workspaceCaseIdList):
+    for workspaceCaseId in workspaceCaseIdList:
+        entryPathTable.getEntryPath(workspaceCaseId)
+        entryPathTable.getEntryButtonId(workspaceCaseId)
+
+# breadcrumbs as they were taken before, anytree ancestors of the projected node
+def _walkAncestors(forest, workspaceCaseIdList):
+    for workspaceCaseId in workspaceCaseIdList:
+        forest.getNode(workspaceCaseId).path
+
+def benchEntryPath(fileStream):
+    print("# entrypath: entry path table build and size, breadcrumb lookup vs anytree ancestor walk", file=fileStream)
+    for workspaceCount, rowsPerWorkspace in [(20, 1000), (80, 1000)]:
+        forest = _buildForest(workspaceCount, rowsPerWorkspace)
+        buildSeconds = _timeIt(EntryPathTable, forest)
+        peakBytes, tableBytes = _tracePeak(EntryPathTable, forest)
+        entryPathTable = EntryPathTable(forest)
+
+        randomGenerator = random.Random(7)
+        workspaceCaseIdList = [WorkspaceCaseId("WS_" + str(randomGenerator.randrange(workspaceCount)), _syntheticCaseId(randomGenerator.randrange(rowsPerWorkspace)))
+                               for questionIndex in range(10000)]
+        lookupSeconds = _timeIt(_lookUpEntryPaths, entryPathTable, workspaceCaseIdList)
+        projectionSeconds = _timeIt(forest.getTreeRootsList)
+        walkSeconds = _timeIt(_walkAncestors, forest, workspaceCaseIdList)
+        print("nodes=%d table_build=%.3fs table=%.1fMB (%d bytes/node) breadcrumb lookup=%.2fus anytree_projection=%.3fs anytree_walk=%.2fus" %
+              (len(entryPathTable), buildSeconds, tableBytes / 1e6, tableBytes / len(entryPathTable), lookupSeconds * 1e6 / len(workspaceCaseIdList),
+               projectionSeconds, walkSeconds * 1e6 / len(workspaceCaseIdList)), file=fileStream)
+
+benchmarkDict = {"ingestion": benchIngestion,
+                 "sharedparse": benchSharedParse,
+                 "nodelookup": benchNodeLookup,
+                 "nodememory": benchNodeMemory,
+                 "clone": benchClone,
+                 "diff": benchDiff,
+                 "incremental": benchIncremental,
+                 "engine": benchEngine,
+                 "serving": benchServing,
+                 "drl": benchDrl,
+                 "buildcache": benchBuildCache,
+                 "snapshot": benchSnapshot,
+                 "streaming": benchStreaming,
+                 "parallel": benchParallelBuild,
+                 "validation": benchValidation,
+                 "analysis": benchAnalysis,
+                 "instrumentation": benchInstrumentation,
+                 "render": benchRender,
+                 "importtime": benchImportTime,
+                 "hotreload": benchHotReload,
+                 "snapshotstore": benchSnapshotStore,
+                 "flowindex": benchFlowIndex,
+                 "entrypath": benchEntryPath}
+
+if __name__ == "__main__":
+    nameList = sys.argv[1:] if len(sys.argv) > 1 else list(benchmarkDict.keys())
+    for name in nameList:
+        benchmarkDict.get(name)(sys.stdout)
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import pandas as pd
+from syntheticsheet import SyntheticSheetSpec, generateSyntheticSheet
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, ClonedDialogTree, DialogFlowDiffEngine, NodeToDrlRulePrinterSingleton, faq_column
+
+###############################################################################
+# Reproducible benchmark suite
+#
+# Generates well formed FAQ sheets from a seeded spec and times every pipeline stage (ingestion from CSV, validation,
+# build, clone, diff, DRL and Mermaid) at a few scales. The results are written as JSON together with the commit and
+# the machine they were taken on, so two runs can be compared with --compare.
+#
+# usage: python3 benchsuite.py [--scale small,medium,large] [--repeat 3] [--output results.json] [--compare old.json]
+
+benchmark_result_format_version = 1
+
+benchmark_scale_dict = {"small": SyntheticSheetSpec(10, 10000, 8, 4, 0.1, 0.15),
+                        "medium": SyntheticSheetSpec(40, 40000, 8, 4, 0.1, 0.15),
+                        "large": SyntheticSheetSpec(80, 80000, 10, 4, 0.1, 0.15)}
+
+# The same sheet with the response of about one case in a hundred changed, what diff is timed against
+def _mutateSheet(df, seed: int):
+    rng = random.Random(seed)
+    mutatedDf = df.copy()
+    responseColumnIndex = faq_column.get("RESPONSE_ID_LIST")-1
+    for rowIndex in rng.sample(range(len(df)), max(1, len(df) // 100)):
+        mutatedDf.iat[rowIndex, responseColumnIndex] = "RESPONSE_CHANGED_" + str(rowIndex)
+    return mutatedDf
+
+###############################################################################
+# Stage timing
+
+# min and median wall seconds of repeatCount runs, setupFunction() gives fresh arguments to every run
+def _timeStage(stageFunction, setupFunction, repeatCount: int):
+    secondsList = []
+    result = None
+    for repeat in range(repeatCount):
+        argumentList = setupFunction()
+        startTime = time.perf_counter()
+        result = stageFunction(*argumentList)
+        secondsList.append(time.perf_counter() - startTime)
+    return {"minSeconds": min(secondsList), "medianSeconds": statistics.median(secondsList)}, result
+
+def _ingest(csvFilePath: str):
+    return ParsedInputTable.fromDataFrame(pd.read_csv(csvFilePath, dtype=str))
+
+def _validate(parsedTable):
+    validator = InputTableValidator()
+    validator.preScanPass(parsedTable)
+    validator.validationPass()
+    return validator
+
+def _build(parsedTable):
+    forest = DialogFlowForest()
+    forest.buildForrestFromInputTable(parsedTable)
+    return forest
+
+def _projectedForest(parsedTable):
+    forest = _build(parsedTable)
+    forest.getTreeRootsList()
+    return forest
+
+def _cloneAll(forest):
+    return [ClonedDialogTree(root) for root in forest.getTreeRootsList()]
+
+def _renderDrl(forest):
+    printer = NodeToDrlRulePrinterSingleton()
+    return sum([len(printer.renderWorkspace(forest, workspace)) for workspace in forest.getGraph().getRootDict().keys()])
+
+def _renderMermaid(forest):
+    return sum([len(forest.renderWorkspaceMermaid(workspace)) for workspace in forest.getGraph().getRootDict().keys()])
+
+def runScale(scale: str, spec: SyntheticSheetSpec, repeatCount: int, workDirectory: str):
+    df = generateSyntheticSheet(spec)
+    csvFilePath = os.path.join(workDirectory, scale + ".csv")
+    df.to_csv(csvFilePath, index=False)
+
+    stageDict = {}
+    stageDict["ingestion"], parsedTable = _timeStage(_ingest, lambda: (csvFilePath,), repeatCount)
+    stageDict["validation"], validator = _timeStage(_validate, lambda: (parsedTable,), repeatCount)
+    stageDict["build"], forest = _timeStage(_build, lambda: (parsedTable,), repeatCount)
+    stageDict["clone"], clonedTreeList = _timeStage(_cloneAll, lambda: (_projectedForest(parsedTable),), repeatCount)
+    mutatedForest = _build(ParsedInputTable.fromDataFrame(_mutateSheet(df, spec.seed)))
+    stageDict["diff"], delta = _timeStage(DialogFlowDiffEngine().diff, lambda: (forest, mutatedForest), repeatCount)
+    stageDict["drl"], drlLength = _timeStage(_renderDrl, lambda: (_projectedForest(parsedTable),), repeatCount)
+    stageDict["mermaid"], mermaidLength = _timeStage(_renderMermaid, lambda: (_projectedForest(parsedTable),), repeatCount)
+
+    graph = forest.getGraph()
+    return {"scale": scale,
+            "spec": spec._asdict(),
+            "rowCount": len(parsedTable),
+            "nodeCount": sum([len(graph.getNodeDict(workspace)) for workspace in graph.getWorkspaceList()]),
+            "issueCount": len(validator.getIssueSet()),
+            "changedCount": len(delta.getTouchedSet()),
+            "drlCharCount": drlLength,
+            "mermaidCharCount": mermaidLength,
+            "stageDict": stageDict}
+
+def _gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def runBenchmarkSuite(scaleList: list, repeatCount: int = 3, scaleDict: dict = None):
+    if scaleDict == None:
+        scaleDict = benchmark_scale_dict
+    resultList = []
+    with tempfile.TemporaryDirectory() as workDirectory:
+        for scale in scaleList:
+            if scale not in scaleDict:
+                raise Exception("Unknown benchmark scale '" + scale + "'")
+            resultList.append(runScale(scale, scaleDict.get(scale), repeatCount, workDirectory))
+    return {"formatVersion": benchmark_result_format_version,
+            "commit": _gitCommit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "repeatCount": repeatCount,
+            "resultList": resultList}
+
+def writeBenchmarkResults(resultDict: dict, filePath: str):
+    with open(filePath, "w") as fileStream:
+        json.dump(resultDict, fileStream, indent=2)
+
+def readBenchmarkResults(filePath: str):
+    with open(filePath) as fileStream:
+        resultDict = json.load(fileStream)
+    if resultDict.get("formatVersion") != benchmark_result_format_version:
+        raise Exception("Benchmark results " + filePath + " have format version " + str(resultDict.get("formatVersion")) + ", expected " + str(benchmark_result_format_version))
+    return resultDict
+
+def printBenchmarkResults(resultDict: dict, fileStream):
+    print("# commit %s, python %s, %d cores, best of %d" % (resultDict.get("commit"), resultDict.get("python"), resultDict.get("cpuCount"), resultDict.get("repeatCount")), file=fileStream)
+    for scaleResult in resultDict.get("resultList"):
+        print("%s: rows=%d nodes=%d issues=%d" % (scaleResult.get("scale"), scaleResult.get("rowCount"), scaleResult.get("nodeCount"), scaleResult.get("issueCount")), file=fileStream)
+        for stage, timing in scaleResult.get("stageDict").items():
+            print("    %-10s min=%.4fs median=%.4fs" % (stage, timing.get("minSeconds"), timing.get("medianSeconds")), file=fileStream)
+
+# Ratio of new to old best time of every stage both runs have, slowdowns beyond the threshold are marked.
+# Returns the list of (scale, stage, ratio) over the threshold.
+def compareBenchmarkResults(oldResultDict: dict, newResultDict: dict, fileStream, slowdownThreshold: float = 1.1):
+    print("# %s -> %s" % (oldResultDict.get("commit"), newResultDict.get("commit")), file=fileStream)
+    oldScaleResultDict = {scaleResult.get("scale"): scaleResult for scaleResult in oldResultDict.get("resultList")}
+    slowdownList = []
+    for scaleResult in newResultDict.get("resultList"):
+        oldScaleResult = oldScaleResultDict.get(scaleResult.get("scale"))
+        if oldScaleResult == None:
+            continue
+        print(scaleResult.get("scale") + ":", file=fileStream)
+        for stage, timing in scaleResult.get("stageDict").items():
+            oldTiming = oldScaleResult.get("stageDict").get(stage)
+            if oldTiming == None:
+                continue
+            ratio = timing.get("minSeconds") / max(oldTiming.get("minSeconds"), 1e-9)
+            marker = ""
+            if ratio > slowdownThreshold:
+                marker = " SLOWER"
+                slowdownList.append((scaleResult.get("scale"), stage, ratio))
+            print("    %-10s %.4fs -> %.4fs x%.2f%s" % (stage, oldTiming.get("minSeconds"), timing.get("minSeconds"), ratio, marker), file=fileStream)
+    return slowdownList
+
+if __name__ == "__main__":
+    argumentParser = argparse.ArgumentParser(description="Time the dialog flow pipeline on synthetic FAQ sheets")
+    argumentParser.add_argument("--scale", default=",".join(benchmark_scale_dict.keys()), help="comma separated scales out of " + ", ".join(benchmark_scale_dict.keys()))
+    argumentParser.add_argument("--repeat", type=int, default=3, help="runs per stage, the best and the median are kept")
+    argumentParser.add_argument("--output", help="JSON file the results are written to")
+    argumentParser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    arguments = argumentParser.parse_args()
+
+    resultDict = runBenchmarkSuite(arguments.scale.split(","), arguments.repeat)
+    printBenchmarkResults(resultDict, sys.stdout)
+    if arguments.output != None:
+        writeBenchmarkResults(resultDict, arguments.output)
+    if arguments.compare != None:
+        compareBenchmarkResults(readBenchmarkResults(arguments.compare), resultDict, sys.stdout)
@@ -0,0 +1,281 @@
+import os
+import pickle
+import pandas as pd
+from io import TextIOBase
+from chatdialogflow import (DialogFlowForest, InputTableValidator, ParsedInputTable, ParsedRow, NodeToDrlRulePrinterSingleton,
+                            faq_column, drl_generator_version, severity_error, _digest, _toParsedInputTable)
+from forestsnapshot import writeForestSnapshot, ForestSnapshot
+
+###############################################################################
+# Content-addressed build cache
+#
+# A build (validation, forest, DRL and Mermaid) is cached per workspace under a key made of the content of the
+# workspace's rows in order, the faq_column mapping and the generator version, so an edit to one workspace only
+# rebuilds that workspace. Row numbers are left out of the key, a row inserted or deleted above a workspace only moves
+# it down the sheet: the cached entry is reused with its rows and issue lines rebased onto the current row numbers.
+# On top of that, a whole input file is keyed by its bytes and maps to the list of its workspace keys, so a warm build
+# of an unchanged file skips reading and parsing the sheet altogether.
+#
+# The forest of a workspace is cached as a binary forest snapshot (see forestsnapshot), a warm getForest() maps the
+# snapshots instead of building from rows. A workspace with validation errors has no forest.
+#
+# cacheDirectory/
+#   workspaces/<workspace key>.pickle   rows, issues, DRL and Mermaid of one workspace
+#   forests/<workspace key>.snapshot    forest of one workspace
+#   sources/<file key>.pickle           (workspace, workspace key, row numbers) of every workspace of one input file
+
+build_cache_format_version = "3"
+
+def _configKey():
+    return _digest(build_cache_format_version.encode(), drl_generator_version.encode(), repr(sorted(faq_column.items())).encode())
+
+# Row content without the row number, so the key survives rows inserted or deleted in front of the workspace
+def _workspaceKey(configKey: bytes, workspace: str, rowList: list):
+    return _digest(configKey, repr(workspace).encode(), *[repr(tuple(row)[1:]).encode() for row in rowList]).hex()
+
+# Everything cached about one workspace
+class WorkspaceBuild:
+    _workspace = None
+    # rows as a nested pickle of plain tuples, only decoded when the forest is asked for, a warm build that just
+    # needs the artifacts does not pay for them
+    _rowPickle = b""
+    _issueSet = set()
+    # None when the workspace has no MIN_START
+    _drlText = None
+    _mermaidText = ""
+
+    def __init__(self, workspace: str, rowList: list, issueSet: set, drlText: str, mermaidText: str):
+        self._workspace = workspace
+        self._rowPickle = pickle.dumps([tuple(row) for row in rowList], protocol=pickle.HIGHEST_PROTOCOL)
+        self._issueSet = issueSet
+        self._drlText = drlText
+        self._mermaidText = mermaidText
+
+    def getWorkspace(self):
+        return self._workspace
+
+    def getRowList(self):
+        return [ParsedRow._make(rowTuple) for rowTuple in pickle.loads(self._rowPickle)]
+
+    # The same build for rows now at rowNumberList, the n-th row of the workspace moved to rowNumberList[n]. Issues
+    # on lines of other rows (none for a workspace) keep their line.
+    def rebase(self, rowNumberList: list):
+        rowList = self.getRowList()
+        if [row.rowNumber for row in rowList] == list(rowNumberList):
+            return self
+        lineDict = {row.rowNumber: rowNumber for row, rowNumber in zip(rowList, rowNumberList)}
+        issueSet = {((lineDict.get(line, line), column), issue) for (line, column), issue in self._issueSet}
+        return WorkspaceBuild(self._workspace, [row._replace(rowNumber=rowNumber) for row, rowNumber in zip(rowList, rowNumberList)],
+                              issueSet, self._drlText, self._mermaidText)
+
+    def getIssueSet(self):
+        return self._issueSet
+
+    def getDrlText(self):
+        return self._drlText
+
+    def getMermaidText(self):
+        return self._mermaidText
+
+# Result of a cached build, the forest is only put together when asked for
+class BuildResult:
+    # dictionary of workspace (key) and WorkspaceBuild (value), in sheet order
+    _workspaceBuildDict = {}
+    _hitWorkspaceSet = set()
+    # dictionary of workspace (key) and forest snapshot file path (value), None for a workspace with errors
+    _snapshotFilePathDict = {}
+    _forest = None
+
+    def __init__(self, workspaceBuildDict: dict, hitWorkspaceSet: set, snapshotFilePathDict: dict):
+        self._workspaceBuildDict = workspaceBuildDict
+        self._hitWorkspaceSet = hitWorkspaceSet
+        self._snapshotFilePathDict = snapshotFilePathDict
+        self._forest = None
+
+    def getWorkspaceList(self):
+        return list(self._workspaceBuildDict.keys())
+
+    def getWorkspaceBuild(self, workspace: str):
+        return self._workspaceBuildDict.get(workspace)
+
+    # workspaces served from the cache, the others were built
+    def getHitWorkspaceSet(self):
+        return self._hitWorkspaceSet
+
+    def getBuiltWorkspaceSet(self):
+        return set(self._workspaceBuildDict.keys()) - self._hitWorkspaceSet
+
+    def getIssueSet(self):
+        issueSet = set()
+        for workspaceBuild in self._workspaceBuildDict.values():
+            issueSet.update(workspaceBuild.getIssueSet())
+        return issueSet
+
+    # the workspace snapshots merged in sheet order, nothing is parsed or linked from rows
+    def getForest(self):
+        if self._forest == None:
+            forest = DialogFlowForest()
+            for workspace in self._workspaceBuildDict.keys():
+                snapshotFilePath = self._snapshotFilePathDict.get(workspace)
+                if snapshotFilePath == None:
+                    raise Exception("Workspace " + workspace + " has validation errors, there is no forest to build")
+                with ForestSnapshot(snapshotFilePath) as snapshot:
+                    forest.mergeForest(snapshot.toForest())
+            self._forest = forest
+        return self._forest
+
+    def printDrl(self, workspace: str, fileStream: TextIOBase):
+        fileStream.write(self._workspaceBuildDict.get(workspace).getDrlText())
+
+    def printMermaid(self, fileStream: TextIOBase):
+        fileStream.write("```mermaid\n" + "".join([workspaceBuild.getMermaidText() for workspaceBuild in self._workspaceBuildDict.values()]) + "```\n")
+
+    # one <workspace>.drl per workspace with a root, returns dictionary of workspace (key) and file path (value)
+    def writeDrlFiles(self, outputDirectory: str):
+        filePathDict = {}
+        for workspace, workspaceBuild in self._workspaceBuildDict.items():
+            if workspaceBuild.getDrlText() != None:
+                filePath = os.path.join(outputDirectory, workspace + ".drl")
+                with open(filePath, "w") as fileStream:
+                    fileStream.write(workspaceBuild.getDrlText())
+                filePathDict[workspace] = filePath
+        return filePathDict
+
+class BuildCache:
+    _cacheDirectory = None
+
+    def __init__(self, cacheDirectory: str):
+        self._cacheDirectory = cacheDirectory
+        os.makedirs(os.path.join(cacheDirectory, "workspaces"), exist_ok=True)
+        os.makedirs(os.path.join(cacheDirectory, "forests"), exist_ok=True)
+        os.makedirs(os.path.join(cacheDirectory, "sources"), exist_ok=True)
+
+    def __load(self, kind: str, key: str):
+        try:
+            with open(os.path.join(self._cacheDirectory, kind, key + ".pickle"), "rb") as cacheFile:
+                return pickle.load(cacheFile)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    # written aside and renamed, a reader never sees a partial entry
+    def __store(self, kind: str, key: str, value):
+        filePath = os.path.join(self._cacheDirectory, kind, key + ".pickle")
+        temporaryFilePath = filePath + "." + str(os.getpid()) + ".tmp"
+        with open(temporaryFilePath, "wb") as cacheFile:
+            pickle.dump(value, cacheFile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaryFilePath, filePath)
+
+    def __snapshotFilePath(self, workspaceKey: str):
+        return os.path.join(self._cacheDirectory, "forests", workspaceKey + ".snapshot")
+
+    # forest snapshot path of a cached workspace, None when it has none
+    def __findSnapshotFilePath(self, workspaceKey: str):
+        snapshotFilePath = self.__snapshotFilePath(workspaceKey)
+        return snapshotFilePath if os.path.exists(snapshotFilePath) else None
+
+    def invalidateWorkspaceKey(self, workspaceKey: str):
+        for filePath in [os.path.join(self._cacheDirectory, "workspaces", workspaceKey + ".pickle"), self.__snapshotFilePath(workspaceKey)]:
+            try:
+                os.remove(filePath)
+            except FileNotFoundError:
+                pass
+
+    # Build the workspaces missing from the cache, validation only sees the rows of those workspaces and every
+    # workspace gets a forest of its own for its snapshot. Returns dictionary of workspace (key) and
+    # (WorkspaceBuild, forest or None when the workspace has errors) (value).
+    def __buildWorkspaces(self, rowListByWorkspace: dict):
+        rowList = [row for workspaceRowList in rowListByWorkspace.values() for row in workspaceRowList]
+        rowList.sort(key=lambda row: row.rowNumber)
+        parsedTable = ParsedInputTable(rowList)
+
+        validator = InputTableValidator()
+        validator.preScanPass(parsedTable)
+        validator.validationPass(parsedTable)
+
+        printer = NodeToDrlRulePrinterSingleton()
+        workspaceBuildDict = {}
+        for workspace, workspaceRowList in rowListByWorkspace.items():
+            # a forest can only be built from a well formed workspace, same as the batch path
+            if any([issue.severity == severity_error for issue in validator.getIssueStore().getWorkspaceIssueSet(workspace)]):
+                workspaceBuildDict[workspace] = (WorkspaceBuild(workspace, workspaceRowList, validator.getIssueSetByWorkspace(workspace), None, ""), None)
+                continue
+            forest = DialogFlowForest()
+            forest.buildForrestFromInputTable(workspaceRowList)
+            drlText = None
+            if workspace in forest.getGraph().getRootDict():
+                drlText = printer.renderWorkspace(forest, workspace)
+            workspaceBuildDict[workspace] = (WorkspaceBuild(workspace, workspaceRowList, validator.getIssueSetByWorkspace(workspace),
+                                                            drlText, forest.renderWorkspaceMermaid(workspace)), forest)
+        return workspaceBuildDict
+
+    def __storeSnapshot(self, workspaceKey: str, forest: DialogFlowForest):
+        snapshotFilePath = self.__snapshotFilePath(workspaceKey)
+        temporaryFilePath = snapshotFilePath + "." + str(os.getpid()) + ".tmp"
+        writeForestSnapshot(forest, temporaryFilePath)
+        os.replace(temporaryFilePath, snapshotFilePath)
+
+    def __buildWithKeys(self, table):
+        parsedTable = _toParsedInputTable(table)
+        configKey = _configKey()
+
+        rowListByWorkspace = {}
+        for row in parsedTable:
+            if row.workspace in rowListByWorkspace:
+                rowListByWorkspace.get(row.workspace).append(row)
+            else:
+                rowListByWorkspace.update({row.workspace: [row]})
+
+        workspaceKeyDict = {}
+        workspaceBuildDict = {}
+        snapshotFilePathDict = {}
+        missRowListByWorkspace = {}
+        for workspace, workspaceRowList in rowListByWorkspace.items():
+            workspaceKey = _workspaceKey(configKey, workspace, workspaceRowList)
+            workspaceKeyDict[workspace] = workspaceKey
+            workspaceBuild = self.__load("workspaces", workspaceKey)
+            if workspaceBuild == None:
+                missRowListByWorkspace[workspace] = workspaceRowList
+            else:
+                workspaceBuild = workspaceBuild.rebase([row.rowNumber for row in workspaceRowList])
+                snapshotFilePathDict[workspace] = self.__findSnapshotFilePath(workspaceKey)
+            workspaceBuildDict[workspace] = workspaceBuild
+
+        hitWorkspaceSet = set(rowListByWorkspace.keys()) - set(missRowListByWorkspace.keys())
+        if len(missRowListByWorkspace) > 0:
+            for workspace, (workspaceBuild, forest) in self.__buildWorkspaces(missRowListByWorkspace).items():
+                workspaceKey = workspaceKeyDict.get(workspace)
+                # the snapshot goes first, a workspace entry is only found once its forest is there
+                if forest != None:
+                    self.__storeSnapshot(workspaceKey, forest)
+                self.__store("workspaces", workspaceKey, workspaceBuild)
+                workspaceBuildDict[workspace] = workspaceBuild
+                snapshotFilePathDict[workspace] = self.__findSnapshotFilePath(workspaceKey)
+
+        rowNumberListDict = {workspace: [row.rowNumber for row in workspaceRowList] for workspace, workspaceRowList in rowListByWorkspace.items()}
+        return BuildResult(workspaceBuildDict, hitWorkspaceSet, snapshotFilePathDict), workspaceKeyDict, rowNumberListDict
+
+    def build(self, table):
+        return self.__buildWithKeys(table)[0]
+
+    # Build from an input file, an unchanged file is served from the cache without being read by readFunction
+    def buildFromFile(self, filePath: str, readFunction = pd.read_excel):
+        with open(filePath, "rb") as inputFile:
+            fileKey = _digest(_configKey(), inputFile.read()).hex()
+
+        workspaceKeyList = self.__load("sources", fileKey)
+        if workspaceKeyList != None:
+            workspaceBuildDict = {}
+            snapshotFilePathDict = {}
+            for workspace, workspaceKey, rowNumberList in workspaceKeyList:
+                workspaceBuild = self.__load("workspaces", workspaceKey)
+                if workspaceBuild == None:
+                    break
+                # the entry may have been stored for the same rows elsewhere in another file
+                workspaceBuildDict[workspace] = workspaceBuild.rebase(rowNumberList)
+                snapshotFilePathDict[workspace] = self.__findSnapshotFilePath(workspaceKey)
+            else:
+                return BuildResult(workspaceBuildDict, set(workspaceBuildDict.keys()), snapshotFilePathDict)
+
+        buildResult, workspaceKeyDict, rowNumberListDict = self.__buildWithKeys(ParsedInputTable.fromDataFrame(readFunction(filePath)))
+        self.__store("sources", fileKey, [(workspace, workspaceKey, rowNumberListDict.get(workspace)) for workspace, workspaceKey in workspaceKeyDict.items()])
+        return buildResult
@@ -1,7 +1,15 @@
-import pandas as pd
+import os
+import sys
+import hashlib
+import weakref
 from io import TextIOBase
+from typing import NamedTuple
 from anytree import Node, NodeMixin, RenderTree, AsciiStyle, SymlinkNode
-from anytree.exporter import MermaidExporter
+from instrumentation import instrumentedStage
+
+# Runtime consumers (WorkspaceCaseId, the node classes, a forest loaded from a snapshot, the dialog engine) only need
+# the imports above. pandas, the anytree exporters and the process pool are imported by the build, validate, render
+# and DRL paths that use them, so a serving worker starts without them.
 
 ##############################################
 # TODO: move hard coded config into config file and read from there
@@ -25,48 +33,309 @@ root_reserved_case_id = "MIN_START"
 # Utility functions
 
 def isBlank(label):
+    import pandas as pd
     return pd.isnull(label)
 
+# a table can only be a data frame when pandas was loaded by whoever made it
+def _isDataFrame(table):
+    pandasModule = sys.modules.get("pandas")
+    return pandasModule != None and isinstance(table, pandasModule.DataFrame)
+
+# isBlank() for values of a parsed row, where blank cells are already None, without the pandas call per cell
+def _isBlankParsed(label):
+    return label is None or label != label
+
 
 def _isReservedCaseId(caseId: str):
     return caseId == root_reserved_case_id
 
+# IDs repeat all over the sheet (case IDs as keys and as buttons, shared response IDs), keep one copy of each
+def _internId(label):
+    if type(label) is str:
+        return sys.intern(label)
+    return label
+
+def _toIdTuple(idList):
+    return tuple([_internId(item) for item in idList])
+
+# Content digest, stable across processes unlike hash() on strings
+def _digest(*partList):
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in partList:
+        hasher.update(part)
+    return hasher.digest()
+
+##############################################
+# Columnar ingestion
+#
+# Pull every faq_column column out of the data frame once as a plain list, instead of building a pandas Series
+# per row with iterrows() and indexing it with iloc. Comma separated ID lists are split and stripped in bulk with
+# pandas string operations, a blank cell becomes an empty list.
+
+def _extractColumn(df, columnStr: str):
+    column = df.iloc[:, faq_column.get(columnStr)-1]
+    # blank cells are normalized to None so isBlank() keeps working on the extracted values
+    return column.astype(object).where(column.notna(), None).tolist()
+
+def _extractIdListColumn(df, columnStr: str):
+    column = df.iloc[:, faq_column.get(columnStr)-1]
+    blankList = column.isna().tolist()
+    # "a, b ,c" -> "a,b,c" -> ["a", "b", "c"], same result as [item.strip() for item in label.split(",")]
+    splitList = column.astype(str).str.replace(r"\s*,\s*", ",", regex=True).str.strip().str.split(",").tolist()
+    return [[] if blank else idList for blank, idList in zip(blankList, splitList)]
+
+def _extractInputColumns(df):
+    return {"WORKSPACE": _extractColumn(df, "WORKSPACE"),
+            "CASE_ID": _extractColumn(df, "CASE_ID"),
+            "JUMP_TO_CASE": _extractColumn(df, "JUMP_TO_CASE"),
+            "RESPONSE_ID_LIST": _extractIdListColumn(df, "RESPONSE_ID_LIST"),
+            "ACTION_BUTTON_ID_LIST": _extractIdListColumn(df, "ACTION_BUTTON_ID_LIST"),
+            "PROCEDURE_ADVISORY_ID_LIST": _extractIdListColumn(df, "PROCEDURE_ADVISORY_ID_LIST"),
+            "BUTTON_CASE_ID_LIST": _extractIdListColumn(df, "BUTTON_CASE_ID_LIST")}
+
+##############################################
+# Parsed input table
+#
+# The input sheet is parsed once into a list of compact row records with pre-split ID lists, the validator passes
+# and the forest build are then passes over the same in-memory records instead of re-parsing the data frame
+
+# first data row in the excel is row 2
+first_data_row_number = 2
+
+class ParsedRow(NamedTuple):
+    rowNumber: int
+    workspace: str
+    caseId: str
+    jumpToCase: str
+    respondIdList: list
+    actionButtonIdList: list
+    procedureAdvisoryIdList: list
+    buttonCaseIdList: list
+
+class ParsedInputTable:
+    _rowList = []
+    # row index built on first use, see __indexRows()
+    _rowHashDict = None
+    _lastRowDict = None
+    _rowNumberDict = None
+    _rowListByWorkspace = None
+
+    def __init__(self, rowList: list[ParsedRow]):
+        self._rowList = rowList
+        self._rowHashDict = None
+        self._lastRowDict = None
+        self._rowNumberDict = None
+        self._rowListByWorkspace = None
+
+    # firstRowNumber is the sheet row of the first data frame row, for data frames holding one chunk of a bigger table
+    @staticmethod
+    def fromDataFrame(df, firstRowNumber: int = first_data_row_number):
+        columnDict = _extractInputColumns(df)
+        rowList = [ParsedRow(*rowValues) for rowValues in zip(range(firstRowNumber, firstRowNumber + len(df)),
+                                                               columnDict.get("WORKSPACE"),
+                                                               columnDict.get("CASE_ID"),
+                                                               columnDict.get("JUMP_TO_CASE"),
+                                                               columnDict.get("RESPONSE_ID_LIST"),
+                                                               columnDict.get("ACTION_BUTTON_ID_LIST"),
+                                                               columnDict.get("PROCEDURE_ADVISORY_ID_LIST"),
+                                                               columnDict.get("BUTTON_CASE_ID_LIST"))]
+        return ParsedInputTable(rowList)
+
+    def getRowList(self):
+        return self._rowList
+
+    def __iter__(self):
+        return iter(self._rowList)
+
+    def __len__(self):
+        return len(self._rowList)
+
+    # One pass over the rows building
+    # * per-row content hash keyed by WorkspaceCaseId, the row number is not part of the content and rows repeating
+    #   a WorkspaceCaseId are folded into one hash so an edit to any of them is seen
+    # * the last row of every WorkspaceCaseId, which is the one the forest builds a node from
+    # * the row numbers of every WorkspaceCaseId, and the rows of every workspace
+    def __indexRows(self):
+        self._rowHashDict = {}
+        self._lastRowDict = {}
+        self._rowNumberDict = {}
+        self._rowListByWorkspace = {}
+
+        for row in self._rowList:
+            workspaceCaseId = WorkspaceCaseId(row.workspace, row.caseId)
+            rowHash = _digest(repr(tuple(row[1:])).encode())
+            if workspaceCaseId in self._rowHashDict:
+                self._rowHashDict.update({workspaceCaseId: _digest(self._rowHashDict.get(workspaceCaseId), rowHash)})
+                self._rowNumberDict.update({workspaceCaseId: self._rowNumberDict.get(workspaceCaseId) + (row.rowNumber,)})
+            else:
+                self._rowHashDict.update({workspaceCaseId: rowHash})
+                self._rowNumberDict.update({workspaceCaseId: (row.rowNumber,)})
+            self._lastRowDict.update({workspaceCaseId: row})
+
+            if row.workspace in self._rowListByWorkspace:
+                self._rowListByWorkspace.get(row.workspace).append(row)
+            else:
+                self._rowListByWorkspace.update({row.workspace: [row]})
+
+    def getRowHashDict(self):
+        if self._rowHashDict == None:
+            self.__indexRows()
+        return self._rowHashDict
+
+    def getLastRow(self, workspaceCaseId):
+        if self._lastRowDict == None:
+            self.__indexRows()
+        return self._lastRowDict.get(workspaceCaseId)
+
+    def getRowNumberDict(self):
+        if self._rowNumberDict == None:
+            self.__indexRows()
+        return self._rowNumberDict
+
+    def getRowListByWorkspace(self, workspace):
+        if self._rowListByWorkspace == None:
+            self.__indexRows()
+        return self._rowListByWorkspace.get(workspace, [])
+
+    # workspaces in the order of their first row
+    def getWorkspaceList(self):
+        if self._rowListByWorkspace == None:
+            self.__indexRows()
+        return list(self._rowListByWorkspace.keys())
+
+# Passes accept either a data frame or an already parsed table, a data frame is parsed on the spot
+def _toParsedInputTable(table):
+    if isinstance(table, ParsedInputTable):
+        return table
+    return ParsedInputTable.fromDataFrame(table)
+
+# Single pass consumers also take any iterable of parsed rows, such as a row chunk stream read from a file or cursor
+def _iterParsedRows(table):
+    if _isDataFrame(table):
+        return iter(ParsedInputTable.fromDataFrame(table))
+    return iter(table)
+
+# Row level change set between two versions of the input table, keyed by WorkspaceCaseId
+# * upsert rows: the row to build from for every added or modified WorkspaceCaseId
+# * removed: WorkspaceCaseId no longer defined
+# * renumbered workspaces: unchanged content whose rows moved up or down in the sheet (only row numbers in issues move)
+class RowChangeSet:
+    _upsertRowList = []
+    _removedList = []
+    _affectedWorkspaceSet = set()
+    _renumberedWorkspaceSet = set()
+
+    def __init__(self, upsertRowList: list[ParsedRow], removedList: list, renumberedWorkspaceSet: set = None):
+        self._upsertRowList = upsertRowList
+        self._removedList = removedList
+        self._affectedWorkspaceSet = {row.workspace for row in upsertRowList} | {workspaceCaseId.getWorkspace() for workspaceCaseId in removedList}
+        self._renumberedWorkspaceSet = set() if renumberedWorkspaceSet == None else renumberedWorkspaceSet
+
+    # Compare per-row content hashes of two parsed tables
+    @staticmethod
+    def fromTables(oldTable: ParsedInputTable, newTable: ParsedInputTable):
+        oldRowHashDict = oldTable.getRowHashDict()
+        newRowHashDict = newTable.getRowHashDict()
+        oldRowNumberDict = oldTable.getRowNumberDict()
+        newRowNumberDict = newTable.getRowNumberDict()
+
+        upsertRowList = list()
+        renumberedWorkspaceSet = set()
+        for workspaceCaseId, rowHash in newRowHashDict.items():
+            if oldRowHashDict.get(workspaceCaseId) != rowHash:
+                upsertRowList.append(newTable.getLastRow(workspaceCaseId))
+            elif oldRowNumberDict.get(workspaceCaseId) != newRowNumberDict.get(workspaceCaseId):
+                renumberedWorkspaceSet.add(workspaceCaseId.getWorkspace())
+        removedList = [workspaceCaseId for workspaceCaseId in oldRowHashDict.keys() if workspaceCaseId not in newRowHashDict]
+
+        return RowChangeSet(upsertRowList, removedList, renumberedWorkspaceSet)
+
+    def getUpsertRowList(self):
+        return self._upsertRowList
+
+    def getRemovedList(self):
+        return self._removedList
+
+    def getAffectedWorkspaceSet(self):
+        return self._affectedWorkspaceSet
+
+    def getRenumberedWorkspaceSet(self):
+        return self._renumberedWorkspaceSet
+
+    def isEmpty(self):
+        return len(self._upsertRowList) == 0 and len(self._removedList) == 0 and len(self._renumberedWorkspaceSet) == 0
+
 ##############################################
 # Classes
 
 class WorkspaceCaseId:
-    _workspace = ""
-    _caseId = ""
-
-    def __init__(self, workspace, caseId):
-        self._workspace = workspace
-        self._caseId = caseId
+    # Immutable, interned value type: WorkspaceCaseId(workspace, caseId) returns the same instance for the same
+    # workspace:case_id pair as long as one is alive, so it can be used as dictionary key and compared by identity in
+    # the common case. The intern table holds weak references, IDs of a forest dropped after a reload are released.
+    _internDict = weakref.WeakValueDictionary()
+
+    __slots__ = ("_workspace", "_caseId", "_hash", "_str", "__weakref__")
+
+    def __new__(cls, workspace, caseId):
+        instance = cls._internDict.get((workspace, caseId))
+        if instance is None:
+            instance = super(WorkspaceCaseId, cls).__new__(cls)
+            instance._workspace = _internId(workspace)
+            instance._caseId = _internId(caseId)
+            instance._hash = hash((workspace, caseId))
+            # "workspace:case_id" string is only built when somebody asks for it
+            instance._str = None
+            cls._internDict[(workspace, caseId)] = instance
+        return instance
+
+    # unpickle through the constructor so the key is interned again in the loading process
+    def __reduce__(self):
+        return (WorkspaceCaseId, (self._workspace, self._caseId))
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, WorkspaceCaseId) == False:
+            return NotImplemented
         return (self._workspace == other.getWorkspace()) and (self._caseId == other.getCaseId())
+
+    def __hash__(self):
+        return self._hash
     
     def __str__(self):
-        return self._workspace + ":" + self._caseId
+        if self._str is None:
+            self._str = self._workspace + ":" + self._caseId
+        return self._str
+
+    def __repr__(self):
+        return str(self)
     
     def getWorkspace(self):
         return self._workspace
     
     def getCaseId(self):
         return self._caseId
-    
-class BaseNode (NodeMixin):
-    _workspaceCaseId = None
-    _respondIdList = None
 
-    # internal state, used for tracking compare, that is not used in comparison
-    _comparisonEqualFlag = None
+# Nodes are kept compact for million-node forests: attributes (including the two anytree NodeMixin links) live in
+# __slots__, ID lists are stored as tuples of interned strings, and the node name is derived from the interned
+# WorkspaceCaseId on demand. anytree's NodeMixin declares no __slots__, so every node still has the __dict__ and
+# __weakref__ slots (40 bytes per node over a pure __slots__ class); the dictionary itself is only allocated when an
+# attribute outside the slots is set, which neither the forest nor RenderTree/MermaidExporter do.
+class BaseNode (NodeMixin):
+    __slots__ = ("_NodeMixin__parent", "_NodeMixin__children", "_workspaceCaseId", "_respondIdList",
+                 # internal state, used for tracking compare, that is not used in comparison
+                 "_comparisonEqualFlag")
     
     def __init__(self, workspaceCaseId: WorkspaceCaseId, respondIdList: list[str]):
         super(BaseNode, self).__init__()
-        self.name = str(workspaceCaseId)
         self._workspaceCaseId = workspaceCaseId
-        self._respondIdList = respondIdList
+        self._respondIdList = _toIdTuple(respondIdList)
         self._comparisonEqualFlag = None
+
+    # anytree renders and exports nodes by name
+    @property
+    def name(self):
+        return str(self._workspaceCaseId)
     
     def getWorkspaceCaseId(self):
         return self._workspaceCaseId
@@ -74,6 +343,10 @@ class BaseNode (NodeMixin):
     def getRespondIdList(self):
         return self._respondIdList
 
+    # (field name, value) pairs making up the content of this node, used for content hashing and field level diff
+    def getFieldList(self):
+        return [("nodeType", type(self).__name__), ("respondIdList", self._respondIdList)]
+
     # __eq__() have other side effect, so use a dedicated equivalence function
     def nodeComparison(self, other):
         return self.getWorkspaceCaseId() == other.getWorkspaceCaseId() and self.getRespondIdList() == other.getRespondIdList()
@@ -88,26 +361,28 @@ class BaseNode (NodeMixin):
         return self._comparisonEqualFlag       
 
 class JumpToNode (BaseNode):
-    _jumpToCaseId = None
+    __slots__ = ("_jumpToCaseId",)
 
     def __init__(self, workspaceCaseId: WorkspaceCaseId, respondIdList: list[str], jumpToCaseId: str):
         super(JumpToNode, self).__init__(workspaceCaseId, respondIdList)
-        self._jumpToCaseId = jumpToCaseId
+        self._jumpToCaseId = _internId(jumpToCaseId)
 
     def getJumpToCaseId(self):
         return self._jumpToCaseId
+
+    def getFieldList(self):
+        return super().getFieldList() + [("jumpToCaseId", self._jumpToCaseId)]
     
     def clone(self):
         return JumpToNode(self.getWorkspaceCaseId(), self.getRespondIdList(), self.getJumpToCaseId())
 
 class ButtonCaseIdListNode(BaseNode):
-    _buttonCaseIdList = None
-    _actionButtonIdList = None
+    __slots__ = ("_buttonCaseIdList", "_actionButtonIdList")
 
     def __init__(self, workspaceCaseId: WorkspaceCaseId, respondIdList: list[str], buttonCaseIdList: list[str], actionButtonIdList: list[str]):
         super().__init__(workspaceCaseId, respondIdList)
-        self._buttonCaseIdList = buttonCaseIdList
-        self._actionButtonIdList = actionButtonIdList
+        self._buttonCaseIdList = _toIdTuple(buttonCaseIdList)
+        self._actionButtonIdList = _toIdTuple(actionButtonIdList)
 
     def getButtonCaseIdList(self):
         return self._buttonCaseIdList
@@ -115,236 +390,897 @@ class ButtonCaseIdListNode(BaseNode):
     def getActionButtonIdList(self):
         return self._actionButtonIdList
 
+    def getFieldList(self):
+        return super().getFieldList() + [("buttonCaseIdList", self._buttonCaseIdList), ("actionButtonIdList", self._actionButtonIdList)]
+
     def clone(self):
         return ButtonCaseIdListNode(self.getWorkspaceCaseId(), self.getRespondIdList(), self.getButtonCaseIdList(), self.getActionButtonIdList())
 
 class LeafNode (BaseNode):
-    _procedureAdvisoryIdList = None
+    __slots__ = ("_procedureAdvisoryIdList",)
 
     def __init__(self, workspaceCaseId: WorkspaceCaseId, respondIdList: list[str], procedureAdvisoryIdList: list[str]):
         super(LeafNode, self).__init__(workspaceCaseId, respondIdList)
-        self._procedureAdvisoryIdList = procedureAdvisoryIdList
+        self._procedureAdvisoryIdList = _toIdTuple(procedureAdvisoryIdList)
 
     def getProcedureAdvisoryIdList(self):
         return self._procedureAdvisoryIdList 
+
+    def getFieldList(self):
+        return super().getFieldList() + [("procedureAdvisoryIdList", self._procedureAdvisoryIdList)]
     
     def clone(self):
-        return JumpToNode(self.getWorkspaceCaseId(), self.getRespondIdList(), self.getProcedureAdvisoryIdList())
+        return LeafNode(self.getWorkspaceCaseId(), self.getRespondIdList(), self.getProcedureAdvisoryIdList())
+
+# The dialog flow as a graph, this is where the forest keeps its structure
+# * every real node is stored once, keyed by its WorkspaceCaseId
+# * button edges (parent -> children) form a DAG, a sub-menu can be shared by several parents
+# * JUMP_TO edges are back-edges into the flow, they are kept apart from button edges so the DAG stays acyclic
+# * parents are tracked for every node, including the extra parents that the anytree projection turns into SymlinkNode
+# * reverse indexes, kept up to date whenever a node is linked or unlinked: jump target -> jump sources, and
+#   response ID, action button ID and procedure advisory ID -> nodes using it, so impact questions are a lookup
+# Traversals over the graph visit each real node once, no matter how many menus share it
+class DialogFlowGraph:
+    _nodeDictByWorkspace = {}
+    _rootDict = {}
+    _childrenDict = {}
+    _parentsDict = {}
+    _jumpToDict = {}
+    _jumpSourcesDict = {}
+    _responseIndexDict = {}
+    _actionButtonIndexDict = {}
+    _advisoryIndexDict = {}
+    _nodeHashDict = {}
+    _subtreeHashDict = {}
+    _workspaceHashDict = {}
+
+    def __init__(self):
+        # dictionary of workspace (key) and all nodes in their trees (value as dictionary of WorkspaceCaseId to node)
+        # this is the (workspace, case_id) -> node index used for linking, it also keeps nodes in input table order
+        self._nodeDictByWorkspace = {}
+        # dictionary of workspace (key) and WorkspaceCaseId of their tree root (value)
+        self._rootDict = {}
+        # adjacency, dictionary of WorkspaceCaseId (key) and tuple of button child WorkspaceCaseId (value)
+        self._childrenDict = {}
+        # reverse adjacency, dictionary of WorkspaceCaseId (key) and list of parent WorkspaceCaseId (value)
+        self._parentsDict = {}
+        # back-edges, dictionary of WorkspaceCaseId (key) and WorkspaceCaseId of the jump target (value)
+        self._jumpToDict = {}
+        # reverse back-edges, dictionary of WorkspaceCaseId of a jump target (key) and list of jump source WorkspaceCaseId (value)
+        self._jumpSourcesDict = {}
+        # reverse indexes, dictionary of ID (key) and list of WorkspaceCaseId of the nodes using it (value), in link order
+        self._responseIndexDict = {}
+        self._actionButtonIndexDict = {}
+        self._advisoryIndexDict = {}
+        # Merkle hashes, computed on first use, dictionary of WorkspaceCaseId (key) and digest (value)
+        self._nodeHashDict = {}
+        self._subtreeHashDict = {}
+        self._workspaceHashDict = {}
+
+    def addNode(self, node: BaseNode):
+        workspace = node.getWorkspaceCaseId().getWorkspace()
+        # a new case changes the sources of its workspace, and the subtree of parents already pointing to it
+        self.__invalidateHashes(node.getWorkspaceCaseId())
+        if workspace in self._nodeDictByWorkspace.keys():
+            workspaceNodeDict = self._nodeDictByWorkspace.get(workspace)
+            workspaceNodeDict.update({node.getWorkspaceCaseId():node})
+        else:
+            self._nodeDictByWorkspace.update({workspace:{node.getWorkspaceCaseId():node}})
+
+    def setRoot(self, workspaceCaseId: WorkspaceCaseId):
+        self._rootDict.update({workspaceCaseId.getWorkspace(): workspaceCaseId})
+
+    # ID lists a node is indexed under, as (index dictionary, ID list)
+    def __indexedIdLists(self, node: BaseNode):
+        indexedIdLists = [(self._responseIndexDict, node.getRespondIdList())]
+        if isinstance(node, ButtonCaseIdListNode):
+            indexedIdLists.append((self._actionButtonIndexDict, node.getActionButtonIdList()))
+        elif isinstance(node, LeafNode):
+            indexedIdLists.append((self._advisoryIndexDict, node.getProcedureAdvisoryIdList()))
+        return indexedIdLists
+
+    def __linkNode(self, node: BaseNode):
+        workspaceCaseId = node.getWorkspaceCaseId()
+        workspace = workspaceCaseId.getWorkspace()
+
+        for indexDict, idList in self.__indexedIdLists(node):
+            # an ID listed twice on one row still indexes the node once
+            for indexedId in dict.fromkeys(idList):
+                if indexedId in indexDict:
+                    indexDict.get(indexedId).append(workspaceCaseId)
+                else:
+                    indexDict.update({indexedId: [workspaceCaseId]})
+
+        if isinstance(node, ButtonCaseIdListNode):
+            childList = list()
+            for buttonCaseId in node.getButtonCaseIdList():
+                childWorkspaceCaseId = WorkspaceCaseId(workspace, buttonCaseId)
+                if self.getNode(childWorkspaceCaseId) == None:
+                    raise Exception(str(childWorkspaceCaseId) + " does not exist")
+                childList.append(childWorkspaceCaseId)
+                if childWorkspaceCaseId in self._parentsDict:
+                    self._parentsDict.get(childWorkspaceCaseId).append(workspaceCaseId)
+                else:
+                    self._parentsDict.update({childWorkspaceCaseId: [workspaceCaseId]})
+            self._childrenDict.update({workspaceCaseId: tuple(childList)})
+        else:
+            # jump to is really a backward jump into a loop, it is recorded as a back-edge instead of a child
+            if isinstance(node, JumpToNode):
+                jumpToWorkspaceCaseId = WorkspaceCaseId(workspace, node.getJumpToCaseId())
+                self._jumpToDict.update({workspaceCaseId: jumpToWorkspaceCaseId})
+                if jumpToWorkspaceCaseId in self._jumpSourcesDict:
+                    self._jumpSourcesDict.get(jumpToWorkspaceCaseId).append(workspaceCaseId)
+                else:
+                    self._jumpSourcesDict.update({jumpToWorkspaceCaseId: [workspaceCaseId]})
+            else:
+                if isinstance(node, LeafNode) == False:
+                    raise Exception ("switch context not yet implemented")
+
+    # removes key from an index when its list runs empty
+    def __removeFromIndex(self, indexDict: dict, key, workspaceCaseId: WorkspaceCaseId):
+        workspaceCaseIdList = indexDict.get(key)
+        if workspaceCaseIdList == None or workspaceCaseId not in workspaceCaseIdList:
+            return
+        workspaceCaseIdList.remove(workspaceCaseId)
+        if len(workspaceCaseIdList) == 0:
+            del indexDict[key]
+
+    def __unlinkNode(self, workspaceCaseId: WorkspaceCaseId):
+        for childWorkspaceCaseId in self._childrenDict.pop(workspaceCaseId, ()):
+            self.__removeFromIndex(self._parentsDict, childWorkspaceCaseId, workspaceCaseId)
+        jumpToWorkspaceCaseId = self._jumpToDict.pop(workspaceCaseId, None)
+        if jumpToWorkspaceCaseId != None:
+            self.__removeFromIndex(self._jumpSourcesDict, jumpToWorkspaceCaseId, workspaceCaseId)
+        for indexDict, idList in self.__indexedIdLists(self.getNode(workspaceCaseId)):
+            for indexedId in dict.fromkeys(idList):
+                self.__removeFromIndex(indexDict, indexedId, workspaceCaseId)
+
+    # Take over the nodes and edges of a graph built over other workspaces, such as a shard built in another process
+    def mergeGraph(self, other):
+        for workspace in other._nodeDictByWorkspace.keys():
+            if workspace in self._nodeDictByWorkspace:
+                raise Exception("workspace " + str(workspace) + " is in both graphs")
+        self._nodeDictByWorkspace.update(other._nodeDictByWorkspace)
+        self._rootDict.update(other._rootDict)
+        self._childrenDict.update(other._childrenDict)
+        self._parentsDict.update(other._parentsDict)
+        self._jumpToDict.update(other._jumpToDict)
+        self._jumpSourcesDict.update(other._jumpSourcesDict)
+        # IDs are not per workspace, both graphs can index the same one
+        for indexDict, otherIndexDict in [(self._responseIndexDict, other._responseIndexDict),
+                                          (self._actionButtonIndexDict, other._actionButtonIndexDict),
+                                          (self._advisoryIndexDict, other._advisoryIndexDict)]:
+            for indexedId, workspaceCaseIdList in otherIndexDict.items():
+                if indexedId in indexDict:
+                    indexDict.get(indexedId).extend(workspaceCaseIdList)
+                else:
+                    indexDict.update({indexedId: list(workspaceCaseIdList)})
+        self._nodeHashDict.update(other._nodeHashDict)
+        self._subtreeHashDict.update(other._subtreeHashDict)
+        self._workspaceHashDict.update(other._workspaceHashDict)
+
+    # Connect all edges once every node is in, edges only refer to nodes of the same workspace
+    def link(self):
+        for node in self.iterNodes():
+            self.__linkNode(node)
+
+    # Connect the edges of some nodes only, used after nodes were replaced or added
+    def linkNodes(self, workspaceCaseIdList: list):
+        for workspaceCaseId in workspaceCaseIdList:
+            # new edges change the subtree hash of the node and its ancestors, and which nodes are sources
+            self.__invalidateHashes(workspaceCaseId)
+            self.__linkNode(self.getNode(workspaceCaseId))
+
+    # Take a node and its outgoing edges out, edges pointing to it from parents stay until those parents are relinked
+    def removeNode(self, workspaceCaseId: WorkspaceCaseId):
+        node = self.getNode(workspaceCaseId)
+        if node == None:
+            return None
+
+        self.__invalidateHashes(workspaceCaseId)
+        self.__unlinkNode(workspaceCaseId)
+        del self._nodeDictByWorkspace.get(workspaceCaseId.getWorkspace())[workspaceCaseId]
+        if self._rootDict.get(workspaceCaseId.getWorkspace()) == workspaceCaseId:
+            del self._rootDict[workspaceCaseId.getWorkspace()]
+        return node
+
+    # Drop cached hashes that depend on this node: its own, the subtree hash of every ancestor and the workspace hash
+    def __invalidateHashes(self, workspaceCaseId: WorkspaceCaseId):
+        # nothing cached yet, as during a full build
+        if len(self._nodeHashDict) == 0 and len(self._subtreeHashDict) == 0 and len(self._workspaceHashDict) == 0:
+            return
+        self._nodeHashDict.pop(workspaceCaseId, None)
+        self._workspaceHashDict.pop(workspaceCaseId.getWorkspace(), None)
+
+        visitedSet = set()
+        stack = [workspaceCaseId]
+        while len(stack) > 0:
+            currentWorkspaceCaseId = stack.pop()
+            if currentWorkspaceCaseId in visitedSet:
+                continue
+            visitedSet.add(currentWorkspaceCaseId)
+            self._subtreeHashDict.pop(currentWorkspaceCaseId, None)
+            stack.extend(self._parentsDict.get(currentWorkspaceCaseId, ()))
+
+    def getNode(self, workspaceCaseId: WorkspaceCaseId):
+        nodeDictInWorkspace = self._nodeDictByWorkspace.get(workspaceCaseId.getWorkspace())
+        if nodeDictInWorkspace == None:
+            return None
+        return nodeDictInWorkspace.get(workspaceCaseId)
+
+    def getNodeDict(self, workspace: str):
+        return self._nodeDictByWorkspace.get(workspace)
+
+    def getWorkspaceList(self):
+        return list(self._nodeDictByWorkspace.keys())
+
+    def getRootDict(self):
+        return self._rootDict
+
+    def getChildren(self, workspaceCaseId: WorkspaceCaseId):
+        return self._childrenDict.get(workspaceCaseId, ())
+
+    def getParents(self, workspaceCaseId: WorkspaceCaseId):
+        return tuple(self._parentsDict.get(workspaceCaseId, ()))
+
+    def getJumpToTarget(self, workspaceCaseId: WorkspaceCaseId):
+        return self._jumpToDict.get(workspaceCaseId)
+
+    ###############################################################################
+    # Reverse index lookups, a dictionary get plus a copy of the result
+
+    # nodes whose JUMP_TO leads to this node
+    def getJumpSources(self, workspaceCaseId: WorkspaceCaseId):
+        return tuple(self._jumpSourcesDict.get(workspaceCaseId, ()))
+
+    # every node leading to this one, button parents (shared menus included) then jump sources
+    def getReferrers(self, workspaceCaseId: WorkspaceCaseId):
+        return self.getParents(workspaceCaseId) + self.getJumpSources(workspaceCaseId)
+
+    def getNodesByResponseId(self, responseId: str):
+        return tuple(self._responseIndexDict.get(responseId, ()))
+
+    def getNodesByActionButtonId(self, actionButtonId: str):
+        return tuple(self._actionButtonIndexDict.get(actionButtonId, ()))
+
+    def getNodesByAdvisoryId(self, procedureAdvisoryId: str):
+        return tuple(self._advisoryIndexDict.get(procedureAdvisoryId, ()))
+
+    def getResponseIdList(self):
+        return list(self._responseIndexDict.keys())
+
+    def getActionButtonIdList(self):
+        return list(self._actionButtonIndexDict.keys())
+
+    def getAdvisoryIdList(self):
+        return list(self._advisoryIndexDict.keys())
+
+    # nodes that no button points to, the workspace root first, then orphans
+    def getSourceList(self, workspace: str):
+        sourceList = [node.getWorkspaceCaseId() for node in self.iterNodes(workspace) if node.getWorkspaceCaseId() not in self._parentsDict]
+        rootWorkspaceCaseId = self._rootDict.get(workspace)
+        if rootWorkspaceCaseId in sourceList:
+            sourceList.remove(rootWorkspaceCaseId)
+            sourceList.insert(0, rootWorkspaceCaseId)
+        return sourceList
+
+    # digest of the node content only
+    def getNodeHash(self, workspaceCaseId: WorkspaceCaseId):
+        nodeHash = self._nodeHashDict.get(workspaceCaseId)
+        if nodeHash == None:
+            node = self.getNode(workspaceCaseId)
+            nodeHash = _digest(repr((str(workspaceCaseId), node.getFieldList())).encode())
+            self._nodeHashDict.update({workspaceCaseId: nodeHash})
+        return nodeHash
+
+    # digest of the node content and, in order, the subtree digest of every button child
+    # equal subtree hashes mean identical subtrees, so a diff can skip them without looking inside
+    def getSubtreeHash(self, workspaceCaseId: WorkspaceCaseId):
+        if workspaceCaseId in self._subtreeHashDict:
+            return self._subtreeHashDict.get(workspaceCaseId)
+
+        # iterative post-order, a child that is still on the stack closes a button loop and only counts by content
+        inProgressSet = set()
+        stack = [workspaceCaseId]
+        while len(stack) > 0:
+            currentWorkspaceCaseId = stack[-1]
+            if currentWorkspaceCaseId in self._subtreeHashDict:
+                stack.pop()
+                continue
+
+            if currentWorkspaceCaseId not in inProgressSet:
+                inProgressSet.add(currentWorkspaceCaseId)
+                for childWorkspaceCaseId in self.getChildren(currentWorkspaceCaseId):
+                    if childWorkspaceCaseId not in self._subtreeHashDict and childWorkspaceCaseId not in inProgressSet:
+                        stack.append(childWorkspaceCaseId)
+                continue
+
+            childHashList = list()
+            for childWorkspaceCaseId in self.getChildren(currentWorkspaceCaseId):
+                if childWorkspaceCaseId in self._subtreeHashDict:
+                    childHashList.append(self._subtreeHashDict.get(childWorkspaceCaseId))
+                else:
+                    childHashList.append(self.getNodeHash(childWorkspaceCaseId))
+            self._subtreeHashDict.update({currentWorkspaceCaseId: _digest(self.getNodeHash(currentWorkspaceCaseId), *childHashList)})
+            inProgressSet.discard(currentWorkspaceCaseId)
+            stack.pop()
+
+        return self._subtreeHashDict.get(workspaceCaseId)
+
+    # digest of a whole workspace, two workspaces with the same hash have the same nodes and edges
+    # button cycles no source reaches are folded in node by node, no subtree hash of a source covers them
+    def getWorkspaceHash(self, workspace: str):
+        workspaceHash = self._workspaceHashDict.get(workspace)
+        if workspaceHash == None:
+            sourceList = self.getSourceList(workspace)
+            reachedSet = set()
+            stack = list(sourceList)
+            while len(stack) > 0:
+                workspaceCaseId = stack.pop()
+                if workspaceCaseId not in reachedSet:
+                    reachedSet.add(workspaceCaseId)
+                    stack.extend(self.getChildren(workspaceCaseId))
+            unreachedList = [workspaceCaseId for workspaceCaseId in self._nodeDictByWorkspace.get(workspace, {}) if workspaceCaseId not in reachedSet]
+            workspaceHash = _digest(*[str(workspaceCaseId).encode() + self.getSubtreeHash(workspaceCaseId) for workspaceCaseId in sourceList + unreachedList])
+            self._workspaceHashDict.update({workspace: workspaceHash})
+        return workspaceHash
+
+    # every real node once, in input table order
+    def iterNodes(self, workspace: str = None):
+        if workspace != None:
+            yield from self._nodeDictByWorkspace.get(workspace, {}).values()
+            return
+        for workspaceNodeDict in self._nodeDictByWorkspace.values():
+            yield from workspaceNodeDict.values()
+
+    # pre-order walk from a node along button edges (and optionally JUMP_TO edges), visiting each real node once
+    def iterPreOrder(self, startWorkspaceCaseId: WorkspaceCaseId, followJumpTo: bool = False):
+        visitedSet = set()
+        stack = [startWorkspaceCaseId]
+        while len(stack) > 0:
+            workspaceCaseId = stack.pop()
+            if workspaceCaseId in visitedSet:
+                continue
+            node = self.getNode(workspaceCaseId)
+            if node == None:
+                continue
+            visitedSet.add(workspaceCaseId)
+            yield node
+
+            if followJumpTo and workspaceCaseId in self._jumpToDict:
+                stack.append(self._jumpToDict.get(workspaceCaseId))
+            # reversed so the first button is visited first
+            stack.extend(reversed(self.getChildren(workspaceCaseId)))
 
 # A class for global object that handle everything about the dialog flow tree operation
 class DialogFlowForest:
     # Notice Python dictionary are pass by reference so we are actually playing around real node elements created
 
-    _nodeDictByWorkspace = {}
-    _workspaceTreeRootDict = {}
+    _graph = None
+    _projectedWorkspaceSet = set()
 
     def __init__(self):
-        # dictionary of workspace (key) and all nodes in their trees (value as set)
-        self._nodeDictByWorkspace = {}
-        ## dictionary of workspace (key) and their tree root (value)
-        self._workspaceTreeRootDict = {}
+        # the dialog flow graph holds every node and edge once
+        self._graph = DialogFlowGraph()
+        # anytree parent/children links are derived from the graph on first use, per workspace
+        self._projectedWorkspaceSet = set()
 
-    def __insertNode(self, workspace:str, node:Node):
-        if workspace in self._nodeDictByWorkspace.keys():
-            workspaceNodeSet = self._nodeDictByWorkspace.get(workspace)
-            workspaceNodeSet.add(node)
-        else:
-            self._nodeDictByWorkspace.update({workspace:{node}})
-
-    # Use the fact that WorkspaceCaseId is matched by workspace:case_id as equality
-    def __findNodeInWorkspace(self, workspaceCaseId: WorkspaceCaseId):
-        nodeSetinWorkspace = self._nodeDictByWorkspace.get(workspaceCaseId.getWorkspace())
-        if nodeSetinWorkspace == None:
-            raise Exception("workspace " + workspaceCaseId.getWorkspace() + " does not exist")
-        for node in nodeSetinWorkspace:
-            if node.name == str(workspaceCaseId):
-                return node
-        raise Exception(str(workspaceCaseId) + " does not exist")
+    def getNode(self, workspaceCaseId: WorkspaceCaseId):
+        return self._graph.getNode(workspaceCaseId)
+
+    def getGraph(self):
+        return self._graph
     
     def __createJumpToNode(self, workspaceCaseId: WorkspaceCaseId, respondIdList: list, jumpToCaseId: str):
         #print("__createJumpToNode " + str(workspaceCaseId))
         node = JumpToNode(workspaceCaseId, respondIdList, jumpToCaseId)
-        self.__insertNode(workspaceCaseId.getWorkspace(), node)
+        self._graph.addNode(node)
 
     def __createButtonCaseIdListNode (self, workspaceCaseId: WorkspaceCaseId, respondIdList: list, buttonCaseIdList : list, actionButtonIdList : list):
         #print("__createButtonCaseIdListNode " + str(workspaceCaseId))
         node = ButtonCaseIdListNode(workspaceCaseId, respondIdList, buttonCaseIdList, actionButtonIdList)
         if _isReservedCaseId(workspaceCaseId.getCaseId()):
-            self._workspaceTreeRootDict.update({workspaceCaseId.getWorkspace(): node})
-        self.__insertNode(workspaceCaseId.getWorkspace(), node)
+            self._graph.setRoot(workspaceCaseId)
+        self._graph.addNode(node)
 
     def __createLeafNode (self, workspaceCaseId: WorkspaceCaseId, respondIdList: list, procedureAdvisoryIdList: list):
         #print("__createLeafNode " + str(workspaceCaseId))
         node = LeafNode(workspaceCaseId, respondIdList, procedureAdvisoryIdList)
-        self.__insertNode(workspaceCaseId.getWorkspace(), node)
+        self._graph.addNode(node)
 
     #def createSwitchWorkspaceNode (self, workspaceCaseId: WorkspaceCaseId, respondIdList: str):
     #    #print("__createSwitchWorkspaceNode " + str(workspaceCaseId))
     #    raise Exception("not yet implemented")
 
-    def __connectParentChildren (self):
-        #print("***** tree root dictionary *****")
-        #print(self._workspaceTreeRootDict)
-        #print("***** forest dictionary *****")
-        #print(self._nodeDictByWorkspace)
-        #print("***** all nodes created *****")
-        for workspaceNodeSet in self._nodeDictByWorkspace.values():
-            #print(workspaceNodeSet)
-            for node in workspaceNodeSet:
-
-                if isinstance(node, ButtonCaseIdListNode):
+    def __createNodeFromRow(self, row: ParsedRow):
+        rowNumber, workspace, caseId, jumpToCase, respondIdList, actionButtonIdList, procedureAdvisoryIdList, buttonCaseIdList = row
+
+        # pre-scan already checked
+        #if isBlank(caseId):
+        #    raise Exception ("Case ID cannot be blank")
+        #
+        #if isBlank(workspace):
+        #    raise Exception ("Workspace cannot be blank")      
+        #
+        #if isBlank(respond_id_list):
+        #    raise Exception ("Respond ID List cannot be blank")  
+
+        if _isBlankParsed(jumpToCase) == False:
+            self.__createJumpToNode (WorkspaceCaseId(workspace, caseId), respondIdList, jumpToCase)
+        else:
+            if len(buttonCaseIdList) > 0:
+                self.__createButtonCaseIdListNode (WorkspaceCaseId(workspace, caseId), respondIdList, buttonCaseIdList, actionButtonIdList)
+            else:
+                # if switch workspace:
+                # TODO: switch workspace
+                # else:
+                self.__createLeafNode (WorkspaceCaseId(workspace, caseId), respondIdList, procedureAdvisoryIdList)
+
+    # Project the graph of a workspace onto anytree parent/children links for RenderTree, MermaidExporter and
+    # PreOrderIter users
+    def __connectParentChildren (self, workspace: str):
+        if workspace in self._projectedWorkspaceSet:
+            return
+
+        with instrumentedStage("connectParentChildren", workspace) as stage:
+            workspaceNodeList = list(self._graph.iterNodes(workspace))
+            stage.setItemCount(len(workspaceNodeList))
+            # links left over from an earlier projection of this workspace
+            for node in workspaceNodeList:
+                if len(node.children) > 0:
+                    node.children = []
+
+            for node in workspaceNodeList:
+                childWorkspaceCaseIdList = self._graph.getChildren(node.getWorkspaceCaseId())
+                if len(childWorkspaceCaseIdList) > 0:
                     buttonList = list()
-                    for buttonCaseId in node.getButtonCaseIdList():
-                        childNode = self.__findNodeInWorkspace(WorkspaceCaseId(node.getWorkspaceCaseId().getWorkspace(), buttonCaseId))
+                    for childWorkspaceCaseId in childWorkspaceCaseIdList:
+                        childNode = self._graph.getNode(childWorkspaceCaseId)
                         # Anytree workaround for multiple parents 
                         # Requires cloning a symlink child to articulate multiple parent relationship
+                        # every parent is tracked by the graph, the symlink only exists in this projection
                         if childNode.parent != None:
                             childNode = SymlinkNode(childNode)
-
-                            #TODO: we cannot properly track symlinked nodes in main symbol table without messing up our tree, likely from hitting the symlinked node
-                            #TODO: may need to review Anytree lifecycle if we wanted to track symlinked node
-                            #self.__insertNode(node.WORKSPACECASEID.getWorkspace(), childNode)
                         buttonList.append(childNode)
                     node.children = buttonList
-                    for childNode in buttonList:
-                        childNode.parent = node
-                else:
-                    # jump to is really a backward jump into a loop, that doesn't work well in a tree structure and cannot be handled in Anytree
-                    # We are going to handle JUMP_TO as leaf nodes that contains a jump target
-                    if isinstance(node, JumpToNode) == False and isinstance(node, LeafNode) == False:
-                        raise Exception ("switch context not yet implemented")
+
+        self._projectedWorkspaceSet.add(workspace)
+
+    # Node leaving the graph, cut it out of the anytree projection of its workspace, the rest is redone on next use
+    def __dropFromProjection(self, node: BaseNode):
+        workspace = node.getWorkspaceCaseId().getWorkspace()
+        if workspace in self._projectedWorkspaceSet:
+            node.parent = None
+            node.children = []
+            self._projectedWorkspaceSet.discard(workspace)
                     
-    def buildForrestFromInputTable(self, df):
-
-        for index, row in df.iterrows():
-            workspace = row.iloc[faq_column.get("WORKSPACE")-1]
-            caseId = row.iloc[faq_column.get("CASE_ID")-1]
-            jumpToCase = row.iloc[faq_column.get("JUMP_TO_CASE")-1]
-            respond_id_list = row.iloc[faq_column.get("RESPONSE_ID_LIST")-1]
-            action_button_id_list = row.iloc[faq_column.get("ACTION_BUTTON_ID_LIST")-1]
-            button_case_id_list = row.iloc[faq_column.get("BUTTON_CASE_ID_LIST")-1]
-            procedure_advisory_id_list = row.iloc[faq_column.get("PROCEDURE_ADVISORY_ID_LIST")-1]
-    
-            # pre-scan already checked
-            #if isBlank(caseId):
-            #    raise Exception ("Case ID cannot be blank")
-            #
-            #if isBlank(workspace):
-            #    raise Exception ("Workspace cannot be blank")      
-            #
-            #if isBlank(respond_id_list):
-            #    raise Exception ("Respond ID List cannot be blank")  
-
-            if (isBlank(respond_id_list)):
-                respondIdList = []
-            else:
-                respondIdList = [item.strip() for item in respond_id_list.split(",")]
-        
-            if isBlank(jumpToCase) == False:
-                self.__createJumpToNode (WorkspaceCaseId(workspace, caseId), respondIdList, jumpToCase)
-            else:
-                if isBlank(button_case_id_list) == False:
-                    buttonCaseIdList = [item.strip() for item in button_case_id_list.split(",")]
-                    actionButtonIdList = [item.strip() for item in action_button_id_list.split(",")]
-                    self.__createButtonCaseIdListNode (WorkspaceCaseId(workspace, caseId), respondIdList, buttonCaseIdList, actionButtonIdList)
-                else:
-                    # if switch workspace:
-                    # TODO: switch workspace
-                    # else:
-                    procedureAdvisoryIdList = []
-                    if isBlank(procedure_advisory_id_list) == False:
-                        procedureAdvisoryIdList = [item.strip() for item in procedure_advisory_id_list.split(",")]
-                    self.__createLeafNode (WorkspaceCaseId(workspace, caseId), respondIdList, procedureAdvisoryIdList)
-
-        self.__connectParentChildren()
-                        
+    # linkNodes False only creates the nodes, for a caller that validates the table before linking (see tablestream),
+    # linkForest() then connects them
+    def buildForrestFromInputTable(self, table, linkNodes: bool = True):
+        with instrumentedStage("buildForest") as stage:
+            rowCount = 0
+            for row in _iterParsedRows(table):
+                self.__createNodeFromRow(row)
+                rowCount += 1
+
+            if linkNodes:
+                self._graph.link()
+            stage.setItemCount(rowCount, "rows")
+            if stage.isActive():
+                stage.setDetail({"nodeCountByWorkspace": {workspace: len(self._graph.getNodeDict(workspace)) for workspace in self._graph.getWorkspaceList()}})
+
+    def linkForest(self):
+        self._graph.link()
+
+    ###############################################################################
+    # Incremental update from a row level change set, only touched nodes are replaced and relinked, their parents keep
+    # pointing at them by WorkspaceCaseId. Cached hashes of touched nodes and their ancestors are dropped.
+    def applyChangeSet(self, changeSet: RowChangeSet):
+        for workspaceCaseId in changeSet.getRemovedList():
+            removedNode = self._graph.removeNode(workspaceCaseId)
+            if removedNode != None:
+                self.__dropFromProjection(removedNode)
+
+        upsertWorkspaceCaseIdList = list()
+        for row in changeSet.getUpsertRowList():
+            workspaceCaseId = WorkspaceCaseId(row.workspace, row.caseId)
+            replacedNode = self._graph.removeNode(workspaceCaseId)
+            if replacedNode != None:
+                self.__dropFromProjection(replacedNode)
+            self.__createNodeFromRow(row)
+            upsertWorkspaceCaseIdList.append(workspaceCaseId)
+
+        self._graph.linkNodes(upsertWorkspaceCaseIdList)
+
+        # same as a full build, a button must not point to a case that is gone
+        for workspaceCaseId in changeSet.getRemovedList():
+            if self._graph.getNode(workspaceCaseId) == None and len(self._graph.getParents(workspaceCaseId)) > 0:
+                raise Exception(str(workspaceCaseId) + " does not exist")
+
+    # Remove nodes together with their edges, a remaining node must not have a button to a removed one
+    def removeNodeList(self, workspaceCaseIdList: list):
+        removedNodeList = list()
+        for workspaceCaseId in workspaceCaseIdList:
+            removedNode = self._graph.removeNode(workspaceCaseId)
+            if removedNode != None:
+                self.__dropFromProjection(removedNode)
+                removedNodeList.append(removedNode)
+
+        for workspaceCaseId in workspaceCaseIdList:
+            if len(self._graph.getParents(workspaceCaseId)) > 0:
+                raise Exception(str(workspaceCaseId) + " is still a button of " + str(self._graph.getParents(workspaceCaseId)[0]))
+        return removedNodeList
+
+    def getNodeDict(self, workspace: str):
+        return self._graph.getNodeDict(workspace)
+
+    # Impact analysis from the graph's reverse indexes, no tree walk. Results are WorkspaceCaseId tuples.
+    def getReferrers(self, workspaceCaseId: WorkspaceCaseId):
+        return self._graph.getReferrers(workspaceCaseId)
+
+    def getNodesByResponseId(self, responseId: str):
+        return self._graph.getNodesByResponseId(responseId)
+
+    def getNodesByActionButtonId(self, actionButtonId: str):
+        return self._graph.getNodesByActionButtonId(actionButtonId)
+
+    def getNodesByAdvisoryId(self, procedureAdvisoryId: str):
+        return self._graph.getNodesByAdvisoryId(procedureAdvisoryId)
+
+    # real root nodes, for graph traversals no tree projection is needed
+    def getRootNodeList(self):
+        return [self._graph.getNode(rootWorkspaceCaseId) for rootWorkspaceCaseId in self._graph.getRootDict().values()]
+
     def getTreeRootsList(self):
-        return list(self._workspaceTreeRootDict.values())
+        for workspace in self._graph.getRootDict().keys():
+            self.__connectParentChildren(workspace)
+        return self.getRootNodeList()
+
+    # Take over the workspaces of another forest, they must not be in this one yet
+    def mergeForest(self, other):
+        self._graph.mergeGraph(other.getGraph())
+
+    # projected tree root of one workspace, None when the workspace has no MIN_START
+    def getTreeRoot(self, workspace: str):
+        rootWorkspaceCaseId = self._graph.getRootDict().get(workspace)
+        if rootWorkspaceCaseId == None:
+            return None
+        self.__connectParentChildren(workspace)
+        return self._graph.getNode(rootWorkspaceCaseId)
+
+    def renderWorkspaceMermaid(self, workspace: str):
+        root = self.getTreeRoot(workspace)
+        if root == None:
+            return ""
+        from anytree.exporter import MermaidExporter
+        with instrumentedStage("renderMermaid", workspace) as stage:
+            lineList = [line + "\n" for line in MermaidExporter(root)]
+            stage.setItemCount(len(lineList), "lines")
+        return "".join(lineList)
 
     def printForest (self, fileStream):                
-        # tree dump
-        for root in self._workspaceTreeRootDict.values():
-            print(RenderTree(root, style=AsciiStyle()).by_attr(), file=fileStream)
+        # tree dump, line by line instead of building the whole dump first; flowrender streams from the graph with
+        # filters
+        for root in self.getTreeRootsList():
+            for pre, fill, node in RenderTree(root, style=AsciiStyle()):
+                print(pre + node.name, file=fileStream)
 
     def printMermaid(self, fileStream):
+        from anytree.exporter import MermaidExporter
         print ("```mermaid", file=fileStream)
-        for root in self._workspaceTreeRootDict.values():
-            for line in MermaidExporter(root):
-                print(line, file=fileStream)
+        for root in self.getTreeRootsList():
+            with instrumentedStage("printMermaid", root.getWorkspaceCaseId().getWorkspace()) as stage:
+                lineCount = 0
+                for line in MermaidExporter(root):
+                    print(line, file=fileStream)
+                    lineCount += 1
+                stage.setItemCount(lineCount, "lines")
         print ("```", file=fileStream)
 
+# A snapshot of one dialog tree for comparison
+# * default mode copies every real node once, a node shared by several menus is cloned on first visit and then
+#   referenced again through a SymlinkNode to the clone, so shared subtrees are not cloned once per path
+# * shareStructure mode copies nothing, the snapshot references the source nodes and keeps its own per-node state
+#   (the comparison flags) on the side, so several snapshots of the same forest share all unchanged nodes
 class ClonedDialogTree:
 
     _targetRoot = None
-    _nodeSet = set()
-
-    def __init__(self, sourceRoot: Node):
-        self._targetRoot = self.___cloneTreeRecursive(sourceRoot)
-        self._nodeSet = set()
+    _shareStructure = False
+    # dictionary of source WorkspaceCaseId (key) and its cloned node (value)
+    _clonedNodeDict = {}
+    # dictionary of WorkspaceCaseId (key) and comparison flag (value) recorded on this snapshot
+    _comparisonFlagDict = {}
+
+    def __init__(self, sourceRoot: Node, shareStructure: bool = False):
+        self._shareStructure = shareStructure
+        self._clonedNodeDict = {}
+        self._comparisonFlagDict = {}
+        if shareStructure:
+            self._targetRoot = sourceRoot
+        else:
+            with instrumentedStage("cloneTree", sourceRoot.getWorkspaceCaseId().getWorkspace()) as stage:
+                self._targetRoot = self.___cloneTree(sourceRoot)
+                stage.setItemCount(len(self._clonedNodeDict))
+
+    def ___cloneTree(self, sourceRoot: Node):
+        # Iterative cloner that go root first with an explicit stack, symlinks in the source are followed to their real
+        # node so the clone memo sees every path to a shared node. Children are only attached once all nodes exist,
+        # deepest parent first, so anytree's loop check on attach never has to walk a long ancestor path.
+        clonedRoot = None
+        # list of (cloned parent, list of cloned children) in the order parents were cloned
+        childrenListByParent = list()
+        stack = [(sourceRoot, None)]
+
+        while len(stack) > 0:
+            sourceNode, clonedSiblingList = stack.pop()
+            # a symlink in the source is just another path to a real node
+            if isinstance(sourceNode, SymlinkNode):
+                sourceNode = sourceNode.target
+
+            clonedNode = self._clonedNodeDict.get(sourceNode.getWorkspaceCaseId())
+            if clonedNode != None:
+                # already cloned through another path, link to the clone instead of cloning the subtree again
+                clonedNode = SymlinkNode(clonedNode)
+            else:
+                clonedNode = sourceNode.clone()
+                self._clonedNodeDict.update({sourceNode.getWorkspaceCaseId(): clonedNode})
+                if len(sourceNode.children) > 0:
+                    clonedChildrenList = list()
+                    childrenListByParent.append((clonedNode, clonedChildrenList))
+                    # pushed in reverse so the first child is cloned first and siblings keep their order
+                    for sourceChild in reversed(sourceNode.children):
+                        stack.append((sourceChild, clonedChildrenList))
+
+            if clonedSiblingList == None:
+                clonedRoot = clonedNode
+            else:
+                clonedSiblingList.append(clonedNode)
 
-    def ___cloneTreeRecursive(self, sourceNode: Node):
-        # Recursive cloner that go root first, this is needed as we support multiple parent and used SymlinkNode as workaround
-        # Hence a two pass implementing node creation pass and parent/children pass cannot be done
+        for clonedNode, clonedChildrenList in reversed(childrenListByParent):
+            clonedNode.children = clonedChildrenList
 
-        # clone this node
-        clonedNode = sourceNode.clone()
+        return clonedRoot
 
-        # for each child clone recurive and set up parent/child
-        if len(sourceNode.children) > 0:
-            childrenList = list()
+    def getRoot(self):
+        return self._targetRoot
 
-            for sourceChild in sourceNode.children:
-                clonedChild = self.___cloneTreeRecursive(sourceChild)
-                childrenList.append(clonedChild)
-                clonedChild.parent = clonedNode
-        
-            clonedNode.children = childrenList
+    def isShareStructure(self):
+        return self._shareStructure
 
-        return clonedNode
+    def __setComparisonSame(self, node: BaseNode, state: bool):
+        self._comparisonFlagDict.update({node.getWorkspaceCaseId(): state})
+        # shared nodes belong to the source forest, only private clones carry the flag themselves
+        if self._shareStructure == False:
+            node.setComparionSame(state)
 
-    def getRoot(self):
-        return self._targetRoot
+    def isComparedSame(self, node: BaseNode):
+        return self._comparisonFlagDict.get(node.getWorkspaceCaseId(), False)
     
-    def __setTreeRecursiveMarkDiffer(self, myTree):
-        myTree.setComparionSame(False)
-
-        for sourceChild in myTree.children:
-            self.__setTreeRecursiveMarkDiffer(sourceChild)
+    def __setTreeMarkDiffer(self, myTree):
+        stack = [myTree]
+        while len(stack) > 0:
+            node = stack.pop()
+            self.__setComparisonSame(node, False)
+            stack.extend(node.children)
     
-    def __compareTreeRecursive(self, myTree: BaseNode, otherTree: BaseNode):
-
-        # compare myself and other, continue if they are the same, set whole tree differs otherwise
-        if myTree.nodeComparison(otherTree):
-            myTree.setComparionSame(True)
-
-            # for each child do the same
-            for sourceChild in myTree.children:
-                foundMatchingChildFromOther = None
-                for targetChild in otherTree.children:
-                    if sourceChild.nodeComparison(targetChild):
-                        foundMatchingChildFromOther = targetChild
-                        break
-
-                if foundMatchingChildFromOther:
-                    self.__compareTreeRecursive(sourceChild, foundMatchingChildFromOther)
-                else:
-                    self.__setTreeRecursiveMarkDiffer(sourceChild)
-        else:
-            self.__setTreeRecursiveMarkDiffer(myTree)
+    def __compareTree(self, myTree: BaseNode, otherTree: BaseNode):
+        stack = [(myTree, otherTree)]
+        while len(stack) > 0:
+            myNode, otherNode = stack.pop()
+
+            # compare myself and other, continue if they are the same, set whole tree differs otherwise
+            if myNode.nodeComparison(otherNode):
+                self.__setComparisonSame(myNode, True)
+
+                # for each child do the same, siblings are matched by WorkspaceCaseId through a dictionary
+                otherChildDict = {targetChild.getWorkspaceCaseId(): targetChild for targetChild in otherNode.children}
+                for sourceChild in myNode.children:
+                    foundMatchingChildFromOther = otherChildDict.get(sourceChild.getWorkspaceCaseId())
+                    if foundMatchingChildFromOther != None and sourceChild.nodeComparison(foundMatchingChildFromOther) == False:
+                        foundMatchingChildFromOther = None
+
+                    if foundMatchingChildFromOther:
+                        stack.append((sourceChild, foundMatchingChildFromOther))
+                    else:
+                        self.__setTreeMarkDiffer(sourceChild)
+            else:
+                self.__setTreeMarkDiffer(myNode)
     
     def markMyDelta(self, other):
-        self.__compareTreeRecursive(self.getRoot(), other.getRoot())
+        with instrumentedStage("markDelta", self.getRoot().getWorkspaceCaseId().getWorkspace()) as stage:
+            self.__compareTree(self.getRoot(), other.getRoot())
+            stage.setItemCount(len(self._comparisonFlagDict))
 
     def printTree (self, fileStream):                
         # tree dump
         print(RenderTree(self.getRoot(), style=AsciiStyle()).by_attr(), file=fileStream)
     
     def printMermaid(self, fileStream):
+        from anytree.exporter import MermaidExporter
         print ("```mermaid", file=fileStream)
-        for line in MermaidExporter(self.getRoot(), indent=4, nodefunc=lambda node: '["%s"]' % (node.name) if node.isComparedSame() else '[\\"%s"/]' % (node.name) ):
+        for line in MermaidExporter(self.getRoot(), indent=4, nodefunc=lambda node: '["%s"]' % (node.name) if self.isComparedSame(node) else '[\\"%s"/]' % (node.name) ):
             print(line, file=fileStream)
         print ("```", file=fileStream) 
 
+# Structured result of comparing two dialog flow snapshots, per WorkspaceCaseId
+# * added: only in the new snapshot
+# * removed: only in the old snapshot
+# * changed: in both, with field level changes as dictionary of field name (key) and (old, new) value
+# * moved: in both, but the set of parent menus changed, as (old parents, new parents)
+class DialogFlowDelta:
+    _addedList = []
+    _removedList = []
+    _changedDict = {}
+    _movedDict = {}
+
+    def __init__(self):
+        self._addedList = []
+        self._removedList = []
+        self._changedDict = {}
+        self._movedDict = {}
+
+    def addAdded(self, workspaceCaseId: WorkspaceCaseId):
+        self._addedList.append(workspaceCaseId)
+
+    def addRemoved(self, workspaceCaseId: WorkspaceCaseId):
+        self._removedList.append(workspaceCaseId)
+
+    def addChanged(self, workspaceCaseId: WorkspaceCaseId, fieldChangeDict: dict):
+        self._changedDict.update({workspaceCaseId: fieldChangeDict})
+
+    def addMoved(self, workspaceCaseId: WorkspaceCaseId, oldParentList: tuple, newParentList: tuple):
+        self._movedDict.update({workspaceCaseId: (oldParentList, newParentList)})
+
+    def getAddedList(self):
+        return self._addedList
+
+    def getRemovedList(self):
+        return self._removedList
+
+    def getChangedDict(self):
+        return self._changedDict
+
+    def getMovedDict(self):
+        return self._movedDict
+
+    def getTouchedSet(self):
+        return set(self._addedList) | set(self._removedList) | set(self._changedDict.keys()) | set(self._movedDict.keys())
+
+    def isEmpty(self):
+        return len(self.getTouchedSet()) == 0
+
+    def printDelta(self, fileStream):
+        for workspaceCaseId in self._addedList:
+            print("+ " + str(workspaceCaseId), file=fileStream)
+        for workspaceCaseId in self._removedList:
+            print("- " + str(workspaceCaseId), file=fileStream)
+        for workspaceCaseId, fieldChangeDict in self._changedDict.items():
+            print("~ " + str(workspaceCaseId), file=fileStream)
+            for field, (oldValue, newValue) in fieldChangeDict.items():
+                print("    " + field + ": " + str(oldValue) + " -> " + str(newValue), file=fileStream)
+        for workspaceCaseId, (oldParentList, newParentList) in self._movedDict.items():
+            print("> " + str(workspaceCaseId) + ": " + str([str(parent) for parent in oldParentList]) + " -> " + str([str(parent) for parent in newParentList]), file=fileStream)
+
+# Hash based diff of two dialog flow snapshots (forests or their graphs)
+# Subtree hashes are computed once per snapshot and cached in its graph. The walk starts from the workspace sources,
+# skips any pair of subtrees with equal hash in O(1), and matches children by WorkspaceCaseId through dictionaries,
+# so the cost after hashing follows the size of the change. Everything is found in a single pass.
+class DialogFlowDiffEngine:
+
+    def __toGraph(self, snapshot):
+        if isinstance(snapshot, DialogFlowForest):
+            return snapshot.getGraph()
+        return snapshot
+
+    def __compareFields(self, oldNode: BaseNode, newNode: BaseNode):
+        oldFieldDict = dict(oldNode.getFieldList())
+        newFieldDict = dict(newNode.getFieldList())
+        fieldChangeDict = {}
+        for field in list(oldFieldDict.keys()) + [field for field in newFieldDict.keys() if field not in oldFieldDict]:
+            if oldFieldDict.get(field) != newFieldDict.get(field):
+                fieldChangeDict.update({field: (oldFieldDict.get(field), newFieldDict.get(field))})
+        return fieldChangeDict
+
+    def diff(self, oldSnapshot, newSnapshot):
+        with instrumentedStage("diff") as stage:
+            delta = self.__diffSnapshots(oldSnapshot, newSnapshot)
+            if stage.isActive():
+                stage.setItemCount(len(delta.getTouchedSet()))
+                stage.setDetail({"addedCount": len(delta.getAddedList()), "removedCount": len(delta.getRemovedList()), "changedCount": len(delta.getChangedDict()), "movedCount": len(delta.getMovedDict())})
+            return delta
+
+    def __diffSnapshots(self, oldSnapshot, newSnapshot):
+        oldGraph = self.__toGraph(oldSnapshot)
+        newGraph = self.__toGraph(newSnapshot)
+        delta = DialogFlowDelta()
+
+        # (workspace case id, in old, in new) to look at, and what was already looked at
+        stack = list()
+        visitedSet = set()
+        # nodes whose parent set may have changed, checked once at the end
+        movedCandidateSet = set()
+
+        oldWorkspaceList = oldGraph.getWorkspaceList()
+        newWorkspaceList = newGraph.getWorkspaceList()
+        # membership from the workspace lists, a stored version only unpacks the workspaces whose hash differs
+        oldWorkspaceSet = set(oldWorkspaceList)
+        newWorkspaceSet = set(newWorkspaceList)
+        # workspaces whose hash differs, the only ones walked
+        diffedWorkspaceList = []
+        for workspace in oldWorkspaceList + [workspace for workspace in newWorkspaceList if workspace not in oldWorkspaceSet]:
+            if workspace in oldWorkspaceSet and workspace in newWorkspaceSet:
+                if oldGraph.getWorkspaceHash(workspace) == newGraph.getWorkspaceHash(workspace):
+                    continue
+            diffedWorkspaceList.append(workspace)
+            for source in oldGraph.getSourceList(workspace) if workspace in oldWorkspaceSet else []:
+                stack.append(source)
+            for source in newGraph.getSourceList(workspace) if workspace in newWorkspaceSet else []:
+                stack.append(source)
+            # sources are where a parent-less node would appear or disappear
+            movedCandidateSet.update(stack)
+
+        # A button cycle no source reaches is not walked from the sources, its nodes are seeded once the sources are
+        # done. Nodes the walk skipped below an identical subtree are seeded too and skipped again on their hash.
+        unreachedSeeded = False
+        while True:
+            while len(stack) > 0:
+                workspaceCaseId = stack.pop()
+                if workspaceCaseId in visitedSet:
+                    continue
+                visitedSet.add(workspaceCaseId)
+
+                oldNode = oldGraph.getNode(workspaceCaseId)
+                newNode = newGraph.getNode(workspaceCaseId)
+
+                if oldNode == None:
+                    delta.addAdded(workspaceCaseId)
+                    for childWorkspaceCaseId in newGraph.getChildren(workspaceCaseId):
+                        movedCandidateSet.add(childWorkspaceCaseId)
+                        stack.append(childWorkspaceCaseId)
+                    continue
+
+                if newNode == None:
+                    delta.addRemoved(workspaceCaseId)
+                    for childWorkspaceCaseId in oldGraph.getChildren(workspaceCaseId):
+                        movedCandidateSet.add(childWorkspaceCaseId)
+                        stack.append(childWorkspaceCaseId)
+                    continue
+
+                # identical subtree, nothing below can differ
+                if oldGraph.getSubtreeHash(workspaceCaseId) == newGraph.getSubtreeHash(workspaceCaseId):
+                    continue
+
+                if oldGraph.getNodeHash(workspaceCaseId) != newGraph.getNodeHash(workspaceCaseId):
+                    delta.addChanged(workspaceCaseId, self.__compareFields(oldNode, newNode))
+
+                oldChildDict = dict.fromkeys(oldGraph.getChildren(workspaceCaseId))
+                newChildDict = dict.fromkeys(newGraph.getChildren(workspaceCaseId))
+                for childWorkspaceCaseId in oldChildDict:
+                    if childWorkspaceCaseId not in newChildDict:
+                        movedCandidateSet.add(childWorkspaceCaseId)
+                    stack.append(childWorkspaceCaseId)
+                for childWorkspaceCaseId in newChildDict:
+                    if childWorkspaceCaseId not in oldChildDict:
+                        movedCandidateSet.add(childWorkspaceCaseId)
+                        stack.append(childWorkspaceCaseId)
+
+            if unreachedSeeded:
+                break
+            unreachedSeeded = True
+            for workspace in diffedWorkspaceList:
+                for graph, workspaceSet in ((oldGraph, oldWorkspaceSet), (newGraph, newWorkspaceSet)):
+                    if workspace in workspaceSet:
+                        stack.extend([workspaceCaseId for workspaceCaseId in graph.getNodeDict(workspace) if workspaceCaseId not in visitedSet])
+
+        for workspaceCaseId in movedCandidateSet:
+            if oldGraph.getNode(workspaceCaseId) != None and newGraph.getNode(workspaceCaseId) != None:
+                oldParentList = oldGraph.getParents(workspaceCaseId)
+                newParentList = newGraph.getParents(workspaceCaseId)
+                if set(oldParentList) != set(newParentList):
+                    delta.addMoved(workspaceCaseId, oldParentList, newParentList)
+
+        return delta
+
 # Types of rows
 # 0. case ID MIN_START is a reserved name for root nodes
 # 1. Have jump to case ID
@@ -370,148 +1306,348 @@ class ClonedDialogTree:
 # * b) leaf: jump to case is handled as leaf to avoid closed loop in a tree structure
 #
     
+# Excel column letters of a 1 based column number, 1 -> A, 26 -> Z, 27 -> AA
+def _toColumnLetter(columnNumber: int):
+    letter = ""
+    while columnNumber > 0:
+        columnNumber, remainder = divmod(columnNumber - 1, 26)
+        letter = chr(ord('A') + remainder) + letter
+    return letter
+
+severity_error = "ERROR"
+severity_warning = "WARNING"
+
+class ValidationIssue(NamedTuple):
+    line: int
+    column: str
+    issue: str
+    severity: str
+    workspace: str
+
+    # the (cell, issue) form getIssueSet() reports
+    def toCellIssue(self):
+        return ((self.line, self.column), self.issue)
+
+# Raised by _logIssue when fail-fast reached its error count, caught by the pass that was running
+class ValidationStopped(Exception):
+    pass
+
+# Issues kept per workspace, so a workspace can be re-validated on its own, with row, column and severity indexes
+# built on first query after a change
+class IssueStore:
+    # dictionary of workspace (key) and set of ValidationIssue (value)
+    _issueDictByWorkspace = {}
+    _errorCount = 0
+    # dictionary of index name (key) and dictionary of row, column or severity to list of ValidationIssue (value)
+    _indexDict = None
+
+    def __init__(self):
+        self._issueDictByWorkspace = {}
+        self._errorCount = 0
+        self._indexDict = None
+
+    def add(self, issue: ValidationIssue):
+        workspaceIssueSet = self._issueDictByWorkspace.get(issue.workspace)
+        if workspaceIssueSet == None:
+            workspaceIssueSet = set()
+            self._issueDictByWorkspace.update({issue.workspace: workspaceIssueSet})
+        if issue not in workspaceIssueSet:
+            workspaceIssueSet.add(issue)
+            if issue.severity == severity_error:
+                self._errorCount += 1
+            self._indexDict = None
+
+    def removeWorkspace(self, workspace: str):
+        workspaceIssueSet = self._issueDictByWorkspace.pop(workspace, set())
+        self._errorCount -= len([issue for issue in workspaceIssueSet if issue.severity == severity_error])
+        self._indexDict = None
+
+    def merge(self, other):
+        for workspaceIssueSet in other._issueDictByWorkspace.values():
+            for issue in workspaceIssueSet:
+                self.add(issue)
+
+    def getErrorCount(self):
+        return self._errorCount
+
+    def getWorkspaceIssueSet(self, workspace: str):
+        return self._issueDictByWorkspace.get(workspace, set())
+
+    def __iter__(self):
+        for workspaceIssueSet in self._issueDictByWorkspace.values():
+            yield from workspaceIssueSet
+
+    def __len__(self):
+        return sum([len(workspaceIssueSet) for workspaceIssueSet in self._issueDictByWorkspace.values()])
+
+    def __indexIssues(self):
+        self._indexDict = {"line": {}, "column": {}, "severity": {}}
+        for issue in self:
+            for indexName, value in (("line", issue.line), ("column", issue.column), ("severity", issue.severity)):
+                index = self._indexDict.get(indexName)
+                if value in index:
+                    index.get(value).append(issue)
+                else:
+                    index.update({value: [issue]})
+
+    # issues matching every given criterion, sorted by cell
+    def getIssueList(self, line: int = None, column: str = None, severity: str = None):
+        if self._indexDict == None:
+            self.__indexIssues()
+        issueSet = None
+        for indexName, value in (("line", line), ("column", column), ("severity", severity)):
+            if value != None:
+                matchSet = set(self._indexDict.get(indexName).get(value, ()))
+                issueSet = matchSet if issueSet == None else issueSet & matchSet
+        if issueSet == None:
+            issueSet = set(self)
+        return sorted(issueSet, key=lambda issue: (issue.line, len(issue.column), issue.column, issue.issue))
+
 class InputTableValidator:
     # "Symbol table", a dictionary of workspace (key) and their defined Case ID set (value as set of case ID)
     _workspaceCaseIdDict = {}
-    # "Local reference table", a dictionary of workspace (key) and their referenced jump to Case ID set (value as set of case ID)
+    # "Local reference table", a dictionary of workspace (key) and their referenced jump to Case IDs (value as dictionary of case ID to
+    # list of referencing row numbers)
     _workspaceJumpToDict = {}
-    # "Local reference table", a dictionary of workspace (key) and their referenced button Case ID List set (value as set of case ID)
+    # "Local jump table", a dictionary of workspace (key) and their jump to nodes (value as dictionary of case ID to
+    # (jump to case ID, row number)), to find jump to loops without exit
+    _workspaceJumpToCaseDict = {}
+    # "Local reference table", a dictionary of workspace (key) and their referenced button Case IDs (value as dictionary of case ID to
+    # list of referencing row numbers)
     _workspaceButtonCaseIdListDict = {}
     # "Global reference table", a set of (workspace, case_id) of workspace switching reference
     _switchWorkspaceSet = set()
-    # a set of tuple (line, column, issue) to record problem we found
-    _issueSet = set()
+    # problems found, see IssueStore
+    _issueStore = None
+    # fail-fast, stop validating once this many errors are found, None validates everything
+    _maxErrorCount = None
+    _stopped = False
 
-    def __init__(self):
+    def __init__(self, maxErrorCount: int = None):
         self._workspaceCaseIdDict = {}
         self._workspaceJumpToDict = {}
+        self._workspaceJumpToCaseDict = {}
         self._workspaceButtonCaseIdListDict = {}
         self._switchWorkspaceSet = set()
-        self._issueSet = set()
+        self._issueStore = IssueStore()
+        self._maxErrorCount = maxErrorCount
+        self._stopped = False
+
+    def _logIssue(self, line:int, columnStr:str, issue:str, workspace:str = None, severity: str = severity_error):
+        self._issueStore.add(ValidationIssue(line, _toColumnLetter(faq_column.get(columnStr)), issue, severity, workspace))
+        if self._maxErrorCount != None and self._issueStore.getErrorCount() >= self._maxErrorCount:
+            self._stopped = True
+            raise ValidationStopped()
+
+    # True once fail-fast stopped a pass, the symbol tables and issues are then incomplete
+    def isStopped(self):
+        return self._stopped
+
+    def getIssueStore(self):
+        return self._issueStore
+
+    def getIssueSetByWorkspace(self, workspace: str):
+        return {issue.toCellIssue() for issue in self._issueStore.getWorkspaceIssueSet(workspace)}
 
-    def _logIssue(self, line:int, columnStr:str, issue:str):
-        columnOffset = faq_column.get(columnStr) - 1
-        if columnOffset > 25:
-            raise Exception ("not yet supported column beyond Z")
-        
-        self._issueSet.add(((line, chr(ord('A') + columnOffset)), issue))
-    
     def getIssueSet(self):
-        return self._issueSet
+        return {issue.toCellIssue() for issue in self._issueStore}
 
     ###############################################################################
     # Pre-scan pass for recording symbol tables for validation
-    def preScanPass(self, df):
-
-        # first data row in the except is row 2
-        rowNumber = 2
-
-        for index, row in df.iterrows():
-
-            workspace = row.iloc[faq_column.get("WORKSPACE")-1]
-            caseId = row.iloc[faq_column.get("CASE_ID")-1]
-            jumpToCase = row.iloc[faq_column.get("JUMP_TO_CASE")-1]
-            respond_id_list = row.iloc[faq_column.get("RESPONSE_ID_LIST")-1]
-            respondIdList = []
-            action_button_id_list = row.iloc[faq_column.get("ACTION_BUTTON_ID_LIST")-1]
-            actionButtonIdList = []
-            button_case_id_list = row.iloc[faq_column.get("BUTTON_CASE_ID_LIST")-1]
-            buttonCaseIdList = []
-    
-            if isBlank(caseId):
-                self._logIssue (rowNumber, "CASE_ID", "Case ID cannot be blank")
+    def preScanPass(self, table):
+        if self._stopped:
+            return
+        with instrumentedStage("preScanPass") as stage:
+            rowCount = 0
+            try:
+                for row in _iterParsedRows(table):
+                    self.__preScanRow(row)
+                    rowCount += 1
+            except ValidationStopped:
+                pass
+            stage.setItemCount(rowCount, "rows")
+
+    # dictionary of referenced case ID (key) and list of referencing row numbers (value) of a workspace
+    def __getWorkspaceReferenceDict(self, referenceDict: dict, workspace: str):
+        workspaceReferenceDict = referenceDict.get(workspace)
+        if workspaceReferenceDict == None:
+            workspaceReferenceDict = {}
+            referenceDict.update({workspace: workspaceReferenceDict})
+        return workspaceReferenceDict
+
+    def __preScanRow(self, row: ParsedRow):
+        rowNumber, workspace, caseId, jumpToCase, respondIdList, actionButtonIdList, procedureAdvisoryIdList, buttonCaseIdList = row
     
-            if isBlank(workspace):
-                self._logIssue (rowNumber, "WORKSPACE", "Workspace cannot be blank")    
+        if _isBlankParsed(caseId):
+            self._logIssue (rowNumber, "CASE_ID", "Case ID cannot be blank", workspace)
 
-            if isBlank(respond_id_list):
-                respondIdList = []    
-            else:
-                respondIdList = [item.strip() for item in respond_id_list.split(",")]
-
-            if isBlank(button_case_id_list) == False:
-                buttonCaseIdList = [item.strip() for item in button_case_id_list.split(",")]
-                if len(set(buttonCaseIdList)) != len(buttonCaseIdList):
-                    self._logIssue (rowNumber, "BUTTON_CASE_ID_LIST", "Button case ID list cannot contain duplicate entries")
-            
-            if isBlank(action_button_id_list) == False:
-                actionButtonIdList = [item.strip() for item in action_button_id_list.split(",")]
-                if len(set(actionButtonIdList)) != len(actionButtonIdList):
-                    self._logIssue (rowNumber, "ACTION_BUTTON_ID_LIST", "Action Button case ID list cannot contain duplicate entries")
-
-            # "Symbol table", a dictionary of workspace (key) and their defined Case ID set (value as set of case ID)
-            if workspace in self._workspaceCaseIdDict:
-                caseIdList = self._workspaceCaseIdDict.get(workspace)
-                if isBlank(caseId) == False:
-                    if caseId not in caseIdList:
-                        caseIdList.add(caseId)
-                    else:
-                        self._logIssue (rowNumber, "CASE_ID", "Case ID \'" + caseId + "\' is defined more than once in workspace \'" + workspace + "\'")
-            else:
-                self._workspaceCaseIdDict.update({workspace:{caseId}})
+        if _isBlankParsed(workspace):
+            self._logIssue (rowNumber, "WORKSPACE", "Workspace cannot be blank", workspace)    
 
-            # "Local reference table", a dictionary of workspace (key) and their referenced jump to/button list Case ID set (value as set of case ID))
-            if isBlank(jumpToCase) == False:
-                if workspace in self._workspaceJumpToDict:
-                    jumpToList = self._workspaceJumpToDict.get(workspace)
-                    jumpToList.add(jumpToCase)
+        if len(buttonCaseIdList) > 1 and len(set(buttonCaseIdList)) != len(buttonCaseIdList):
+            self._logIssue (rowNumber, "BUTTON_CASE_ID_LIST", "Button case ID list cannot contain duplicate entries", workspace)
+        
+        if len(actionButtonIdList) > 1 and len(set(actionButtonIdList)) != len(actionButtonIdList):
+            self._logIssue (rowNumber, "ACTION_BUTTON_ID_LIST", "Action Button case ID list cannot contain duplicate entries", workspace)
+
+        # "Symbol table", a dictionary of workspace (key) and their defined Case ID set (value as set of case ID)
+        if workspace in self._workspaceCaseIdDict:
+            caseIdList = self._workspaceCaseIdDict.get(workspace)
+            if _isBlankParsed(caseId) == False:
+                if caseId not in caseIdList:
+                    caseIdList.add(caseId)
                 else:
-                    self._workspaceJumpToDict.update({workspace:{jumpToCase}})
+                    self._logIssue (rowNumber, "CASE_ID", "Case ID \'" + caseId + "\' is defined more than once in workspace \'" + workspace + "\'", workspace)
+        else:
+            self._workspaceCaseIdDict.update({workspace:{caseId}})
 
-            # "Local reference table", a dictionary of workspace (key) and their referenced button Case ID List set (value as set of case ID)    
+        # "Local reference tables", the rows referencing every jump to/button Case ID are kept to report the exact cell
+        if _isBlankParsed(jumpToCase) == False:
+            jumpToDict = self.__getWorkspaceReferenceDict(self._workspaceJumpToDict, workspace)
+            if jumpToCase in jumpToDict:
+                jumpToDict.get(jumpToCase).append(rowNumber)
+            else:
+                jumpToDict.update({jumpToCase: [rowNumber]})
+            jumpToCaseDict = self.__getWorkspaceReferenceDict(self._workspaceJumpToCaseDict, workspace)
+            if _isBlankParsed(caseId) == False and caseId not in jumpToCaseDict:
+                jumpToCaseDict.update({caseId: (jumpToCase, rowNumber)})
+        if len(buttonCaseIdList) > 0:
+            buttonCaseIdDict = self.__getWorkspaceReferenceDict(self._workspaceButtonCaseIdListDict, workspace)
             for buttonCaseId in buttonCaseIdList:
-                if workspace in self._workspaceButtonCaseIdListDict:
-                    jumpToList = self._workspaceButtonCaseIdListDict.get(workspace)
-                    jumpToList.add(buttonCaseId)
+                if buttonCaseId in buttonCaseIdDict:
+                    buttonCaseIdDict.get(buttonCaseId).append(rowNumber)
                 else:
-                    self._workspaceButtonCaseIdListDict.update({workspace:{buttonCaseId}})
+                    buttonCaseIdDict.update({buttonCaseId: [rowNumber]})
 
-            # "Global reference table", a set of (workspace, case_id) of workspace switching reference
-            #_switchWorkspaceSet = set()
-            # TODO
-                    
-            ################ handling for this row ends here, handle next row ###################
-            rowNumber = rowNumber + 1
+        # "Global reference table", a set of (workspace, case_id) of workspace switching reference
+        #_switchWorkspaceSet = set()
+        # TODO
     
     ###############################################################################
     # validation pass for spotting malformed dialog flow input
-    # loop through the rows using iterrows()
-    def validationPass(self, df):
-            
-        # first data row in the except is row 2
-        #rowNumber = 2
-        #
-        #for index, row in df.iterrows():
-        #   TODO: do something\
-        #   
-            ################ handling for this row ends here, handle next row ###################
-            #rowNumber = rowNumber + 1
-            
+    # works on the symbol tables built by preScanPass, the table itself does not need to be parsed again
+    # crossWorkspace False leaves out the cross workspace references, for a validator that only saw some workspaces
+    def validationPass(self, table = None, crossWorkspace: bool = True):
+        if self._stopped:
+            return
+
+        #for row in _toParsedInputTable(table):
+        #   TODO: do something
+
+        with instrumentedStage("validationPass") as stage:
+            try:
+                workspaceList = list(self._workspaceJumpToDict.keys()) + [workspace for workspace in self._workspaceButtonCaseIdListDict.keys() if workspace not in self._workspaceJumpToDict]
+                stage.setItemCount(len(workspaceList), "workspaces")
+                for workspace in workspaceList:
+                    with instrumentedStage("validateWorkspace", workspace) as workspaceStage:
+                        workspaceStage.setItemCount(len(self._workspaceCaseIdDict.get(workspace, ())), "cases")
+                        self.__validateWorkspace(workspace)
+
+                if crossWorkspace:
+                    self.__validateSwitchWorkspace()
+            except ValidationStopped:
+                pass
+
+    # Validate all switch workspace case id are defined, the only check needing the symbol tables of every workspace
+    def crossWorkspacePass(self):
+        if self._stopped:
+            return
+        try:
+            self.__validateSwitchWorkspace()
+        except ValidationStopped:
+            pass
+
+    def __validateSwitchWorkspace(self):
+        for switchWorkspace, switchCaseId in self._switchWorkspaceSet:
+            if switchCaseId not in self._workspaceCaseIdDict.get(switchWorkspace, ()):
+                self._logIssue (1, "ID", "Switch workspace case ID \'" + switchCaseId + "\' is not defined in workspace " + switchWorkspace)
+
+    # Take over the symbol tables and issues of a validator that scanned other workspaces, such as a shard validated in
+    # another process, crossWorkspacePass() is left to the caller once everything is merged
+    def mergeValidator(self, other):
+        self._workspaceCaseIdDict.update(other._workspaceCaseIdDict)
+        self._workspaceJumpToDict.update(other._workspaceJumpToDict)
+        self._workspaceJumpToCaseDict.update(other._workspaceJumpToCaseDict)
+        self._workspaceButtonCaseIdListDict.update(other._workspaceButtonCaseIdListDict)
+        self._switchWorkspaceSet.update(other._switchWorkspaceSet)
+        self._issueStore.merge(other._issueStore)
+        self._stopped = self._stopped or other._stopped
+
+    # Undefined references of a workspace in one set difference of referenced and defined case IDs, then one issue per
+    # referencing cell
+    def __validateWorkspace(self, workspace: str):
         # Validate all jump-to are defined
-        for workspace in self._workspaceJumpToDict.keys():
+        if workspace in self._workspaceJumpToDict:
             if workspace in self._workspaceCaseIdDict:
-                for jumpToCaseId in self._workspaceJumpToDict.get(workspace):
-                    if jumpToCaseId not in self._workspaceCaseIdDict.get(workspace):
-                        self._logIssue (1, "ID", "Jump to case ID \'" + jumpToCaseId + "\' is not defined in workspace " + workspace)
+                jumpToDict = self._workspaceJumpToDict.get(workspace)
+                for jumpToCaseId in sorted(jumpToDict.keys() - self._workspaceCaseIdDict.get(workspace)):
+                    for rowNumber in jumpToDict.get(jumpToCaseId):
+                        self._logIssue (rowNumber, "JUMP_TO_CASE", "Jump to case ID \'" + jumpToCaseId + "\' is not defined in workspace " + workspace, workspace)
             else:
                 raise Exception("Internal Error")  # this should never happen, as jump to is always same workspace
+            self.__validateJumpToLoops(workspace)
 
         # Validate all button case id list are defined
-        for workspace in self._workspaceButtonCaseIdListDict.keys():
+        if workspace in self._workspaceButtonCaseIdListDict:
             if workspace in self._workspaceCaseIdDict:
-                for buttonCaseId in self._workspaceButtonCaseIdListDict.get(workspace):
-                    if buttonCaseId not in self._workspaceCaseIdDict.get(workspace):
-                        self._logIssue (1, "ID", "Button case ID list \'" + buttonCaseId + "\' is not defined in workspace " + workspace)
+                buttonCaseIdDict = self._workspaceButtonCaseIdListDict.get(workspace)
+                for buttonCaseId in sorted(buttonCaseIdDict.keys() - self._workspaceCaseIdDict.get(workspace)):
+                    for rowNumber in buttonCaseIdDict.get(buttonCaseId):
+                        self._logIssue (rowNumber, "BUTTON_CASE_ID_LIST", "Button case ID list \'" + buttonCaseId + "\' is not defined in workspace " + workspace, workspace)
             else:
                 raise Exception("Internal Error")  # this should never happen, as button case ID is always in same workspace
 
-        # Validate all switch workspace case id are defined   
-        #for switchWorkspaceItem in self._switchWorkspaceSet:
-        #    if switchWorkspaceItem.value() not in self._workspaceCaseIdDict.get(switchWorkspaceItem.key()):
-        #        self._logIssue (1, "ID", "Switch workspace case ID \'" + switchWorkspaceItem.value() + "\' is not defined in workspace " + switchWorkspaceItem.key())
-            
-        
+    # Validate no chain of jump to nodes comes back to itself, the dialog would jump forever without waiting for the
+    # user. Every chain is followed once, each jump to node in a loop gets one issue on its jump to cell.
+    def __validateJumpToLoops(self, workspace: str):
+        jumpToCaseDict = self._workspaceJumpToCaseDict.get(workspace, {})
+        # dictionary of case ID (key) and the chain start it was first reached from (value)
+        reachedFromDict = {}
+        for startCaseId in jumpToCaseDict.keys():
+            caseId = startCaseId
+            chainList = []
+            while caseId in jumpToCaseDict and caseId not in reachedFromDict:
+                reachedFromDict.update({caseId: startCaseId})
+                chainList.append(caseId)
+                caseId = jumpToCaseDict.get(caseId)[0]
+            # only a loop closed within this chain is new, one reached from an earlier chain was reported with it
+            if reachedFromDict.get(caseId) == startCaseId and caseId in jumpToCaseDict:
+                for loopCaseId in chainList[chainList.index(caseId):]:
+                    jumpToCase, rowNumber = jumpToCaseDict.get(loopCaseId)
+                    self._logIssue (rowNumber, "JUMP_TO_CASE", "Jump to case ID \'" + jumpToCase + "\' of \'" + loopCaseId + "\' is a loop without exit in workspace " + workspace, workspace)
 
+    ###############################################################################
+    # Incremental re-validation after an edit, symbol tables and issues are kept per workspace so only the workspaces
+    # touched by the change set are scanned and validated again. Workspaces whose rows only moved in the sheet are
+    # redone too when they have issues, since issues carry row numbers.
+    # Workspaces are redone in sheet order, so fail-fast stops at the same issues every time. A validator fail-fast
+    # already stopped is left as it is, like the passes leave it.
+    def applyChangeSet(self, newTable: ParsedInputTable, changeSet: RowChangeSet):
+        if self._stopped:
+            return
+
+        workspaceSet = set(changeSet.getAffectedWorkspaceSet())
+        for workspace in changeSet.getRenumberedWorkspaceSet():
+            if len(self._issueStore.getWorkspaceIssueSet(workspace)) > 0:
+                workspaceSet.add(workspace)
+        # workspaces without rows left in newTable only lose their tables and issues
+        workspaceList = [workspace for workspace in newTable.getWorkspaceList() if workspace in workspaceSet]
+
+        for workspace in workspaceSet:
+            self._workspaceCaseIdDict.pop(workspace, None)
+            self._workspaceJumpToDict.pop(workspace, None)
+            self._workspaceJumpToCaseDict.pop(workspace, None)
+            self._workspaceButtonCaseIdListDict.pop(workspace, None)
+            self._issueStore.removeWorkspace(workspace)
+
+        try:
+            for workspace in workspaceList:
+                for row in newTable.getRowListByWorkspace(workspace):
+                    self.__preScanRow(row)
+                self.__validateWorkspace(workspace)
+        except ValidationStopped:
+            pass
+        
 ###############################################################################
 # Code emmission pass, iterate tree and generate rules
 #
@@ -588,6 +1724,86 @@ class InputTableValidator:
 #   
 #   The rule execution can be implemented as Drools rules where each row is a business rule, each node have it's own dedicated rules filtered by CASE_ID
 
+###############################################################################
+# DRL rule generation
+#
+# Rules are rendered from the templates below into one string per workspace and written with a single write. The
+# renderer works on plain rule records instead of nodes, so workspaces can be rendered in worker processes without
+# shipping the forest to them.
+
+# bump whenever the generated rules change for the same input, it is part of the build cache key
+drl_generator_version = "2"
+
+drl_separator = "##############\n"
+
+drl_header_template = (drl_separator +
+                       "import xxx.group.pa.dialog.flow.*;\n"
+                       "import org.apache.commons.collections.CollectionUtils;\n"
+                       "\n"
+                       "global xxx.group.pa.dialog.service.DialogService ds\n"
+                       "\n" +
+                       drl_separator)
+
+drl_rule_comment_template = "# %s %s\n"
+
+drl_rule_template = ("rule \"%s\"\n"
+                     "when\n"
+                     "    $dialog: Dialog(current_case_id == %s)\n"
+                     "then\n"
+                     "%s"
+                     "end\n")
+
+drl_set_buttons_template = "    $dialog.getOutput().setButtons(RuleUtil.setButtons(%s))\n"
+drl_jump_to_template = "    $dialog.getContext().put(\"jump_to\", \"%s\");\n"
+drl_procedure_advisory_template = "    dialog.getOutput().setProcedureAdvisoryIds(\"%s\")\n"
+drl_leaf_todo_template = "    #TODO: leaf node\n"
+drl_responds_template = "    $dialog.responds(%s)\n"
+
+# Everything a rule is rendered from, picklable so it can be sent to a worker process
+class DrlRuleRecord(NamedTuple):
+    nodeType: str
+    name: str
+    caseId: str
+    respondIdList: tuple
+    buttonCaseIdList: tuple
+    jumpToCaseId: str
+    procedureAdvisoryIdList: tuple
+
+def _renderIdList(idList: tuple):
+    return "[" + ", ".join(["'" + id + "'" for id in idList]) + "]"
+
+def _renderDrlRuleBody(record: DrlRuleRecord):
+    body = ""
+    if record.nodeType == "ButtonCaseIdListNode":
+        body = drl_set_buttons_template % _renderIdList(record.buttonCaseIdList)
+    elif record.nodeType == "JumpToNode":
+        body = drl_jump_to_template % record.jumpToCaseId
+    elif record.nodeType == "LeafNode":
+        if len(record.procedureAdvisoryIdList) > 0:
+            body = drl_procedure_advisory_template % _renderIdList(record.procedureAdvisoryIdList)
+        else:
+            body = drl_leaf_todo_template
+    if len(record.respondIdList) > 0:
+        body = body + drl_responds_template % record.respondIdList[0]
+    return body
+
+def _renderDrlRule(record: DrlRuleRecord):
+    return (drl_rule_comment_template % (record.nodeType, record.name) +
+            drl_rule_template % (record.name, record.caseId, _renderDrlRuleBody(record)))
+
+def _renderDrlWorkspace(recordList: list):
+    partList = [drl_header_template]
+    for record in recordList:
+        partList.append(_renderDrlRule(record))
+        partList.append(drl_separator)
+    return "".join(partList)
+
+# worker process entry: render one workspace and write it in one go
+def _writeDrlWorkspace(filePath: str, recordList: list):
+    with open(filePath, "w") as fileStream:
+        fileStream.write(_renderDrlWorkspace(recordList))
+    return filePath
+
 class NodeToDrlRulePrinterSingleton:
     _instance = None
 
@@ -596,44 +1812,68 @@ class NodeToDrlRulePrinterSingleton:
             cls._instance = super(NodeToDrlRulePrinterSingleton, cls).__new__(cls)
         return cls._instance
 
+    def toRuleRecord(self, node: BaseNode):
+        nodeType = type(node).__name__
+        buttonCaseIdList = ()
+        jumpToCaseId = None
+        procedureAdvisoryIdList = ()
+        if isinstance(node, ButtonCaseIdListNode):
+            buttonCaseIdList = node.getButtonCaseIdList()
+        elif isinstance(node, JumpToNode):
+            jumpToCaseId = node.getJumpToCaseId()
+        elif isinstance(node, LeafNode):
+            procedureAdvisoryIdList = node.getProcedureAdvisoryIdList()
+        elif isinstance(node, SymlinkNode) == False: # rule is already emitted by true node, symlink does not need a rule
+            raise Exception("type " + str(type(node)) + " is not yet implemented")
+        return DrlRuleRecord(nodeType, node.name, node.getWorkspaceCaseId().getCaseId(), node.getRespondIdList(),
+                             buttonCaseIdList, jumpToCaseId, procedureAdvisoryIdList)
+
+    # rule records of a workspace, every real node once in dialog order, jump to targets included
+    def getRuleRecordList(self, forest: DialogFlowForest, workspace: str):
+        graph = forest.getGraph()
+        rootWorkspaceCaseId = graph.getRootDict().get(workspace)
+        if rootWorkspaceCaseId == None:
+            return []
+        return [self.toRuleRecord(node) for node in graph.iterPreOrder(rootWorkspaceCaseId, followJumpTo=True)
+                if node.getWorkspaceCaseId().getWorkspace() == workspace]
+
     def printHeader(self, fileStream: TextIOBase):
-        print("##############", file=fileStream)
-        print("import xxx.group.pa.dialog.flow.*;", file=fileStream)
-        print("import org.apache.commons.collections.CollectionUtils;", file=fileStream)
-        print("", file=fileStream)
-        print("global xxx.group.pa.dialog.service.DialogService ds", file=fileStream)
-        print("", file=fileStream)
-        print("##############", file=fileStream)
-
-    def printRuleCommentForNode (self, node: Node, fileStream: TextIOBase):
-        print("# " + str(node), file=fileStream)
-
-    def __generateUiCommandFromButtonList(self, buttonCaseIdList: list):
-        return str(buttonCaseIdList)
-    
-    def __generateProcedureAdvisoryList(self, buttonCaseIdList: list):
-        return str(buttonCaseIdList)
+        fileStream.write(drl_header_template)
+
+    def printRuleCommentForNode (self, node: BaseNode, fileStream: TextIOBase):
+        fileStream.write(drl_rule_comment_template % (type(node).__name__, node.name))
 
     def printRuleForNode(self, node: BaseNode, fileStream: TextIOBase):
-        print("rule \"" + node.name + "\"", file=fileStream)
-        print("when", file=fileStream)
-        print("    $dialog: Dialog(current_case_id == " + node.getWorkspaceCaseId().getCaseId() + ")", file=fileStream)
-        print("then", file=fileStream)
-        
-        if isinstance(node, ButtonCaseIdListNode):
-            print("    $dialog.getOutput().setButtons(RuleUtil.setButtons(" + self.__generateUiCommandFromButtonList(node.getButtonCaseIdList()) + "))", file=fileStream)
-        else:
-            if isinstance(node, JumpToNode):
-                print("    $dialog.getContext().put(\"jump_to\", \"" + node.getJumpToCaseId() + "\");", file=fileStream)
+        record = self.toRuleRecord(node)
+        fileStream.write(drl_rule_template % (record.name, record.caseId, _renderDrlRuleBody(record)))
+
+    def renderWorkspace(self, forest: DialogFlowForest, workspace: str):
+        with instrumentedStage("renderDrl", workspace) as stage:
+            recordList = self.getRuleRecordList(forest, workspace)
+            stage.setItemCount(len(recordList), "rules")
+            return _renderDrlWorkspace(recordList)
+
+    def printWorkspace(self, forest: DialogFlowForest, workspace: str, fileStream: TextIOBase):
+        fileStream.write(self.renderWorkspace(forest, workspace))
+
+    # one <workspace>.drl per workspace with a root, rendered and written in a process pool when processCount > 1
+    # returns dictionary of workspace (key) and file path (value)
+    def generateDrlFiles(self, forest: DialogFlowForest, outputDirectory: str, processCount: int = 1):
+        filePathDict = {}
+        jobList = []
+        with instrumentedStage("generateDrlFiles") as stage:
+            for workspace in forest.getGraph().getRootDict().keys():
+                filePath = os.path.join(outputDirectory, workspace + ".drl")
+                filePathDict[workspace] = filePath
+                jobList.append((filePath, self.getRuleRecordList(forest, workspace)))
+            stage.setItemCount(sum([len(recordList) for filePath, recordList in jobList]), "rules")
+
+            if processCount > 1 and len(jobList) > 1:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=processCount) as executor:
+                    for future in [executor.submit(_writeDrlWorkspace, filePath, recordList) for filePath, recordList in jobList]:
+                        future.result()
             else:
-                if isinstance(node, LeafNode):
-                    if len(node.getProcedureAdvisoryIdList()) > 0:
-                        print("    dialog.getOutput().setProcedureAdvisoryIds(\"" + self.__generateProcedureAdvisoryList(node.getProcedureAdvisoryIdList()) +"\")", file=fileStream)
-                    else:
-                        print("    #TODO: leaf node", file=fileStream)
-                else:
-                    if isinstance(node, SymlinkNode) == False: # rule is already emitted by true node, symlink does not need a rule
-                        raise Exception("type " + str(type(node)) + " is not yet implemented")
-        if len(node.getRespondIdList()) > 0:        
-            print("    $dialog.responds(" + node.getRespondIdList()[0] +")")
-        print("end", file=fileStream)
+                for filePath, recordList in jobList:
+                    _writeDrlWorkspace(filePath, recordList)
+        return filePathDict
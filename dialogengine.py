@@ -0,0 +1,106 @@
+from typing import NamedTuple
+from chatdialogflow import WorkspaceCaseId, BaseNode, JumpToNode, ButtonCaseIdListNode, LeafNode, DialogFlowForest
+
+###############################################################################
+# In-process dialog execution engine
+#
+# Compiled once from a DialogFlowForest into flat dispatch tables, a turn is then a dictionary lookup instead of a
+# rule engine match on current_case_id.
+#
+# Input: context (current node), selection input (button case ID) or intent (selected node)
+# Output: response IDs, new context (next node), buttons
+#
+# Following GeneralFaqService.processCase(), the node hit by the turn provisions the responses, action buttons and
+# procedure advisories, and the next case provisions the navigation buttons. For a jump to node the next case is the
+# jump target (jump chains are followed to the end at compile time), for any other node it is the node itself.
+
+# Everything a turn returns, precomputed per node and shared by every turn hitting that node
+class DialogAction(NamedTuple):
+    hitWorkspaceCaseId: WorkspaceCaseId
+    respondIdList: tuple
+    actionButtonIdList: tuple
+    procedureAdvisoryIdList: tuple
+    nextWorkspaceCaseId: WorkspaceCaseId
+    buttonCaseIdList: tuple
+
+class DialogEngine:
+    # dictionary of WorkspaceCaseId (key) and DialogAction executed when that node is hit (value)
+    _actionDict = {}
+    # dictionary of WorkspaceCaseId (key) and dictionary of button case ID to DialogAction of the selected button (value)
+    _buttonDispatchDict = {}
+    # dictionary of workspace (key) and DialogAction of its MIN_START root (value)
+    _rootActionDict = {}
+
+    def __init__(self, forest: DialogFlowForest):
+        self._actionDict = {}
+        self._buttonDispatchDict = {}
+        self._rootActionDict = {}
+        self.__compile(forest)
+
+    # follow jump to redirects until a node that is not a jump, that is where the dialog continues
+    def __resolveNextCase(self, forest: DialogFlowForest, node: BaseNode):
+        visitedSet = {node.getWorkspaceCaseId()}
+        while isinstance(node, JumpToNode):
+            targetWorkspaceCaseId = forest.getGraph().getJumpToTarget(node.getWorkspaceCaseId())
+            if targetWorkspaceCaseId in visitedSet:
+                raise Exception("jump to loop without exit at " + str(targetWorkspaceCaseId))
+            node = forest.getNode(targetWorkspaceCaseId)
+            if node == None:
+                raise Exception(str(targetWorkspaceCaseId) + " does not exist")
+            visitedSet.add(targetWorkspaceCaseId)
+        return node
+
+    def __compile(self, forest: DialogFlowForest):
+        for node in forest.getGraph().iterNodes():
+            nextNode = self.__resolveNextCase(forest, node)
+
+            actionButtonIdList = ()
+            procedureAdvisoryIdList = ()
+            if isinstance(node, ButtonCaseIdListNode):
+                actionButtonIdList = node.getActionButtonIdList()
+            if isinstance(node, LeafNode):
+                procedureAdvisoryIdList = node.getProcedureAdvisoryIdList()
+            buttonCaseIdList = ()
+            if isinstance(nextNode, ButtonCaseIdListNode):
+                buttonCaseIdList = nextNode.getButtonCaseIdList()
+
+            self._actionDict.update({node.getWorkspaceCaseId(): DialogAction(node.getWorkspaceCaseId(),
+                                                                             node.getRespondIdList(),
+                                                                             actionButtonIdList,
+                                                                             procedureAdvisoryIdList,
+                                                                             nextNode.getWorkspaceCaseId(),
+                                                                             buttonCaseIdList)})
+
+        # buttons are dispatched from the context the bot is in after a turn, that is the next case of every action
+        for node in forest.getGraph().iterNodes():
+            workspaceCaseId = node.getWorkspaceCaseId()
+            self._buttonDispatchDict.update({workspaceCaseId: {childWorkspaceCaseId.getCaseId(): self._actionDict.get(childWorkspaceCaseId)
+                                                               for childWorkspaceCaseId in forest.getGraph().getChildren(workspaceCaseId)}})
+
+        for workspace, rootWorkspaceCaseId in forest.getGraph().getRootDict().items():
+            self._rootActionDict.update({workspace: self._actionDict.get(rootWorkspaceCaseId)})
+
+    # first turn of a conversation in a workspace
+    def start(self, workspace: str):
+        action = self._rootActionDict.get(workspace)
+        if action == None:
+            raise Exception("workspace " + str(workspace) + " has no root")
+        return action
+
+    # selection input: the context is set to the selected button of the current node, then that node is executed
+    def executeTurn(self, currentWorkspaceCaseId: WorkspaceCaseId, buttonCaseId: str):
+        buttonDispatchDict = self._buttonDispatchDict.get(currentWorkspaceCaseId)
+        action = None if buttonDispatchDict == None else buttonDispatchDict.get(buttonCaseId)
+        if action == None:
+            raise Exception(buttonCaseId + " is not a button of " + str(currentWorkspaceCaseId))
+        return action
+
+    # intent: the context is set to the node the intent selected, then that node is executed
+    def executeIntent(self, workspaceCaseId: WorkspaceCaseId):
+        action = self._actionDict.get(workspaceCaseId)
+        if action == None:
+            raise Exception(str(workspaceCaseId) + " does not exist")
+        return action
+
+    def getAction(self, workspaceCaseId: WorkspaceCaseId):
+        return self._actionDict.get(workspaceCaseId)
@@ -0,0 +1,228 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+from chatdialogflow import WorkspaceCaseId
+from dialogengine import DialogEngine, DialogAction
+
+###############################################################################
+# Async batched multi-session serving on top of the compiled DialogEngine
+#
+# Turns of many sessions are resolved in batches against one shared, immutable DialogEngine. The only per turn state
+# is the session context (current WorkspaceCaseId), kept in a pluggable SessionContextStore that is read and written
+# once per batch. Outputs are the engine's precomputed DialogAction, no tree objects are allocated per request.
+#
+# The engine can be swapped while serving (see hotreload), a batch reads the engine once and finishes on it. Sessions
+# whose context was removed by the new version are moved to the remapped context on their next turn, or drained
+# when there is nothing left to move them to.
+
+# A turn of a session. currentWorkspaceCaseId None means the context stored for the session, buttonCaseId None means
+# an intent selecting currentWorkspaceCaseId itself.
+class DialogTurn(NamedTuple):
+    sessionId: str
+    currentWorkspaceCaseId: WorkspaceCaseId
+    buttonCaseId: str
+
+# action is None when the turn failed, error tells why; a failed turn leaves the session context unchanged
+class DialogTurnResult(NamedTuple):
+    sessionId: str
+    action: DialogAction
+    error: str
+
+# Session context store interface, batched so that remote stores take one round trip per batch. A store missing one
+# of the methods fails when it is created, not in the middle of a batch.
+class SessionContextStore(ABC):
+    # list of WorkspaceCaseId (None for unknown sessions) in the order of sessionIdList
+    @abstractmethod
+    async def getContextList(self, sessionIdList: list):
+        pass
+
+    # dictionary of session ID (key) and WorkspaceCaseId (value)
+    @abstractmethod
+    async def setContextDict(self, contextDict: dict):
+        pass
+
+    @abstractmethod
+    async def removeSessionList(self, sessionIdList: list):
+        pass
+
+class InMemorySessionContextStore(SessionContextStore):
+    # dictionary of session ID (key) and current WorkspaceCaseId (value)
+    _contextDict = {}
+
+    def __init__(self):
+        self._contextDict = {}
+
+    async def getContextList(self, sessionIdList: list):
+        return [self._contextDict.get(sessionId) for sessionId in sessionIdList]
+
+    async def setContextDict(self, contextDict: dict):
+        self._contextDict.update(contextDict)
+
+    async def removeSessionList(self, sessionIdList: list):
+        for sessionId in sessionIdList:
+            self._contextDict.pop(sessionId, None)
+
+    def getSessionCount(self):
+        return len(self._contextDict)
+
+class DialogSessionServer:
+    # (DialogEngine, dictionary of removed WorkspaceCaseId (key) and the context to continue from, None to drain
+    # (value)), replaced as one reference so readers never see an engine with the remap of another
+    _servingState = (None, {})
+    _sessionContextStore = None
+    # turns submitted one by one waiting for the next batch, list of (DialogTurn, future)
+    _pendingList = []
+    _maxBatchSize = 1024
+    _batchTask = None
+    _wakeUpEvent = None
+
+    def __init__(self, dialogEngine: DialogEngine, sessionContextStore: SessionContextStore = None, maxBatchSize: int = 1024):
+        self._servingState = (dialogEngine, {})
+        self._sessionContextStore = sessionContextStore if sessionContextStore != None else InMemorySessionContextStore()
+        self._pendingList = []
+        self._maxBatchSize = maxBatchSize
+        self._batchTask = None
+        self._wakeUpEvent = None
+
+    def getSessionContextStore(self):
+        return self._sessionContextStore
+
+    def getDialogEngine(self):
+        return self._servingState[0]
+
+    # Serve from dialogEngine from the next batch on. remapDict maps the contexts the new engine no longer has to where
+    # their sessions continue, None drains the session. Remaps of earlier swaps are carried over, so a session idle
+    # across several reloads still lands on a context of the current engine.
+    def swapDialogEngine(self, dialogEngine: DialogEngine, remapDict: dict = None):
+        if remapDict == None:
+            remapDict = {}
+        previousDialogEngine, previousRemapDict = self._servingState
+        combinedRemapDict = {}
+        for workspaceCaseId, remappedWorkspaceCaseId in previousRemapDict.items():
+            action = dialogEngine.getAction(workspaceCaseId)
+            if action != None:
+                # a context again in the new version
+                if action.nextWorkspaceCaseId == workspaceCaseId:
+                    continue
+                # still a jump, sessions sitting on it continue from where it leads now
+                combinedRemapDict[workspaceCaseId] = action.nextWorkspaceCaseId
+                continue
+            combinedRemapDict[workspaceCaseId] = None if remappedWorkspaceCaseId == None else remapDict.get(remappedWorkspaceCaseId, remappedWorkspaceCaseId)
+        combinedRemapDict.update(remapDict)
+        self._servingState = (dialogEngine, combinedRemapDict)
+
+    async def startSessionBatch(self, sessionWorkspaceList: list):
+        dialogEngine = self._servingState[0]
+        resultList = []
+        contextDict = {}
+        for sessionId, workspace in sessionWorkspaceList:
+            try:
+                action = dialogEngine.start(workspace)
+            except Exception as e:
+                resultList.append(DialogTurnResult(sessionId, None, str(e)))
+                continue
+            contextDict[sessionId] = action.nextWorkspaceCaseId
+            resultList.append(DialogTurnResult(sessionId, action, None))
+        await self._sessionContextStore.setContextDict(contextDict)
+        return resultList
+
+    async def endSessionBatch(self, sessionIdList: list):
+        await self._sessionContextStore.removeSessionList(sessionIdList)
+
+    # resolve a batch of turns, one store read and one store write for the whole batch
+    async def executeBatch(self, turnList: list):
+        dialogEngine, remapDict = self._servingState
+        storedContextList = await self._sessionContextStore.getContextList([turn.sessionId for turn in turnList
+                                                                            if turn.currentWorkspaceCaseId == None])
+        storedContextIter = iter(storedContextList)
+
+        resultList = []
+        contextDict = {}
+        drainedSessionIdList = []
+        for turn in turnList:
+            currentWorkspaceCaseId = turn.currentWorkspaceCaseId
+            if currentWorkspaceCaseId == None:
+                # a session later in the batch sees the context left by its earlier turns
+                currentWorkspaceCaseId = contextDict.get(turn.sessionId, next(storedContextIter))
+                if currentWorkspaceCaseId == None:
+                    resultList.append(DialogTurnResult(turn.sessionId, None, "session " + str(turn.sessionId) + " not started"))
+                    continue
+            if currentWorkspaceCaseId in remapDict:
+                currentWorkspaceCaseId = remapDict.get(currentWorkspaceCaseId)
+                if currentWorkspaceCaseId == None:
+                    drainedSessionIdList.append(turn.sessionId)
+                    contextDict.pop(turn.sessionId, None)
+                    resultList.append(DialogTurnResult(turn.sessionId, None, "session " + str(turn.sessionId) + " drained, its context was removed by a reload"))
+                    continue
+            try:
+                if turn.buttonCaseId == None:
+                    action = dialogEngine.executeIntent(currentWorkspaceCaseId)
+                else:
+                    action = dialogEngine.executeTurn(currentWorkspaceCaseId, turn.buttonCaseId)
+            except Exception as e:
+                resultList.append(DialogTurnResult(turn.sessionId, None, str(e)))
+                continue
+            contextDict[turn.sessionId] = action.nextWorkspaceCaseId
+            resultList.append(DialogTurnResult(turn.sessionId, action, None))
+
+        await self._sessionContextStore.setContextDict(contextDict)
+        if len(drainedSessionIdList) > 0:
+            await self._sessionContextStore.removeSessionList(drainedSessionIdList)
+        return resultList
+
+    ###########################################################################
+    # Single turn submission, coalesced into batches by a background task
+
+    def start(self):
+        if self._batchTask == None:
+            self._wakeUpEvent = asyncio.Event()
+            self._batchTask = asyncio.get_running_loop().create_task(self.__batchLoop())
+
+    # turns still waiting for a batch fail, their callers do not wait forever
+    async def stop(self):
+        if self._batchTask != None:
+            self._batchTask.cancel()
+            try:
+                await self._batchTask
+            except asyncio.CancelledError:
+                pass
+            self._batchTask = None
+        self.__failPending(self._pendingList)
+        self._pendingList = []
+
+    def __failPending(self, pendingList: list):
+        for turn, future in pendingList:
+            if not future.done():
+                future.set_exception(Exception("dialog session server stopped before turn of session " + str(turn.sessionId) + " was executed"))
+
+    async def submitTurn(self, turn: DialogTurn):
+        if self._batchTask == None:
+            raise Exception("dialog session server not started, call start() before submitTurn()")
+        future = asyncio.get_running_loop().create_future()
+        self._pendingList.append((turn, future))
+        self._wakeUpEvent.set()
+        return await future
+
+    async def __batchLoop(self):
+        while True:
+            await self._wakeUpEvent.wait()
+            self._wakeUpEvent.clear()
+            # let every session runnable in this loop iteration submit before cutting the batch
+            await asyncio.sleep(0)
+            while len(self._pendingList) > 0:
+                batchList = self._pendingList[:self._maxBatchSize]
+                del self._pendingList[:self._maxBatchSize]
+                try:
+                    resultList = await self.executeBatch([turn for turn, future in batchList])
+                except asyncio.CancelledError:
+                    # stopped while the batch was running
+                    self.__failPending(batchList)
+                    raise
+                except Exception as e:
+                    for turn, future in batchList:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (turn, future), result in zip(batchList, resultList):
+                    if not future.done():
+                        future.set_result(result)
@@ -0,0 +1,119 @@
+from chatdialogflow import DialogFlowForest, WorkspaceCaseId, ButtonCaseIdListNode
+
+###############################################################################
+# Precomputed entry paths, for breadcrumbs and "back" when an intent sets the context straight to a node
+#
+# Built once per forest, breadth first from the MIN_START root of every workspace over the same edges a turn can take
+# (buttons, then the jump target), so the depth of a node is the fewest turns to get there, same as the depth of
+# DialogFlowAnalyzer. A node shared by several menus can have more than one shortest path, each node therefore keeps
+# every parent that is one turn closer to MIN_START, the first of them (button order) gives its canonical path.
+# Paths are not stored, they are walked from the parents on request, so the table holds one small tuple per node:
+#   (depth, parents on a shortest path, action button ID leading from the first parent, None for a jump)
+# Nodes no path from MIN_START reaches are not in the table. An edited forest needs a new table, like DialogEngine.
+
+class EntryPathTable:
+    # dictionary of WorkspaceCaseId (key) and (depth, parent tuple, entry action button ID) (value)
+    _entryDict = {}
+
+    def __init__(self, forest: DialogFlowForest):
+        self._entryDict = {}
+        graph = forest.getGraph()
+        for rootWorkspaceCaseId in graph.getRootDict().values():
+            self.__addWorkspace(graph, rootWorkspaceCaseId)
+
+    # action button shown for a button edge, the action button list runs parallel to the button case ID list
+    def __entryButtonId(self, parentNode, workspaceCaseId: WorkspaceCaseId):
+        if isinstance(parentNode, ButtonCaseIdListNode) == False:
+            return None
+        buttonCaseIdList = parentNode.getButtonCaseIdList()
+        actionButtonIdList = parentNode.getActionButtonIdList()
+        buttonIndex = buttonCaseIdList.index(workspaceCaseId.getCaseId())
+        return actionButtonIdList[buttonIndex] if buttonIndex < len(actionButtonIdList) else None
+
+    def __addWorkspace(self, graph, rootWorkspaceCaseId: WorkspaceCaseId):
+        # dictionary of WorkspaceCaseId (key) and list of parents on a shortest path (value), for the current depth
+        depthDict = {rootWorkspaceCaseId: 0}
+        parentListDict = {rootWorkspaceCaseId: []}
+        frontierList = [rootWorkspaceCaseId]
+        depth = 0
+        while len(frontierList) > 0:
+            depth += 1
+            nextFrontierList = []
+            for workspaceCaseId in frontierList:
+                successorList = graph.getChildren(workspaceCaseId)
+                jumpToTarget = graph.getJumpToTarget(workspaceCaseId)
+                if jumpToTarget != None and graph.getNode(jumpToTarget) != None:
+                    successorList = successorList + (jumpToTarget,)
+                for successor in successorList:
+                    if successor not in depthDict:
+                        depthDict[successor] = depth
+                        parentListDict[successor] = [workspaceCaseId]
+                        nextFrontierList.append(successor)
+                    elif depthDict.get(successor) == depth and workspaceCaseId not in parentListDict.get(successor):
+                        parentListDict.get(successor).append(workspaceCaseId)
+            frontierList = nextFrontierList
+
+        for workspaceCaseId, parentList in parentListDict.items():
+            entryButtonId = None if len(parentList) == 0 else self.__entryButtonId(graph.getNode(parentList[0]), workspaceCaseId)
+            self._entryDict[workspaceCaseId] = (depthDict.get(workspaceCaseId), tuple(parentList), entryButtonId)
+
+    def hasEntry(self, workspaceCaseId: WorkspaceCaseId):
+        return workspaceCaseId in self._entryDict
+
+    # turns from MIN_START, None when no path reaches the node
+    def getDepth(self, workspaceCaseId: WorkspaceCaseId):
+        entry = self._entryDict.get(workspaceCaseId)
+        return None if entry == None else entry[0]
+
+    # where "back" goes, the parent on the canonical path, None for a root or a node without entry
+    def getEntryParent(self, workspaceCaseId: WorkspaceCaseId):
+        entry = self._entryDict.get(workspaceCaseId)
+        if entry == None or len(entry[1]) == 0:
+            return None
+        return entry[1][0]
+
+    # every parent one turn closer to MIN_START, a shared node has one per shortest path through it
+    def getEntryParentList(self, workspaceCaseId: WorkspaceCaseId):
+        entry = self._entryDict.get(workspaceCaseId)
+        return () if entry == None else entry[1]
+
+    # action button leading from the entry parent, None when the entry is a jump or the button has no action button
+    def getEntryButtonId(self, workspaceCaseId: WorkspaceCaseId):
+        entry = self._entryDict.get(workspaceCaseId)
+        return None if entry == None else entry[2]
+
+    # canonical breadcrumb, MIN_START first and the node last, () when no path reaches the node
+    def getEntryPath(self, workspaceCaseId: WorkspaceCaseId):
+        entry = self._entryDict.get(workspaceCaseId)
+        if entry == None:
+            return ()
+        pathList = [workspaceCaseId]
+        while len(entry[1]) > 0:
+            pathList.append(entry[1][0])
+            entry = self._entryDict[entry[1][0]]
+        pathList.reverse()
+        return tuple(pathList)
+
+    # Every shortest path, canonical first. Shared menus multiply the paths below them, so they are generated one at
+    # a time and maxPathCount stops early.
+    def iterEntryPaths(self, workspaceCaseId: WorkspaceCaseId, maxPathCount: int = None):
+        if workspaceCaseId not in self._entryDict:
+            return
+        pathCount = 0
+        # (node the path has reached, path from there to the requested node)
+        stack = [(workspaceCaseId, (workspaceCaseId,))]
+        while len(stack) > 0:
+            currentWorkspaceCaseId, pathTuple = stack.pop()
+            parentTuple = self.getEntryParentList(currentWorkspaceCaseId)
+            if len(parentTuple) == 0:
+                yield pathTuple
+                pathCount += 1
+                if maxPathCount != None and pathCount >= maxPathCount:
+                    return
+                continue
+            # reversed so the first parent, the canonical path, comes out first
+            for parent in reversed(parentTuple):
+                stack.append((parent, (parent,) + pathTuple))
+
+    def __len__(self):
+        return len(self._entryDict)
@@ -0,0 +1,225 @@
+from io import TextIOBase
+from chatdialogflow import DialogFlowForest, WorkspaceCaseId, JumpToNode
+
+###############################################################################
+# Graph analysis of the built dialog flow
+#
+# Runs over the forest's graph, button edges and JUMP_TO edges alike, in linear time per workspace
+# * reachability from MIN_START, what is not reachable can never be hit and only bloats the rule base
+# * strongly connected components (iterative Tarjan), a cycle that no edge leaves traps the conversation. A cycle of
+#   jump to nodes only is a trap cycle, an endless jump loop the rule engine would never get out of. A closed cycle
+#   with buttons in it waits for the user at every menu, it is reported on its own as a closed menu cycle.
+# * workspaces without a MIN_START root
+# * depth (turns from MIN_START, shortest path) and button fan-out statistics
+
+class WorkspaceFlowAnalysis:
+    _workspace = None
+    _hasRoot = False
+    _reachableSet = set()
+    # nodes not reachable from MIN_START, in input table order
+    _unreachableList = []
+    # list of jump to loops without exit, each a list of WorkspaceCaseId
+    _trapCycleList = []
+    # list of cycles without exit that go through buttons, each a list of WorkspaceCaseId
+    _closedMenuCycleList = []
+    # dictionary of WorkspaceCaseId (key) and turns from MIN_START (value), reachable nodes only
+    _depthDict = {}
+    # list of button counts of every button node
+    _fanOutList = []
+
+    def __init__(self, workspace: str, hasRoot: bool, reachableSet: set, unreachableList: list, trapCycleList: list, depthDict: dict, fanOutList: list,
+                 closedMenuCycleList: list):
+        self._workspace = workspace
+        self._hasRoot = hasRoot
+        self._reachableSet = reachableSet
+        self._unreachableList = unreachableList
+        self._trapCycleList = trapCycleList
+        self._closedMenuCycleList = closedMenuCycleList
+        self._depthDict = depthDict
+        self._fanOutList = fanOutList
+
+    def getWorkspace(self):
+        return self._workspace
+
+    def hasRoot(self):
+        return self._hasRoot
+
+    def getReachableSet(self):
+        return self._reachableSet
+
+    def getUnreachableList(self):
+        return self._unreachableList
+
+    def getTrapCycleList(self):
+        return self._trapCycleList
+
+    def getClosedMenuCycleList(self):
+        return self._closedMenuCycleList
+
+    def getDepthDict(self):
+        return self._depthDict
+
+    def getMaxDepth(self):
+        return max(self._depthDict.values(), default=0)
+
+    def getMaxFanOut(self):
+        return max(self._fanOutList, default=0)
+
+    def getMeanFanOut(self):
+        if len(self._fanOutList) == 0:
+            return 0.0
+        return sum(self._fanOutList) / len(self._fanOutList)
+
+class FlowAnalysisReport:
+    # dictionary of workspace (key) and WorkspaceFlowAnalysis (value)
+    _workspaceAnalysisDict = {}
+
+    def __init__(self, workspaceAnalysisDict: dict):
+        self._workspaceAnalysisDict = workspaceAnalysisDict
+
+    def getWorkspaceAnalysis(self, workspace: str):
+        return self._workspaceAnalysisDict.get(workspace)
+
+    def getWorkspaceAnalysisList(self):
+        return list(self._workspaceAnalysisDict.values())
+
+    def getNoRootWorkspaceList(self):
+        return [workspace for workspace, analysis in self._workspaceAnalysisDict.items() if analysis.hasRoot() == False]
+
+    def getUnreachableList(self):
+        return [workspaceCaseId for analysis in self._workspaceAnalysisDict.values() for workspaceCaseId in analysis.getUnreachableList()]
+
+    def getTrapCycleList(self):
+        return [cycle for analysis in self._workspaceAnalysisDict.values() for cycle in analysis.getTrapCycleList()]
+
+    def getClosedMenuCycleList(self):
+        return [cycle for analysis in self._workspaceAnalysisDict.values() for cycle in analysis.getClosedMenuCycleList()]
+
+    def printReport(self, fileStream: TextIOBase):
+        for workspace, analysis in self._workspaceAnalysisDict.items():
+            if analysis.hasRoot() == False:
+                print("workspace " + str(workspace) + " has no MIN_START root", file=fileStream)
+            print("workspace %s: reachable %d, unreachable %d, max depth %d, max fan-out %d, mean fan-out %.2f" % (workspace, len(analysis.getReachableSet()), len(analysis.getUnreachableList()),
+                                                                                                           analysis.getMaxDepth(), analysis.getMaxFanOut(), analysis.getMeanFanOut()), file=fileStream)
+            for workspaceCaseId in analysis.getUnreachableList():
+                print("    unreachable " + str(workspaceCaseId), file=fileStream)
+            for cycle in analysis.getTrapCycleList():
+                print("    jump loop without exit " + " -> ".join([str(workspaceCaseId) for workspaceCaseId in cycle]), file=fileStream)
+            for cycle in analysis.getClosedMenuCycleList():
+                print("    menu cycle without exit " + " -> ".join([str(workspaceCaseId) for workspaceCaseId in cycle]), file=fileStream)
+
+class DialogFlowAnalyzer:
+
+    # button children then the jump target, every edge a turn can take
+    def __successorList(self, graph, workspaceCaseId: WorkspaceCaseId):
+        jumpToTarget = graph.getJumpToTarget(workspaceCaseId)
+        if jumpToTarget == None or graph.getNode(jumpToTarget) == None:
+            return graph.getChildren(workspaceCaseId)
+        return graph.getChildren(workspaceCaseId) + (jumpToTarget,)
+
+    # breadth first from MIN_START, so the depth recorded is the fewest turns to get there
+    def __depthFromRoot(self, graph, rootWorkspaceCaseId: WorkspaceCaseId):
+        depthDict = {rootWorkspaceCaseId: 0}
+        frontierList = [rootWorkspaceCaseId]
+        depth = 0
+        while len(frontierList) > 0:
+            depth += 1
+            nextFrontierList = []
+            for workspaceCaseId in frontierList:
+                for successor in self.__successorList(graph, workspaceCaseId):
+                    if successor not in depthDict:
+                        depthDict[successor] = depth
+                        nextFrontierList.append(successor)
+            frontierList = nextFrontierList
+        return depthDict
+
+    # Tarjan's strongly connected components without recursion, returns the components with more than one node or
+    # a self loop
+    def __cycleList(self, graph, workspaceCaseIdList: list):
+        indexDict = {}
+        lowLinkDict = {}
+        onStackSet = set()
+        componentStack = []
+        cycleList = []
+        nextIndex = 0
+
+        for startWorkspaceCaseId in workspaceCaseIdList:
+            if startWorkspaceCaseId in indexDict:
+                continue
+            # (node, iterator over its successors)
+            callStack = [(startWorkspaceCaseId, iter(self.__successorList(graph, startWorkspaceCaseId)))]
+            indexDict[startWorkspaceCaseId] = lowLinkDict[startWorkspaceCaseId] = nextIndex
+            nextIndex += 1
+            componentStack.append(startWorkspaceCaseId)
+            onStackSet.add(startWorkspaceCaseId)
+
+            while len(callStack) > 0:
+                workspaceCaseId, successorIter = callStack[-1]
+                descended = False
+                for successor in successorIter:
+                    if successor not in indexDict:
+                        indexDict[successor] = lowLinkDict[successor] = nextIndex
+                        nextIndex += 1
+                        componentStack.append(successor)
+                        onStackSet.add(successor)
+                        callStack.append((successor, iter(self.__successorList(graph, successor))))
+                        descended = True
+                        break
+                    if successor in onStackSet:
+                        lowLinkDict[workspaceCaseId] = min(lowLinkDict[workspaceCaseId], indexDict[successor])
+                if descended:
+                    continue
+
+                callStack.pop()
+                if len(callStack) > 0:
+                    parentWorkspaceCaseId = callStack[-1][0]
+                    lowLinkDict[parentWorkspaceCaseId] = min(lowLinkDict[parentWorkspaceCaseId], lowLinkDict[workspaceCaseId])
+
+                if lowLinkDict[workspaceCaseId] == indexDict[workspaceCaseId]:
+                    component = []
+                    while True:
+                        member = componentStack.pop()
+                        onStackSet.discard(member)
+                        component.append(member)
+                        if member == workspaceCaseId:
+                            break
+                    if len(component) > 1 or workspaceCaseId in self.__successorList(graph, workspaceCaseId):
+                        component.reverse()
+                        cycleList.append(component)
+        return cycleList
+
+    def analyzeWorkspace(self, forest: DialogFlowForest, workspace: str):
+        graph = forest.getGraph()
+        workspaceCaseIdList = list((graph.getNodeDict(workspace) or {}).keys())
+
+        rootWorkspaceCaseId = graph.getRootDict().get(workspace)
+        depthDict = {} if rootWorkspaceCaseId == None else self.__depthFromRoot(graph, rootWorkspaceCaseId)
+        reachableSet = set(depthDict.keys())
+        unreachableList = [workspaceCaseId for workspaceCaseId in workspaceCaseIdList if workspaceCaseId not in reachableSet]
+
+        trapCycleList = []
+        closedMenuCycleList = []
+        for cycle in self.__cycleList(graph, workspaceCaseIdList):
+            cycleSet = set(cycle)
+            if all([successor in cycleSet for workspaceCaseId in cycle for successor in self.__successorList(graph, workspaceCaseId)]):
+                if isJumpLoop(forest, cycle):
+                    trapCycleList.append(cycle)
+                else:
+                    closedMenuCycleList.append(cycle)
+
+        fanOutList = [len(graph.getChildren(workspaceCaseId)) for workspaceCaseId in workspaceCaseIdList if len(graph.getChildren(workspaceCaseId)) > 0]
+        return WorkspaceFlowAnalysis(workspace, rootWorkspaceCaseId != None, reachableSet, unreachableList, trapCycleList, depthDict, fanOutList, closedMenuCycleList)
+
+    def analyze(self, forest: DialogFlowForest):
+        return FlowAnalysisReport({workspace: self.analyzeWorkspace(forest, workspace) for workspace in forest.getGraph().getWorkspaceList()})
+
+    # Remove every node that cannot be reached from MIN_START, a workspace without root loses all its nodes.
+    # The predecessors of an unreachable node are unreachable too, so no remaining button points to a removed node.
+    def pruneUnreachable(self, forest: DialogFlowForest, report: FlowAnalysisReport = None):
+        if report == None:
+            report = self.analyze(forest)
+        return forest.removeNodeList(report.getUnreachableList())
+
+# True when every node of a cycle is a jump, the dialog would loop without waiting for the user
+def isJumpLoop(forest: DialogFlowForest, cycle: list):
+    return all([isinstance(forest.getNode(workspaceCaseId), JumpToNode) for workspaceCaseId in cycle])
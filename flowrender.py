@@ -0,0 +1,200 @@
+from io import TextIOBase
+from chatdialogflow import DialogFlowForest, DialogFlowDelta, WorkspaceCaseId
+
+###############################################################################
+# Streaming Mermaid and ASCII rendering
+#
+# Renders straight from the forest's graph one line at a time, nothing is projected onto anytree and no diagram is
+# held in memory. Every view can be narrowed down
+# * to one workspace, or to the subtree under a case ID of that workspace
+# * to a depth limit, a case with more below it says how many buttons and jumps were cut
+# * to an include set, only the cases in it are drawn, which is how the delta view keeps to the changed cases
+#   and their ancestors
+#
+# Mermaid draws every case once, a shared case gets one edge per parent and a jump is a dotted edge, so the diagram
+# grows with the graph and not with the paths through it. ASCII is a tree, a case already drawn is shown again as
+# a reference without its subtree.
+
+# style of the delta classes in the Mermaid view
+delta_class_def_dict = {"added": "fill:#d4f7d4,stroke:#2a8f2a",
+                        "changed": "fill:#fff3c4,stroke:#b08800",
+                        "moved": "fill:#d6e9ff,stroke:#1f5fbf"}
+
+class DialogFlowRenderer:
+    _forest = None
+    _graph = None
+
+    def __init__(self, forest: DialogFlowForest):
+        self._forest = forest
+        self._graph = forest.getGraph()
+
+    # button children then the jump target, each with the kind of edge leading there
+    def __successorList(self, workspaceCaseId: WorkspaceCaseId, includeSet: set):
+        successorList = [(child, "button") for child in self._graph.getChildren(workspaceCaseId)
+                         if self._graph.getNode(child) != None and (includeSet == None or child in includeSet)]
+        jumpToTarget = self._graph.getJumpToTarget(workspaceCaseId)
+        if jumpToTarget != None and self._graph.getNode(jumpToTarget) != None and (includeSet == None or jumpToTarget in includeSet):
+            successorList.append((jumpToTarget, "jump"))
+        return successorList
+
+    # where drawing starts: the case under rootCaseId, the root of a workspace, or the root of every workspace
+    def __startList(self, workspace: str, rootCaseId: str):
+        if rootCaseId != None:
+            if workspace == None:
+                raise Exception("A subtree is rendered from a case ID of a given workspace")
+            startWorkspaceCaseId = WorkspaceCaseId(workspace, rootCaseId)
+            if self._graph.getNode(startWorkspaceCaseId) == None:
+                raise Exception("Case ID '" + rootCaseId + "' is not defined in workspace " + workspace)
+            return [startWorkspaceCaseId]
+        if workspace != None:
+            rootWorkspaceCaseId = self._graph.getRootDict().get(workspace)
+            if rootWorkspaceCaseId == None:
+                raise Exception("Workspace " + workspace + " has no MIN_START root")
+            return [rootWorkspaceCaseId]
+        return list(self._graph.getRootDict().values())
+
+    # the cases of an include set no other included case points to, so a changed orphan still gets drawn
+    def __includeStartList(self, includeSet: set):
+        startList = []
+        for workspace in self._graph.getWorkspaceList():
+            for workspaceCaseId in self._graph.getNodeDict(workspace).keys():
+                if workspaceCaseId in includeSet and not any([parent in includeSet for parent in self._graph.getParents(workspaceCaseId)]):
+                    startList.append(workspaceCaseId)
+        return startList
+
+    def __mermaidLabel(self, workspaceCaseId: WorkspaceCaseId, hiddenCount: int):
+        if hiddenCount > 0:
+            return '["%s +%d"]' % (str(workspaceCaseId), hiddenCount)
+        return '["%s"]' % (str(workspaceCaseId))
+
+    # Breadth first, so a case is declared at its smallest depth and the depth limit cuts the same cases whatever
+    # the order of the buttons. classDict maps WorkspaceCaseId to a Mermaid class name, for the delta view.
+    def __iterMermaidBody(self, startList: list, maxDepth: int, includeSet: set, classDict: dict):
+        # dictionary of WorkspaceCaseId (key) and number of its Mermaid node (value)
+        nodeNumberDict = {}
+        classNodeIdListDict = {}
+
+        def declare(workspaceCaseId, depth):
+            nodeNumber = len(nodeNumberDict)
+            nodeNumberDict[workspaceCaseId] = nodeNumber
+            hiddenCount = len(self.__successorList(workspaceCaseId, includeSet)) if maxDepth != None and depth >= maxDepth else 0
+            if classDict != None and workspaceCaseId in classDict:
+                className = classDict.get(workspaceCaseId)
+                if className in classNodeIdListDict:
+                    classNodeIdListDict.get(className).append("N" + str(nodeNumber))
+                else:
+                    classNodeIdListDict.update({className: ["N" + str(nodeNumber)]})
+            return "N" + str(nodeNumber) + self.__mermaidLabel(workspaceCaseId, hiddenCount)
+
+        frontierList = []
+        for startWorkspaceCaseId in startList:
+            if startWorkspaceCaseId not in nodeNumberDict:
+                yield declare(startWorkspaceCaseId, 0)
+                frontierList.append(startWorkspaceCaseId)
+
+        depth = 0
+        while len(frontierList) > 0 and (maxDepth == None or depth < maxDepth):
+            depth += 1
+            nextFrontierList = []
+            for workspaceCaseId in frontierList:
+                nodeId = "N" + str(nodeNumberDict.get(workspaceCaseId))
+                for successor, edgeKind in self.__successorList(workspaceCaseId, includeSet):
+                    if successor not in nodeNumberDict:
+                        yield declare(successor, depth)
+                        nextFrontierList.append(successor)
+                    yield nodeId + ("-->" if edgeKind == "button" else "-.->") + "N" + str(nodeNumberDict.get(successor))
+            frontierList = nextFrontierList
+
+        for className, nodeIdList in classNodeIdListDict.items():
+            if className in delta_class_def_dict:
+                yield "classDef " + className + " " + delta_class_def_dict.get(className)
+            yield "class " + ",".join(nodeIdList) + " " + className
+
+    def iterMermaidLines(self, workspace: str = None, rootCaseId: str = None, maxDepth: int = None, includeSet: set = None, classDict: dict = None):
+        yield "graph TD"
+        yield from self.__iterMermaidBody(self.__startList(workspace, rootCaseId), maxDepth, includeSet, classDict)
+
+    # Depth first like RenderTree with AsciiStyle, a case is expanded once, later paths to it show "(see above)"
+    def __iterAsciiBody(self, startList: list, maxDepth: int, includeSet: set, classDict: dict):
+        expandedSet = set()
+        # (case, depth, edge kind, prefix of this line, prefix of the lines below)
+        stack = [(startWorkspaceCaseId, 0, "button", "", "") for startWorkspaceCaseId in reversed(startList)]
+        while len(stack) > 0:
+            workspaceCaseId, depth, edgeKind, linePrefix, childPrefix = stack.pop()
+            line = linePrefix + ("-> " if edgeKind == "jump" else "") + str(workspaceCaseId)
+            if classDict != None and workspaceCaseId in classDict:
+                line = line + " [" + classDict.get(workspaceCaseId) + "]"
+
+            successorList = self.__successorList(workspaceCaseId, includeSet)
+            if len(successorList) > 0 and workspaceCaseId in expandedSet:
+                yield line + " (see above)"
+                continue
+            if len(successorList) > 0 and maxDepth != None and depth >= maxDepth:
+                yield line + " (+%d)" % len(successorList)
+                continue
+            yield line
+            expandedSet.add(workspaceCaseId)
+
+            for index in reversed(range(len(successorList))):
+                successor, successorEdgeKind = successorList[index]
+                isLast = index == len(successorList) - 1
+                stack.append((successor, depth + 1, successorEdgeKind, childPrefix + ("+-- " if isLast else "|-- "),
+                              childPrefix + ("    " if isLast else "|   ")))
+
+    def iterAsciiLines(self, workspace: str = None, rootCaseId: str = None, maxDepth: int = None, includeSet: set = None, classDict: dict = None):
+        yield from self.__iterAsciiBody(self.__startList(workspace, rootCaseId), maxDepth, includeSet, classDict)
+
+    def printMermaid(self, fileStream: TextIOBase, workspace: str = None, rootCaseId: str = None, maxDepth: int = None):
+        print("```mermaid", file=fileStream)
+        for line in self.iterMermaidLines(workspace, rootCaseId, maxDepth):
+            print(line, file=fileStream)
+        print("```", file=fileStream)
+
+    def printAscii(self, fileStream: TextIOBase, workspace: str = None, rootCaseId: str = None, maxDepth: int = None):
+        for line in self.iterAsciiLines(workspace, rootCaseId, maxDepth):
+            print(line, file=fileStream)
+
+    ###############################################################################
+    # Delta view, the touched cases of a DialogFlowDelta from the hash based diff engine plus every case on a button
+    # path down to them. The forest is the new side of the diff, removed cases are gone from it and show as a change
+    # of the parent that lost the button.
+
+    def getDeltaClassDict(self, delta: DialogFlowDelta):
+        classDict = {}
+        for workspaceCaseId in delta.getMovedDict().keys():
+            classDict[workspaceCaseId] = "moved"
+        for workspaceCaseId in delta.getChangedDict().keys():
+            classDict[workspaceCaseId] = "changed"
+        for workspaceCaseId in delta.getAddedList():
+            classDict[workspaceCaseId] = "added"
+        return {workspaceCaseId: className for workspaceCaseId, className in classDict.items() if self._graph.getNode(workspaceCaseId) != None}
+
+    def getDeltaIncludeSet(self, delta: DialogFlowDelta):
+        includeSet = set()
+        stack = list(self.getDeltaClassDict(delta).keys())
+        while len(stack) > 0:
+            workspaceCaseId = stack.pop()
+            if workspaceCaseId in includeSet:
+                continue
+            includeSet.add(workspaceCaseId)
+            stack.extend(self._graph.getParents(workspaceCaseId))
+        return includeSet
+
+    def iterDeltaMermaidLines(self, delta: DialogFlowDelta, maxDepth: int = None):
+        includeSet = self.getDeltaIncludeSet(delta)
+        yield "graph TD"
+        yield from self.__iterMermaidBody(self.__includeStartList(includeSet), maxDepth, includeSet, self.getDeltaClassDict(delta))
+
+    def iterDeltaAsciiLines(self, delta: DialogFlowDelta, maxDepth: int = None):
+        includeSet = self.getDeltaIncludeSet(delta)
+        yield from self.__iterAsciiBody(self.__includeStartList(includeSet), maxDepth, includeSet, self.getDeltaClassDict(delta))
+
+    def printDeltaMermaid(self, fileStream: TextIOBase, delta: DialogFlowDelta, maxDepth: int = None):
+        print("```mermaid", file=fileStream)
+        for line in self.iterDeltaMermaidLines(delta, maxDepth):
+            print(line, file=fileStream)
+        print("```", file=fileStream)
+
+    def printDeltaAscii(self, fileStream: TextIOBase, delta: DialogFlowDelta, maxDepth: int = None):
+        for line in self.iterDeltaAsciiLines(delta, maxDepth):
+            print(line, file=fileStream)
@@ -0,0 +1,311 @@
+import sys
+import mmap
+import struct
+from array import array
+from chatdialogflow import DialogFlowForest, WorkspaceCaseId, JumpToNode, ButtonCaseIdListNode, LeafNode
+
+###############################################################################
+# Columnar binary snapshot of a DialogFlowForest
+#
+# The forest is written as flat little-endian uint32 arrays, so a reader can mmap the file and answer lookups straight
+# from the mapped pages. Python node objects are only created for the nodes actually touched, and worker processes
+# mapping the same file share one read-only copy through the page cache. A big-endian host byteswaps the arrays when
+# writing and reads copies of them, byteswapped back, instead of the mapped pages.
+#
+# Layout: header, then the sections below in order, each padded to 4 bytes
+#   header            magic, format version, section count, then (offset, length in bytes) of every section
+#   string offsets    uint32[stringCount + 1], start of every string in the string blob
+#   string blob       utf-8 bytes of every distinct string (workspace, case ID, response ID, ...)
+#   node workspace    uint32[nodeCount], string index
+#   node case ID      uint32[nodeCount], string index
+#   node type         uint32[nodeCount], see snapshot_node_type_list
+#   node jump to      uint32[nodeCount], string index of the jump to case ID or snapshot_none
+#   ID offsets        uint32[nodeCount * 4 + 1], slices of the ID list section, four per node in the order of
+#                     snapshot_id_list_name_list
+#   ID list           uint32[], string indexes
+#   child offsets     uint32[nodeCount + 1], slices of the child list section
+#   child list        uint32[], node indexes of the button children
+#   sorted node index uint32[nodeCount], node indexes ordered by (workspace, case ID) for binary search
+#   workspace table   uint32[workspaceCount * 4], (workspace string index, first node, end node, root node or snapshot_none)
+#
+# Nodes of a workspace are contiguous and keep the forest's input table order.
+
+snapshot_magic = b"DFSNAP\0\0"
+snapshot_format_version = 1
+snapshot_none = 0xFFFFFFFF
+snapshot_node_type_list = [ButtonCaseIdListNode, JumpToNode, LeafNode]
+
+snapshot_id_list_name_list = ["respondIdList", "actionButtonIdList", "procedureAdvisoryIdList", "buttonCaseIdList"]
+
+snapshot_section_name_list = ["stringOffsets", "stringBlob", "nodeWorkspace", "nodeCaseId", "nodeType", "nodeJumpTo",
+                              "idOffsets", "idList", "childOffsets", "childList", "sortedNodeIndex", "workspaceTable"]
+
+_header_struct = struct.Struct("<8sII")
+_section_struct = struct.Struct("<QQ")
+
+def writeForestSnapshot(forest: DialogFlowForest, filePath: str):
+    graph = forest.getGraph()
+
+    stringIndexDict = {}
+    stringList = []
+    def stringIndex(string: str):
+        index = stringIndexDict.get(string)
+        if index == None:
+            index = len(stringList)
+            stringIndexDict[string] = index
+            stringList.append(string)
+        return index
+
+    nodeIndexDict = {}
+    nodeList = []
+    workspaceTable = array("I")
+    for workspace in graph.getWorkspaceList():
+        firstNodeIndex = len(nodeList)
+        for node in graph.iterNodes(workspace):
+            nodeIndexDict[node.getWorkspaceCaseId()] = len(nodeList)
+            nodeList.append(node)
+        rootWorkspaceCaseId = graph.getRootDict().get(workspace)
+        rootNodeIndex = snapshot_none if rootWorkspaceCaseId == None else nodeIndexDict.get(rootWorkspaceCaseId)
+        workspaceTable.extend([stringIndex(workspace), firstNodeIndex, len(nodeList), rootNodeIndex])
+
+    nodeWorkspace = array("I")
+    nodeCaseId = array("I")
+    nodeType = array("I")
+    nodeJumpTo = array("I")
+    idList = array("I")
+    idOffsets = array("I")
+    childOffsets = array("I")
+    childList = array("I")
+
+    def appendIdList(stringTuple: tuple):
+        idOffsets.append(len(idList))
+        idList.extend([stringIndex(string) for string in stringTuple])
+
+    for node in nodeList:
+        workspaceCaseId = node.getWorkspaceCaseId()
+        nodeWorkspace.append(stringIndex(workspaceCaseId.getWorkspace()))
+        nodeCaseId.append(stringIndex(workspaceCaseId.getCaseId()))
+        nodeType.append(snapshot_node_type_list.index(type(node)))
+        nodeJumpTo.append(stringIndex(node.getJumpToCaseId()) if isinstance(node, JumpToNode) else snapshot_none)
+        appendIdList(node.getRespondIdList())
+        appendIdList(node.getActionButtonIdList() if isinstance(node, ButtonCaseIdListNode) else ())
+        appendIdList(node.getProcedureAdvisoryIdList() if isinstance(node, LeafNode) else ())
+        appendIdList(node.getButtonCaseIdList() if isinstance(node, ButtonCaseIdListNode) else ())
+        childOffsets.append(len(childList))
+        childList.extend([nodeIndexDict.get(childWorkspaceCaseId) for childWorkspaceCaseId in graph.getChildren(workspaceCaseId)])
+    idOffsets.append(len(idList))
+    childOffsets.append(len(childList))
+
+    encodedStringList = [string.encode() for string in stringList]
+    stringOffsets = array("I", [0])
+    for encodedString in encodedStringList:
+        stringOffsets.append(stringOffsets[-1] + len(encodedString))
+
+    sortedNodeIndex = array("I", sorted(range(len(nodeList)), key=lambda nodeIndex: (encodedStringList[nodeWorkspace[nodeIndex]],
+                                                                                    encodedStringList[nodeCaseId[nodeIndex]])))
+
+    if sys.byteorder == "big":
+        for uint32Array in [stringOffsets, nodeWorkspace, nodeCaseId, nodeType, nodeJumpTo, idOffsets, idList,
+                            childOffsets, childList, sortedNodeIndex, workspaceTable]:
+            uint32Array.byteswap()
+    sectionDict = {"stringOffsets": stringOffsets.tobytes(), "stringBlob": b"".join(encodedStringList),
+                   "nodeWorkspace": nodeWorkspace.tobytes(), "nodeCaseId": nodeCaseId.tobytes(),
+                   "nodeType": nodeType.tobytes(), "nodeJumpTo": nodeJumpTo.tobytes(),
+                   "idOffsets": idOffsets.tobytes(), "idList": idList.tobytes(),
+                   "childOffsets": childOffsets.tobytes(), "childList": childList.tobytes(),
+                   "sortedNodeIndex": sortedNodeIndex.tobytes(), "workspaceTable": workspaceTable.tobytes()}
+
+    headerLength = _header_struct.size + _section_struct.size * len(snapshot_section_name_list)
+    sectionTableBytes = b""
+    bodyPartList = []
+    offset = headerLength
+    for name in snapshot_section_name_list:
+        sectionBytes = sectionDict.get(name)
+        sectionTableBytes += _section_struct.pack(offset, len(sectionBytes))
+        padding = b"\0" * (-len(sectionBytes) % 4)
+        bodyPartList.append(sectionBytes + padding)
+        offset += len(sectionBytes) + len(padding)
+
+    with open(filePath, "wb") as snapshotFile:
+        snapshotFile.write(_header_struct.pack(snapshot_magic, snapshot_format_version, len(snapshot_section_name_list)) +
+                           sectionTableBytes + b"".join(bodyPartList))
+
+# Read-only view of a snapshot file, lookups go to the mapped arrays and nodes are materialized on first touch
+class ForestSnapshot:
+    _snapshotFile = None
+    _mmap = None
+    _memoryView = None
+    # dictionary of section name (key) and memoryview (value), uint32 arrays except the string blob
+    _sectionDict = {}
+    _stringCache = {}
+    # dictionary of node index (key) and materialized node (value)
+    _nodeCache = {}
+    # dictionary of workspace (key) and (first node, end node, root node) (value)
+    _workspaceDict = {}
+
+    def __init__(self, filePath: str):
+        self._snapshotFile = open(filePath, "rb")
+        self._mmap = mmap.mmap(self._snapshotFile.fileno(), 0, access=mmap.ACCESS_READ)
+        self._memoryView = memoryview(self._mmap)
+        self._stringCache = {}
+        self._nodeCache = {}
+
+        magic, formatVersion, sectionCount = _header_struct.unpack_from(self._mmap, 0)
+        if magic != snapshot_magic or formatVersion != snapshot_format_version or sectionCount != len(snapshot_section_name_list):
+            self.close()
+            raise Exception(filePath + " is not a dialog flow forest snapshot of format version " + str(snapshot_format_version))
+
+        self._sectionDict = {}
+        for sectionIndex, name in enumerate(snapshot_section_name_list):
+            offset, length = _section_struct.unpack_from(self._mmap, _header_struct.size + _section_struct.size * sectionIndex)
+            section = self._memoryView[offset:offset + length]
+            if name == "stringBlob":
+                self._sectionDict[name] = section
+            elif sys.byteorder == "big":
+                uint32Array = array("I", section.tobytes())
+                uint32Array.byteswap()
+                self._sectionDict[name] = memoryview(uint32Array)
+            else:
+                self._sectionDict[name] = section.cast("I")
+
+        self._workspaceDict = {}
+        workspaceTable = self._sectionDict.get("workspaceTable")
+        for tableIndex in range(0, len(workspaceTable), 4):
+            self._workspaceDict[self.__string(workspaceTable[tableIndex])] = (workspaceTable[tableIndex + 1], workspaceTable[tableIndex + 2], workspaceTable[tableIndex + 3])
+
+    def close(self):
+        # views into the mapping have to go before the mapping itself
+        for section in self._sectionDict.values():
+            section.release()
+        self._sectionDict = {}
+        if self._memoryView != None:
+            self._memoryView.release()
+            self._memoryView = None
+        if self._mmap != None:
+            self._mmap.close()
+            self._mmap = None
+        self._snapshotFile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+    def __string(self, stringIndex: int):
+        string = self._stringCache.get(stringIndex)
+        if string == None:
+            stringOffsets = self._sectionDict.get("stringOffsets")
+            string = str(self._sectionDict.get("stringBlob")[stringOffsets[stringIndex]:stringOffsets[stringIndex + 1]], "utf-8")
+            self._stringCache[stringIndex] = string
+        return string
+
+    def __stringTuple(self, idListName: str, nodeIndex: int):
+        idOffsets = self._sectionDict.get("idOffsets")
+        idList = self._sectionDict.get("idList")
+        slot = nodeIndex * 4 + snapshot_id_list_name_list.index(idListName)
+        return tuple([self.__string(idList[position]) for position in range(idOffsets[slot], idOffsets[slot + 1])])
+
+    def __workspaceCaseId(self, nodeIndex: int):
+        return WorkspaceCaseId(self.__string(self._sectionDict.get("nodeWorkspace")[nodeIndex]),
+                               self.__string(self._sectionDict.get("nodeCaseId")[nodeIndex]))
+
+    def getNodeCount(self):
+        return len(self._sectionDict.get("nodeType"))
+
+    def getWorkspaceList(self):
+        return list(self._workspaceDict.keys())
+
+    def getRootDict(self):
+        return {workspace: self.__workspaceCaseId(rootNodeIndex) for workspace, (firstNodeIndex, endNodeIndex, rootNodeIndex) in self._workspaceDict.items()
+                if rootNodeIndex != snapshot_none}
+
+    # binary search over the sorted node index, only the compared strings are read, -1 when not found
+    def findNodeIndex(self, workspaceCaseId: WorkspaceCaseId):
+        stringOffsets = self._sectionDict.get("stringOffsets")
+        stringBlob = self._sectionDict.get("stringBlob")
+        nodeWorkspace = self._sectionDict.get("nodeWorkspace")
+        nodeCaseId = self._sectionDict.get("nodeCaseId")
+        sortedNodeIndex = self._sectionDict.get("sortedNodeIndex")
+
+        key = (workspaceCaseId.getWorkspace().encode(), workspaceCaseId.getCaseId().encode())
+        low = 0
+        high = len(sortedNodeIndex)
+        while low < high:
+            middle = (low + high) // 2
+            nodeIndex = sortedNodeIndex[middle]
+            workspaceIndex = nodeWorkspace[nodeIndex]
+            caseIdIndex = nodeCaseId[nodeIndex]
+            middleKey = (stringBlob[stringOffsets[workspaceIndex]:stringOffsets[workspaceIndex + 1]].tobytes(),
+                         stringBlob[stringOffsets[caseIdIndex]:stringOffsets[caseIdIndex + 1]].tobytes())
+            if middleKey < key:
+                low = middle + 1
+            elif middleKey > key:
+                high = middle
+            else:
+                return nodeIndex
+        return -1
+
+    def __createNode(self, nodeIndex: int):
+        workspaceCaseId = self.__workspaceCaseId(nodeIndex)
+        respondIdList = self.__stringTuple("respondIdList", nodeIndex)
+        nodeType = snapshot_node_type_list[self._sectionDict.get("nodeType")[nodeIndex]]
+        if nodeType == JumpToNode:
+            node = JumpToNode(workspaceCaseId, respondIdList, self.__string(self._sectionDict.get("nodeJumpTo")[nodeIndex]))
+        elif nodeType == ButtonCaseIdListNode:
+            node = ButtonCaseIdListNode(workspaceCaseId, respondIdList, self.__stringTuple("buttonCaseIdList", nodeIndex),
+                                        self.__stringTuple("actionButtonIdList", nodeIndex))
+        else:
+            node = LeafNode(workspaceCaseId, respondIdList, self.__stringTuple("procedureAdvisoryIdList", nodeIndex))
+        return node
+
+    # node object of a node index, created on first use and kept, it is not linked into any anytree projection
+    def getNodeByIndex(self, nodeIndex: int):
+        node = self._nodeCache.get(nodeIndex)
+        if node == None:
+            node = self.__createNode(nodeIndex)
+            self._nodeCache[nodeIndex] = node
+        return node
+
+    def getNode(self, workspaceCaseId: WorkspaceCaseId):
+        nodeIndex = self.findNodeIndex(workspaceCaseId)
+        if nodeIndex < 0:
+            return None
+        return self.getNodeByIndex(nodeIndex)
+
+    def getChildren(self, workspaceCaseId: WorkspaceCaseId):
+        nodeIndex = self.findNodeIndex(workspaceCaseId)
+        if nodeIndex < 0:
+            return ()
+        childOffsets = self._sectionDict.get("childOffsets")
+        childList = self._sectionDict.get("childList")
+        return tuple([self.__workspaceCaseId(childList[position]) for position in range(childOffsets[nodeIndex], childOffsets[nodeIndex + 1])])
+
+    def getJumpToTarget(self, workspaceCaseId: WorkspaceCaseId):
+        nodeIndex = self.findNodeIndex(workspaceCaseId)
+        if nodeIndex < 0:
+            return None
+        jumpToIndex = self._sectionDict.get("nodeJumpTo")[nodeIndex]
+        if jumpToIndex == snapshot_none:
+            return None
+        return WorkspaceCaseId(workspaceCaseId.getWorkspace(), self.__string(jumpToIndex))
+
+    def iterNodes(self, workspace: str = None):
+        workspaceList = self.getWorkspaceList() if workspace == None else [workspace]
+        for workspace in workspaceList:
+            firstNodeIndex, endNodeIndex, rootNodeIndex = self._workspaceDict.get(workspace, (0, 0, snapshot_none))
+            for nodeIndex in range(firstNodeIndex, endNodeIndex):
+                yield self.getNodeByIndex(nodeIndex)
+
+    # Full forest out of the snapshot, every node is materialized
+    def toForest(self):
+        forest = DialogFlowForest()
+        graph = forest.getGraph()
+        # nodes handed out earlier stay with the snapshot, the forest gets its own
+        for firstNodeIndex, endNodeIndex, rootNodeIndex in self._workspaceDict.values():
+            for nodeIndex in range(firstNodeIndex, endNodeIndex):
+                graph.addNode(self.__createNode(nodeIndex))
+        for rootWorkspaceCaseId in self.getRootDict().values():
+            graph.setRoot(rootWorkspaceCaseId)
+        graph.link()
+        return forest
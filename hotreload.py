@@ -0,0 +1,182 @@
+import time
+import threading
+from typing import NamedTuple
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, WorkspaceCaseId, _isDataFrame
+from dialogengine import DialogEngine
+
+###############################################################################
+# Zero-downtime reload of the dialog forest
+#
+# VersionedForestHolder keeps the version being served as a single reference. Readers take getCurrent() and use the
+# version they got until they are done, there is no lock on that path. A reload validates and builds the new sheet
+# off the serving path (in the caller's thread or a background thread), compiles its DialogEngine and only then
+# replaces the reference, so the swap is one assignment plus telling the listeners.
+#
+# Builds run in a thread, a process would have to pickle the whole forest back. The build holds the GIL for most of
+# its run, turns keep being answered but slower while it runs.
+#
+# Every context of the old version that the new one cannot continue from gets remapped: a removed case goes to its
+# nearest button ancestor still defined, else to the workspace root, a case that turned into a jump goes to where
+# the jump leads. A removed workspace has nowhere to go, its sessions are drained.
+
+class ForestVersion:
+    _versionNumber = 0
+    _forest = None
+    _dialogEngine = None
+    _validator = None
+
+    def __init__(self, versionNumber: int, forest: DialogFlowForest, dialogEngine: DialogEngine, validator: InputTableValidator):
+        self._versionNumber = versionNumber
+        self._forest = forest
+        self._dialogEngine = dialogEngine
+        self._validator = validator
+
+    def getVersionNumber(self):
+        return self._versionNumber
+
+    def getForest(self):
+        return self._forest
+
+    def getDialogEngine(self):
+        return self._dialogEngine
+
+    def getValidator(self):
+        return self._validator
+
+# Outcome of a reload. version is the new version, or None when the sheet had errors and the old one stays.
+# remapDict maps the contexts of the old version to where sessions continue, None to drain.
+class ReloadResult(NamedTuple):
+    version: ForestVersion
+    issueList: list
+    remapDict: dict
+    buildSeconds: float
+    swapSeconds: float
+
+# nearest button ancestor of a removed case still defined in the new version, breadth first over the old graph
+def _nearestSurvivingAncestor(oldForest: DialogFlowForest, newDialogEngine: DialogEngine, workspaceCaseId: WorkspaceCaseId):
+    oldGraph = oldForest.getGraph()
+    visitedSet = {workspaceCaseId}
+    frontierList = [workspaceCaseId]
+    while len(frontierList) > 0:
+        nextFrontierList = []
+        for frontierWorkspaceCaseId in frontierList:
+            for parent in oldGraph.getParents(frontierWorkspaceCaseId):
+                if parent in visitedSet:
+                    continue
+                action = newDialogEngine.getAction(parent)
+                if action != None:
+                    return action.nextWorkspaceCaseId
+                visitedSet.add(parent)
+                nextFrontierList.append(parent)
+        frontierList = nextFrontierList
+    return None
+
+# contexts of the old version (cases the old engine continues from) the new engine does not continue from
+def computeRemapDict(oldVersion: ForestVersion, newVersion: ForestVersion):
+    oldForest = oldVersion.getForest()
+    newDialogEngine = newVersion.getDialogEngine()
+    remapDict = {}
+    for node in oldForest.getGraph().iterNodes():
+        workspaceCaseId = node.getWorkspaceCaseId()
+        oldAction = oldVersion.getDialogEngine().getAction(workspaceCaseId)
+        # a jump is never a context, sessions sit on where it leads
+        if oldAction == None or oldAction.nextWorkspaceCaseId != workspaceCaseId:
+            continue
+        newAction = newDialogEngine.getAction(workspaceCaseId)
+        if newAction != None:
+            if newAction.nextWorkspaceCaseId != workspaceCaseId:
+                remapDict[workspaceCaseId] = newAction.nextWorkspaceCaseId
+            continue
+        remappedWorkspaceCaseId = _nearestSurvivingAncestor(oldForest, newDialogEngine, workspaceCaseId)
+        if remappedWorkspaceCaseId == None:
+            rootWorkspaceCaseId = newVersion.getForest().getGraph().getRootDict().get(workspaceCaseId.getWorkspace())
+            remappedWorkspaceCaseId = None if rootWorkspaceCaseId == None else newDialogEngine.getAction(rootWorkspaceCaseId).nextWorkspaceCaseId
+        remapDict[workspaceCaseId] = remappedWorkspaceCaseId
+    return remapDict
+
+class VersionedForestHolder:
+    # the version served, only ever replaced as a whole
+    _current = None
+    # one reload at a time, readers never take it
+    _reloadLock = None
+    # callables taking (new ForestVersion, remap dictionary), called right after the swap
+    _swapListenerList = []
+    _backgroundThread = None
+
+    def __init__(self, initialTable = None):
+        self._current = None
+        self._reloadLock = threading.Lock()
+        self._swapListenerList = []
+        self._backgroundThread = None
+        if initialTable is not None:
+            result = self.reload(initialTable)
+            if result.version == None:
+                raise Exception("Initial FAQ sheet has " + str(len(result.issueList)) + " validation errors")
+
+    # lock free, the version returned stays usable after a swap until the caller lets go of it
+    def getCurrent(self):
+        return self._current
+
+    def getDialogEngine(self):
+        return self._current.getDialogEngine()
+
+    def addSwapListener(self, swapListener):
+        self._swapListenerList.append(swapListener)
+
+    # the server starts on the current engine and follows every swap with its remap
+    def attachSessionServer(self, sessionServer):
+        sessionServer.swapDialogEngine(self._current.getDialogEngine())
+        self.addSwapListener(lambda version, remapDict: sessionServer.swapDialogEngine(version.getDialogEngine(), remapDict))
+
+    def __buildVersion(self, table, versionNumber: int):
+        # parsed once for both passes
+        if _isDataFrame(table):
+            table = ParsedInputTable.fromDataFrame(table)
+        validator = InputTableValidator()
+        validator.preScanPass(table)
+        validator.validationPass()
+        if validator.getIssueStore().getErrorCount() > 0:
+            return None, validator
+        forest = DialogFlowForest()
+        forest.buildForrestFromInputTable(table)
+        # a sheet the validator lets through can still fail to compile, it is refused like a sheet with errors
+        try:
+            dialogEngine = DialogEngine(forest)
+        except Exception as e:
+            validator._logIssue(1, "ID", "Dialog engine cannot be compiled: " + str(e))
+            return None, validator
+        return ForestVersion(versionNumber, forest, dialogEngine, validator), validator
+
+    # Validate, build and compile table, then swap it in. A sheet with validation or compile errors is not served, the
+    # result then has no version and the issues of the sheet. table is a data frame, a ParsedInputTable or a row list,
+    # anything both the validator and the build can go over twice.
+    def reload(self, table):
+        with self._reloadLock:
+            previousVersion = self._current
+            startTime = time.perf_counter()
+            newVersion, validator = self.__buildVersion(table, 1 if previousVersion == None else previousVersion.getVersionNumber() + 1)
+            remapDict = {} if newVersion == None or previousVersion == None else computeRemapDict(previousVersion, newVersion)
+            buildSeconds = time.perf_counter() - startTime
+            if newVersion == None:
+                return ReloadResult(None, validator.getIssueStore().getIssueList(), {}, buildSeconds, 0.0)
+
+            startTime = time.perf_counter()
+            self._current = newVersion
+            for swapListener in self._swapListenerList:
+                swapListener(newVersion, remapDict)
+            swapSeconds = time.perf_counter() - startTime
+            return ReloadResult(newVersion, validator.getIssueStore().getIssueList(), remapDict, buildSeconds, swapSeconds)
+
+    # Reload in a background thread, onDone(ReloadResult) is called from that thread. Returns the thread.
+    def reloadInBackground(self, table, onDone = None):
+        def run():
+            result = self.reload(table)
+            if onDone != None:
+                onDone(result)
+        self._backgroundThread = threading.Thread(target=run, name="forest-reload", daemon=True)
+        self._backgroundThread.start()
+        return self._backgroundThread
+
+    def waitForReload(self, timeoutSeconds: float = None):
+        if self._backgroundThread != None:
+            self._backgroundThread.join(timeoutSeconds)
@@ -0,0 +1,272 @@
+import time
+import threading
+from abc import ABC, abstractmethod
+from io import TextIOBase
+from typing import NamedTuple
+
+###############################################################################
+# Pipeline instrumentation
+#
+# Every pipeline stage (pre-scan, validation, build, anytree projection, clone, diff, DRL and Mermaid emission) runs
+# inside a stage() block that records its wall time, how many rows or nodes it processed and, when memory tracing is
+# on, its peak traced memory. Stages that work per workspace record one entry per workspace. Records go to the sinks
+# added, with no sink a block costs a length check and hands back a shared do-nothing handle.
+#
+# Optional capture modes
+# * memory: tracemalloc runs for the instrumented stages, nested stages each get their own peak
+# * profile: a cProfile profiler runs for the instrumented stages, see getProfileStats()
+#
+# Stages nest per thread, a build in a background thread (see hotreload) keeps its own stack of running stages.
+# tracemalloc is process wide, it runs while any thread is in a stage, and the peak of a stage overlapping a stage of
+# another thread includes that thread's allocations. The profiler follows one thread at a time, the first one to
+# enter a stage while it is idle.
+
+class StageRecord(NamedTuple):
+    stage: str
+    # None for stages over the whole table or forest
+    workspace: str
+    wallSeconds: float
+    itemCount: int
+    # what the count is of: "rows", "nodes", "cases", "workspaces", "rules" or "lines"
+    itemKind: str
+    # None unless memory capture is on
+    peakBytes: int
+    # extra counters of the stage, such as rows per workspace
+    detail: dict
+
+class InstrumentationSink(ABC):
+    @abstractmethod
+    def record(self, stageRecord: StageRecord):
+        pass
+
+class InMemorySink(InstrumentationSink):
+    _recordList = []
+
+    def __init__(self):
+        self._recordList = []
+
+    def record(self, stageRecord: StageRecord):
+        self._recordList.append(stageRecord)
+
+    def getRecordList(self, stage: str = None):
+        if stage == None:
+            return list(self._recordList)
+        return [stageRecord for stageRecord in self._recordList if stageRecord.stage == stage]
+
+    # dictionary of stage (key) and (total wall seconds, total items, max peak bytes) (value)
+    def getStageSummary(self):
+        summaryDict = {}
+        for stageRecord in self._recordList:
+            wallSeconds, itemCount, peakBytes = summaryDict.get(stageRecord.stage, (0.0, 0, None))
+            if stageRecord.peakBytes != None:
+                peakBytes = stageRecord.peakBytes if peakBytes == None else max(peakBytes, stageRecord.peakBytes)
+            summaryDict[stageRecord.stage] = (wallSeconds + stageRecord.wallSeconds, itemCount + stageRecord.itemCount, peakBytes)
+        return summaryDict
+
+    def clear(self):
+        self._recordList = []
+
+# one JSON object per line, to a text stream or appended to a file
+class JsonLinesSink(InstrumentationSink):
+    _fileStream = None
+    _ownFileStream = False
+    _extraFieldDict = {}
+
+    def __init__(self, fileStreamOrPath, extraFieldDict: dict = None):
+        if isinstance(fileStreamOrPath, str):
+            self._fileStream = open(fileStreamOrPath, "a")
+            self._ownFileStream = True
+        else:
+            self._fileStream = fileStreamOrPath
+            self._ownFileStream = False
+        # fields added to every line, such as a release or commit
+        self._extraFieldDict = {} if extraFieldDict == None else extraFieldDict
+
+    def record(self, stageRecord: StageRecord):
+        fieldDict = dict(self._extraFieldDict)
+        fieldDict.update(stageRecord._asdict())
+        import json
+        self._fileStream.write(json.dumps(fieldDict, default=str) + "\n")
+
+    def close(self):
+        if self._ownFileStream:
+            self._fileStream.close()
+
+# Handle of a running stage, the stage tells how much it processed
+class _StageFrame:
+    __slots__ = ("stage", "workspace", "itemCount", "itemKind", "detail", "startSeconds", "startBytes", "peakBytes")
+
+    def __init__(self, stage: str, workspace: str):
+        self.stage = stage
+        self.workspace = workspace
+        self.itemCount = 0
+        self.itemKind = "nodes"
+        self.detail = None
+        self.startSeconds = 0.0
+        self.startBytes = 0
+        self.peakBytes = 0
+
+    def setItemCount(self, itemCount: int, itemKind: str = "nodes"):
+        self.itemCount = itemCount
+        self.itemKind = itemKind
+
+    def setDetail(self, detail: dict):
+        self.detail = detail
+
+    def isActive(self):
+        return True
+
+# what stage() hands out when nothing is listening
+class _InactiveStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        return False
+
+    def setItemCount(self, itemCount: int, itemKind: str = "nodes"):
+        pass
+
+    def setDetail(self, detail: dict):
+        pass
+
+    def isActive(self):
+        return False
+
+_inactive_stage = _InactiveStage()
+
+class _ActiveStage:
+    __slots__ = ("_instrumentation", "_frame")
+
+    def __init__(self, instrumentation, stage: str, workspace: str):
+        self._instrumentation = instrumentation
+        self._frame = _StageFrame(stage, workspace)
+
+    def __enter__(self):
+        self._instrumentation._enterStage(self._frame)
+        return self._frame
+
+    def __exit__(self, *excInfo):
+        self._instrumentation._exitStage(self._frame)
+        return False
+
+class PipelineInstrumentationSingleton:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PipelineInstrumentationSingleton, cls).__new__(cls)
+            cls._instance._sinkList = []
+            # running stages of the calling thread, innermost last
+            cls._instance._threadState = threading.local()
+            # guards the process wide capture state below
+            cls._instance._captureLock = threading.Lock()
+            # threads with a stage running
+            cls._instance._activeThreadCount = 0
+            cls._instance._captureMemory = False
+            cls._instance._startedTracemalloc = False
+            cls._instance._profiler = None
+            cls._instance._profiledThreadId = None
+        return cls._instance
+
+    def __frameStack(self):
+        frameStack = getattr(self._threadState, "frameStack", None)
+        if frameStack == None:
+            frameStack = []
+            self._threadState.frameStack = frameStack
+        return frameStack
+
+    def addSink(self, sink: InstrumentationSink):
+        self._sinkList.append(sink)
+        return sink
+
+    def removeSink(self, sink: InstrumentationSink):
+        self._sinkList.remove(sink)
+
+    def isEnabled(self):
+        return len(self._sinkList) > 0
+
+    def setCaptureMemory(self, captureMemory: bool):
+        self._captureMemory = captureMemory
+
+    def setCaptureProfile(self, captureProfile: bool):
+        import cProfile
+        with self._captureLock:
+            self._profiler = cProfile.Profile() if captureProfile else None
+            # a thread still running the old profiler stops it on its own
+            self._profiledThreadId = None
+
+    # cumulative profile of every instrumented stage since setCaptureProfile(True)
+    def getProfileStats(self):
+        if self._profiler == None:
+            return None
+        import pstats
+        return pstats.Stats(self._profiler)
+
+    def stage(self, stage: str, workspace: str = None):
+        if len(self._sinkList) == 0:
+            return _inactive_stage
+        return _ActiveStage(self, stage, workspace)
+
+    # tracemalloc, cProfile, pstats and json are only imported once a sink or capture mode uses them
+    def _enterStage(self, frame: _StageFrame):
+        import tracemalloc
+        frameStack = self.__frameStack()
+        if len(frameStack) == 0:
+            with self._captureLock:
+                self._activeThreadCount += 1
+                if self._captureMemory and tracemalloc.is_tracing() == False:
+                    tracemalloc.start()
+                    self._startedTracemalloc = True
+                if self._profiler != None and self._profiledThreadId == None:
+                    self._profiledThreadId = threading.get_ident()
+                    # the thread disables the profiler it enabled, even if setCaptureProfile swapped it meanwhile
+                    self._threadState.profiler = self._profiler
+                    self._profiler.enable()
+
+        if self._captureMemory:
+            currentBytes, peakBytes = tracemalloc.get_traced_memory()
+            # the enclosing stage keeps the peak it reached so far, the peak counter is then ours
+            if len(frameStack) > 0:
+                enclosingFrame = frameStack[-1]
+                enclosingFrame.peakBytes = max(enclosingFrame.peakBytes, peakBytes)
+            tracemalloc.reset_peak()
+            frame.startBytes = currentBytes
+            frame.peakBytes = currentBytes
+
+        frameStack.append(frame)
+        frame.startSeconds = time.perf_counter()
+
+    def _exitStage(self, frame: _StageFrame):
+        wallSeconds = time.perf_counter() - frame.startSeconds
+        import tracemalloc
+        frameStack = self.__frameStack()
+        frameStack.pop()
+
+        peakBytes = None
+        if self._captureMemory and tracemalloc.is_tracing():
+            frame.peakBytes = max(frame.peakBytes, tracemalloc.get_traced_memory()[1])
+            peakBytes = frame.peakBytes - frame.startBytes
+            if len(frameStack) > 0:
+                enclosingFrame = frameStack[-1]
+                enclosingFrame.peakBytes = max(enclosingFrame.peakBytes, frame.peakBytes)
+
+        if len(frameStack) == 0:
+            with self._captureLock:
+                self._activeThreadCount -= 1
+                profiler = getattr(self._threadState, "profiler", None)
+                if profiler != None:
+                    profiler.disable()
+                    self._threadState.profiler = None
+                    if self._profiledThreadId == threading.get_ident():
+                        self._profiledThreadId = None
+                if self._startedTracemalloc and self._activeThreadCount == 0:
+                    tracemalloc.stop()
+                    self._startedTracemalloc = False
+
+        stageRecord = StageRecord(frame.stage, frame.workspace, wallSeconds, frame.itemCount, frame.itemKind, peakBytes, frame.detail)
+        for sink in self._sinkList:
+            sink.record(stageRecord)
+
+def instrumentedStage(stage: str, workspace: str = None):
+    return PipelineInstrumentationSingleton().stage(stage, workspace)
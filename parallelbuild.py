@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from chatdialogflow import DialogFlowForest, InputTableValidator, _iterParsedRows
+
+###############################################################################
+# Workspace-sharded parallel build and validation
+#
+# Workspaces only refer to each other through switch references, so the rows are partitioned by WORKSPACE into
+# shards that are validated and built independently in a process pool. The shard forests and validators are merged
+# in sheet order, then the cross workspace references are checked on the merged symbol tables.
+
+# Contiguous runs of workspaces in sheet order with about the same row count each, contiguous so that merging the
+# shards in order keeps the workspaces in sheet order
+def _shardRowList(rowListByWorkspace: dict, shardCount: int):
+    totalRowCount = sum([len(rowList) for rowList in rowListByWorkspace.values()])
+    shardRowCount = max(1, -(-totalRowCount // shardCount))
+
+    shardList = []
+    currentShard = []
+    for rowList in rowListByWorkspace.values():
+        currentShard.extend(rowList)
+        if len(currentShard) >= shardRowCount:
+            shardList.append(currentShard)
+            currentShard = []
+    if len(currentShard) > 0:
+        shardList.append(currentShard)
+    return shardList
+
+# worker process entry: validate and build one shard
+def _buildShard(rowList: list, validate: bool, build: bool):
+    validator = None
+    if validate:
+        validator = InputTableValidator()
+        validator.preScanPass(rowList)
+        validator.validationPass(crossWorkspace=False)
+
+    forest = None
+    if build:
+        forest = DialogFlowForest()
+        forest.buildForrestFromInputTable(rowList)
+    return forest, validator
+
+# Returns (forest, validator), each None when build or validate is False. processCount None uses every core, 1 builds
+# the shards in this process. A forest can only be built from a well formed table, same as the serial passes, so a
+# sheet that may have issues is validated first with build False.
+def parallelBuild(table, processCount: int = None, validate: bool = True, build: bool = True):
+    if processCount == None:
+        processCount = os.cpu_count()
+
+    rowListByWorkspace = {}
+    for row in _iterParsedRows(table):
+        if row.workspace in rowListByWorkspace:
+            rowListByWorkspace.get(row.workspace).append(row)
+        else:
+            rowListByWorkspace.update({row.workspace: [row]})
+    # a few shards per process so one big workspace does not hold up the pool
+    shardList = _shardRowList(rowListByWorkspace, processCount * 4)
+
+    if processCount > 1 and len(shardList) > 1:
+        with ProcessPoolExecutor(max_workers=processCount) as executor:
+            resultList = list(executor.map(_buildShard, shardList, [validate] * len(shardList), [build] * len(shardList)))
+    else:
+        resultList = [_buildShard(rowList, validate, build) for rowList in shardList]
+
+    forest = DialogFlowForest() if build else None
+    validator = InputTableValidator() if validate else None
+    for shardForest, shardValidator in resultList:
+        if build:
+            forest.mergeForest(shardForest)
+        if validate:
+            validator.mergeValidator(shardValidator)
+    if validate:
+        validator.crossWorkspacePass()
+    return forest, validator
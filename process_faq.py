@@ -2,20 +2,24 @@ import sys
 import math
 import pandas as pd
 from anytree import Node, PreOrderIter
-from chatdialogflow import BaseNode, ButtonCaseIdListNode, JumpToNode, LeafNode, DialogFlowForest, WorkspaceCaseId, NodeToDrlRulePrinterSingleton, isBlank, InputTableValidator
+from flowanalysis import DialogFlowAnalyzer
+from chatdialogflow import BaseNode, ButtonCaseIdListNode, JumpToNode, LeafNode, DialogFlowForest, WorkspaceCaseId, NodeToDrlRulePrinterSingleton, isBlank, InputTableValidator, ParsedInputTable
 
 myValidator = InputTableValidator()
 
 df = pd.read_excel('faq.xlsx') # or read_sql()
 
+# parse the table once, validator and tree builder share the parsed rows
+parsedTable = ParsedInputTable.fromDataFrame(df)
+
 ###############################################################################
 # This is a demo/test of happy flow on a well formed input table
 
 ###############################################################################
 # Validation pass
 
-myValidator.preScanPass(df)
-myValidator.validationPass(df)
+myValidator.preScanPass(parsedTable)
+myValidator.validationPass(parsedTable)
 
 ###############################################################################
 # main pass building tree
@@ -23,20 +27,19 @@ myValidator.validationPass(df)
 
 dialogFlowForest = DialogFlowForest()
 
-dialogFlowForest.buildForrestFromInputTable(df)
+dialogFlowForest.buildForrestFromInputTable(parsedTable)
 
-# TODO: tree verifier
+###############################################################################
+# flow analysis, dead rows are reported and pruned so they never reach the rule base
+flowAnalysisReport = DialogFlowAnalyzer().analyze(dialogFlowForest)
+flowAnalysisReport.printReport(sys.stdout)
+DialogFlowAnalyzer().pruneUnreachable(dialogFlowForest, flowAnalysisReport)
 
 ##############################################
 # tree visualization dump
 dialogFlowForest.printForest(sys.stdout)
 dialogFlowForest.printMermaid(sys.stdout)
 
-NodeToDrlRulePrinterSingleton().printHeader(sys.stdout)
-#print(dialogFlowForest.getTreeRootsList())
-for root in dialogFlowForest.getTreeRootsList():
-    for node in PreOrderIter(root):
-        NodeToDrlRulePrinterSingleton().printRuleCommentForNode(node, sys.stdout)
-        NodeToDrlRulePrinterSingleton().printRuleForNode(node, sys.stdout)
-        print("##############", file=sys.stdout)
-        
\ No newline at end of file
+# one rule per real node, each workspace rendered into one buffer and written at once
+for workspace in dialogFlowForest.getGraph().getRootDict().keys():
+    NodeToDrlRulePrinterSingleton().printWorkspace(dialogFlowForest, workspace, sys.stdout)
@@ -0,0 +1,269 @@
+import os
+import pickle
+from chatdialogflow import DialogFlowForest, ButtonCaseIdListNode, JumpToNode, WorkspaceCaseId, DialogFlowDiffEngine, _digest
+
+###############################################################################
+# Versioned snapshot store with structural sharing
+#
+# Every committed forest becomes a version made of content addressed objects, an object already stored by an earlier
+# version is referenced instead of stored again
+# * node record: a detached copy of the node, keyed by its node hash (case and content)
+# * page: a run of (node hash, subtree hash) entries of a workspace in input table order. Pages are cut after every
+#   entry whose node hash starts with a byte divisible by page_boundary_modulus, the cut points depend on the content
+#   only, so an inserted or edited row only changes the page it is in and the pages of its ancestors' subtree hashes
+# * workspace manifest: workspace hash, source cases, page keys and root of one workspace
+# * version: the workspace manifests in sheet order, plus a label
+# A version therefore adds the records and pages its changes touched, not a copy of the forest.
+#
+# StoredVersionGraph answers the graph questions DialogFlowDiffEngine asks straight from the stored hashes, a
+# workspace is only unpacked when its hash differs, so a diff between any two versions costs the changed workspaces.
+#
+# storeDirectory/
+#   versions/<version number>.pickle   objects first stored by that version, and the version itself
+
+page_boundary_modulus = 16
+
+class StoredVersion:
+    _versionNumber = 0
+    _label = None
+    # tuple of (workspace, workspace manifest key) in sheet order
+    _workspaceManifestKeyList = ()
+
+    def __init__(self, versionNumber: int, label: str, workspaceManifestKeyList: tuple):
+        self._versionNumber = versionNumber
+        self._label = label
+        self._workspaceManifestKeyList = workspaceManifestKeyList
+
+    def getVersionNumber(self):
+        return self._versionNumber
+
+    def getLabel(self):
+        return self._label
+
+    def getWorkspaceManifestKeyList(self):
+        return self._workspaceManifestKeyList
+
+# Graph view of a stored version, the subset of DialogFlowGraph the diff engine and readers use
+class StoredVersionGraph:
+    _store = None
+    _version = None
+    # dictionary of workspace (key) and workspace manifest (value)
+    _manifestDict = {}
+    # unpacked workspaces, dictionary of workspace (key) and dictionary of WorkspaceCaseId to node (value), with the
+    # hashes and edges of their nodes in the dictionaries below
+    _nodeDictByWorkspace = {}
+    _nodeHashDict = {}
+    _subtreeHashDict = {}
+    _childrenDict = {}
+    _parentsDict = {}
+    _jumpToDict = {}
+
+    def __init__(self, store, version: StoredVersion):
+        self._store = store
+        self._version = version
+        self._manifestDict = {workspace: store._getObject(manifestKey) for workspace, manifestKey in version.getWorkspaceManifestKeyList()}
+        self._nodeDictByWorkspace = {}
+        self._nodeHashDict = {}
+        self._subtreeHashDict = {}
+        self._childrenDict = {}
+        self._parentsDict = {}
+        self._jumpToDict = {}
+
+    def __unpackWorkspace(self, workspace: str):
+        nodeDict = self._nodeDictByWorkspace.get(workspace)
+        if nodeDict != None or workspace not in self._manifestDict:
+            return nodeDict
+
+        nodeDict = {}
+        workspaceHash, sourceList, pageKeyList, rootWorkspaceCaseId = self._manifestDict.get(workspace)
+        for pageKey in pageKeyList:
+            for nodeHash, subtreeHash in self._store._getObject(pageKey):
+                node = self._store._getObject(nodeHash)
+                workspaceCaseId = node.getWorkspaceCaseId()
+                nodeDict[workspaceCaseId] = node
+                self._nodeHashDict[workspaceCaseId] = nodeHash
+                self._subtreeHashDict[workspaceCaseId] = subtreeHash
+
+        # same edges as DialogFlowGraph.link()
+        for workspaceCaseId, node in nodeDict.items():
+            if isinstance(node, ButtonCaseIdListNode):
+                childList = tuple([WorkspaceCaseId(workspace, buttonCaseId) for buttonCaseId in node.getButtonCaseIdList()])
+                self._childrenDict[workspaceCaseId] = childList
+                for childWorkspaceCaseId in childList:
+                    if childWorkspaceCaseId in self._parentsDict:
+                        self._parentsDict.get(childWorkspaceCaseId).append(workspaceCaseId)
+                    else:
+                        self._parentsDict.update({childWorkspaceCaseId: [workspaceCaseId]})
+            elif isinstance(node, JumpToNode):
+                self._jumpToDict[workspaceCaseId] = WorkspaceCaseId(workspace, node.getJumpToCaseId())
+        self._nodeDictByWorkspace[workspace] = nodeDict
+        return nodeDict
+
+    def getVersion(self):
+        return self._version
+
+    def getWorkspaceList(self):
+        return list(self._manifestDict.keys())
+
+    def getWorkspaceHash(self, workspace: str):
+        return self._manifestDict.get(workspace)[0]
+
+    def getSourceList(self, workspace: str):
+        return list(self._manifestDict.get(workspace)[1])
+
+    def getNodeDict(self, workspace: str):
+        return self.__unpackWorkspace(workspace)
+
+    def getNode(self, workspaceCaseId: WorkspaceCaseId):
+        nodeDict = self.__unpackWorkspace(workspaceCaseId.getWorkspace())
+        if nodeDict == None:
+            return None
+        return nodeDict.get(workspaceCaseId)
+
+    def iterNodes(self, workspace: str = None):
+        for nodeWorkspace in ([workspace] if workspace != None else self.getWorkspaceList()):
+            yield from (self.__unpackWorkspace(nodeWorkspace) or {}).values()
+
+    def getRootDict(self):
+        return {workspace: manifest[3] for workspace, manifest in self._manifestDict.items() if manifest[3] != None}
+
+    def getChildren(self, workspaceCaseId: WorkspaceCaseId):
+        self.__unpackWorkspace(workspaceCaseId.getWorkspace())
+        return self._childrenDict.get(workspaceCaseId, ())
+
+    def getParents(self, workspaceCaseId: WorkspaceCaseId):
+        self.__unpackWorkspace(workspaceCaseId.getWorkspace())
+        return tuple(self._parentsDict.get(workspaceCaseId, ()))
+
+    def getJumpToTarget(self, workspaceCaseId: WorkspaceCaseId):
+        self.__unpackWorkspace(workspaceCaseId.getWorkspace())
+        return self._jumpToDict.get(workspaceCaseId)
+
+    def getNodeHash(self, workspaceCaseId: WorkspaceCaseId):
+        self.__unpackWorkspace(workspaceCaseId.getWorkspace())
+        return self._nodeHashDict.get(workspaceCaseId)
+
+    def getSubtreeHash(self, workspaceCaseId: WorkspaceCaseId):
+        self.__unpackWorkspace(workspaceCaseId.getWorkspace())
+        return self._subtreeHashDict.get(workspaceCaseId)
+
+    # workspaces unpacked so far, a diff only unpacks the ones whose hash changed
+    def getUnpackedWorkspaceList(self):
+        return list(self._nodeDictByWorkspace.keys())
+
+class SnapshotStore:
+    _storeDirectory = None
+    # dictionary of object key (key) and node record, page or workspace manifest (value)
+    _objectDict = {}
+    # list of StoredVersion, version numbers start at 1
+    _versionList = []
+    _storedByteCount = 0
+
+    # storeDirectory None keeps the history in memory only
+    def __init__(self, storeDirectory: str = None):
+        self._storeDirectory = storeDirectory
+        self._objectDict = {}
+        self._versionList = []
+        self._storedByteCount = 0
+        if storeDirectory != None:
+            os.makedirs(os.path.join(storeDirectory, "versions"), exist_ok=True)
+            self.__loadVersions()
+
+    def __versionFilePath(self, versionNumber: int):
+        return os.path.join(self._storeDirectory, "versions", str(versionNumber) + ".pickle")
+
+    def __loadVersions(self):
+        versionNumber = 1
+        while os.path.exists(self.__versionFilePath(versionNumber)):
+            with open(self.__versionFilePath(versionNumber), "rb") as versionFile:
+                newObjectDict, versionTuple = pickle.load(versionFile)
+            self._objectDict.update(newObjectDict)
+            self._versionList.append(StoredVersion(*versionTuple))
+            self._storedByteCount += os.path.getsize(self.__versionFilePath(versionNumber))
+            versionNumber += 1
+
+    def _getObject(self, objectKey: bytes):
+        return self._objectDict.get(objectKey)
+
+    def __putObject(self, objectKey: bytes, storedObject, newObjectDict: dict):
+        if objectKey not in self._objectDict:
+            self._objectDict[objectKey] = storedObject
+            newObjectDict[objectKey] = storedObject
+
+    def __commitWorkspace(self, graph, workspace: str, newObjectDict: dict):
+        pageKeyList = []
+        pageEntryList = []
+        for node in graph.iterNodes(workspace):
+            workspaceCaseId = node.getWorkspaceCaseId()
+            nodeHash = graph.getNodeHash(workspaceCaseId)
+            if nodeHash not in self._objectDict:
+                # the store keeps its own copy, the forest's node may get projected or replaced
+                self.__putObject(nodeHash, node.clone(), newObjectDict)
+            pageEntryList.append((nodeHash, graph.getSubtreeHash(workspaceCaseId)))
+            if nodeHash[0] % page_boundary_modulus == 0:
+                pageKeyList.append(self.__commitPage(pageEntryList, newObjectDict))
+                pageEntryList = []
+        if len(pageEntryList) > 0:
+            pageKeyList.append(self.__commitPage(pageEntryList, newObjectDict))
+
+        workspaceHash = graph.getWorkspaceHash(workspace)
+        rootWorkspaceCaseId = graph.getRootDict().get(workspace)
+        manifest = (workspaceHash, tuple(graph.getSourceList(workspace)), tuple(pageKeyList), rootWorkspaceCaseId)
+        manifestKey = _digest(b"manifest", workspaceHash, str(rootWorkspaceCaseId).encode(), *pageKeyList)
+        self.__putObject(manifestKey, manifest, newObjectDict)
+        return manifestKey
+
+    def __commitPage(self, pageEntryList: list, newObjectDict: dict):
+        pageKey = _digest(b"page", *[nodeHash + subtreeHash for nodeHash, subtreeHash in pageEntryList])
+        self.__putObject(pageKey, tuple(pageEntryList), newObjectDict)
+        return pageKey
+
+    # Store forest as the next version, returns its version number
+    def commit(self, forest: DialogFlowForest, label: str = None):
+        graph = forest.getGraph()
+        newObjectDict = {}
+        workspaceManifestKeyList = tuple([(workspace, self.__commitWorkspace(graph, workspace, newObjectDict)) for workspace in graph.getWorkspaceList()])
+        version = StoredVersion(len(self._versionList) + 1, label, workspaceManifestKeyList)
+
+        if self._storeDirectory != None:
+            versionFilePath = self.__versionFilePath(version.getVersionNumber())
+            with open(versionFilePath + ".tmp", "wb") as versionFile:
+                pickle.dump((newObjectDict, (version.getVersionNumber(), label, workspaceManifestKeyList)), versionFile, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(versionFilePath + ".tmp", versionFilePath)
+            self._storedByteCount += os.path.getsize(versionFilePath)
+
+        self._versionList.append(version)
+        return version.getVersionNumber()
+
+    def getVersionCount(self):
+        return len(self._versionList)
+
+    def getVersion(self, versionNumber: int):
+        if versionNumber < 1 or versionNumber > len(self._versionList):
+            raise Exception("Version " + str(versionNumber) + " is not in the store")
+        return self._versionList[versionNumber - 1]
+
+    def getVersionGraph(self, versionNumber: int):
+        return StoredVersionGraph(self, self.getVersion(versionNumber))
+
+    # A forest of its own for a stored version, for serving or rendering it
+    def getForest(self, versionNumber: int):
+        versionGraph = self.getVersionGraph(versionNumber)
+        forest = DialogFlowForest()
+        graph = forest.getGraph()
+        for node in versionGraph.iterNodes():
+            graph.addNode(node.clone())
+        for rootWorkspaceCaseId in versionGraph.getRootDict().values():
+            graph.setRoot(rootWorkspaceCaseId)
+        graph.link()
+        return forest
+
+    def diff(self, oldVersionNumber: int, newVersionNumber: int):
+        return DialogFlowDiffEngine().diff(self.getVersionGraph(oldVersionNumber), self.getVersionGraph(newVersionNumber))
+
+    def getObjectCount(self):
+        return len(self._objectDict)
+
+    # bytes of the version files, 0 for a store kept in memory
+    def getStoredByteCount(self):
+        return self._storedByteCount
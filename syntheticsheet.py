@@ -0,0 +1,129 @@
+import random
+import pandas as pd
+from typing import NamedTuple
+from chatdialogflow import faq_column, root_reserved_case_id
+
+###############################################################################
+# Synthetic FAQ sheets for the benchmarks, nothing but pandas and the column mapping is imported so the suite can
+# generate sheets without loading the benchmarks themselves
+
+faq_header = ["ID", "WORKSPACE", "CASE_ID", "INTENT_LIST", "JUMP_TO_CASE", "RESPONSE_ID_LIST", "ACTION_BUTTON_ID_LIST",
+              "PROCEDURE_ADVISORY_ID_LIST", "BUTTON_CASE_ID_LIST", "BUTTON_EN", "BUTTON_TC", "BUTOON_SC", "SET_BUSINESS_SCOPE",
+              "SET_ENQUIRY_CATEGORY", "SET_PRODUCT_TYPE", "SET_CONTEXT_EXPRESSION", "SPECIFIED_CHANNEL", "SPECIFIED_LOGIN",
+              "SPECIFIED_START_DATE", "SPECIFIED_END_DATE"]
+
+def _syntheticCaseId(index: int):
+    if index == 0:
+        return root_reserved_case_id
+    return "CASE_" + str(index)
+
+###############################################################################
+# Heap shaped input table, used by benchmark.py
+#
+# Each workspace is a complete tree laid out like a heap, case i has children i*fanOut+1 .. i*fanOut+fanOut,
+# case 0 is the reserved root. Every 7th leaf jumps back to the root.
+
+def generateSyntheticFaqTable(workspaceCount: int, rowsPerWorkspace: int, fanOut: int = 4):
+    rowList = []
+    for workspaceIndex in range(workspaceCount):
+        workspace = "WS_" + str(workspaceIndex)
+        for index in range(rowsPerWorkspace):
+            row = [None] * len(faq_header)
+            row[faq_column.get("WORKSPACE")-1] = workspace
+            row[faq_column.get("CASE_ID")-1] = _syntheticCaseId(index)
+            row[faq_column.get("RESPONSE_ID_LIST")-1] = "RESPONSE_" + str(index)
+
+            childIndexList = [child for child in range(index * fanOut + 1, index * fanOut + fanOut + 1) if child < rowsPerWorkspace]
+            if len(childIndexList) > 0:
+                row[faq_column.get("BUTTON_CASE_ID_LIST")-1] = ", ".join(_syntheticCaseId(child) for child in childIndexList)
+                row[faq_column.get("ACTION_BUTTON_ID_LIST")-1] = ", ".join("BUTTON_" + str(child) for child in childIndexList)
+            elif index % 7 == 0:
+                row[faq_column.get("JUMP_TO_CASE")-1] = root_reserved_case_id
+            else:
+                row[faq_column.get("PROCEDURE_ADVISORY_ID_LIST")-1] = "CAROUSEL_" + str(index) + ", CAROUSEL_" + str(index + 1)
+            rowList.append(row)
+
+    return pd.DataFrame(rowList, columns=faq_header)
+
+# Shape of a synthetic sheet, the same spec and seed always give the same sheet
+class SyntheticSheetSpec(NamedTuple):
+    workspaceCount: int
+    # total rows over all workspaces, fewer when depth and fan-out cap the trees
+    rowCount: int
+    # turns from MIN_START to the deepest case
+    depth: int
+    fanOut: int
+    # share of non-root cases that also get a button on a second menu one level up
+    sharedChildRatio: float
+    # share of leaves that jump to a case closer to MIN_START
+    jumpToDensity: float
+    seed: int = 7
+
+###############################################################################
+# Synthetic sheet generator
+#
+# Each workspace is grown breadth first from MIN_START, every menu gets fanOut new cases until the row budget of the
+# workspace or the depth is used up. Shared children only get extra parents on the level above and jumps only go to
+# shallower cases, so the sheet passes validation and the button graph stays acyclic.
+
+def _generateWorkspaceRowList(workspace: str, rowCount: int, spec: SyntheticSheetSpec, rng: random.Random):
+    # depth of every case index, and the children of every menu
+    depthList = [0]
+    childIndexListDict = {}
+    nextParentIndex = 0
+    while len(depthList) < rowCount and nextParentIndex < len(depthList):
+        if depthList[nextParentIndex] < spec.depth:
+            childIndexList = list(range(len(depthList), min(len(depthList) + spec.fanOut, rowCount)))
+            depthList.extend([depthList[nextParentIndex] + 1] * len(childIndexList))
+            childIndexListDict.update({nextParentIndex: childIndexList})
+        nextParentIndex += 1
+
+    menuIndexListByDepth = {}
+    for menuIndex in childIndexListDict.keys():
+        depth = depthList[menuIndex]
+        if depth in menuIndexListByDepth:
+            menuIndexListByDepth.get(depth).append(menuIndex)
+        else:
+            menuIndexListByDepth.update({depth: [menuIndex]})
+
+    for index in range(1, len(depthList)):
+        if rng.random() >= spec.sharedChildRatio:
+            continue
+        menuIndexList = menuIndexListByDepth.get(depthList[index] - 1)
+        otherMenuIndex = rng.choice(menuIndexList)
+        if index not in childIndexListDict.get(otherMenuIndex):
+            childIndexListDict.get(otherMenuIndex).append(index)
+
+    # cases are numbered breadth first, every case before the first one of a depth is shallower
+    firstIndexByDepth = {}
+    for index, depth in enumerate(depthList):
+        if depth not in firstIndexByDepth:
+            firstIndexByDepth.update({depth: index})
+
+    rowList = []
+    for index, depth in enumerate(depthList):
+        row = [None] * len(faq_header)
+        row[faq_column.get("WORKSPACE")-1] = workspace
+        row[faq_column.get("CASE_ID")-1] = _syntheticCaseId(index)
+        row[faq_column.get("RESPONSE_ID_LIST")-1] = "RESPONSE_" + str(index)
+
+        childIndexList = childIndexListDict.get(index)
+        if childIndexList != None:
+            row[faq_column.get("BUTTON_CASE_ID_LIST")-1] = ", ".join(_syntheticCaseId(child) for child in childIndexList)
+            row[faq_column.get("ACTION_BUTTON_ID_LIST")-1] = ", ".join("BUTTON_" + str(child) for child in childIndexList)
+        elif rng.random() < spec.jumpToDensity:
+            row[faq_column.get("JUMP_TO_CASE")-1] = _syntheticCaseId(rng.randrange(firstIndexByDepth.get(depth)))
+        else:
+            row[faq_column.get("PROCEDURE_ADVISORY_ID_LIST")-1] = "CAROUSEL_" + str(index) + ", CAROUSEL_" + str(index + 1)
+        rowList.append(row)
+    return rowList
+
+def generateSyntheticSheet(spec: SyntheticSheetSpec):
+    rng = random.Random(spec.seed)
+    rowList = []
+    for workspaceIndex in range(spec.workspaceCount):
+        # the remainder goes to the first workspaces
+        workspaceRowCount = spec.rowCount // spec.workspaceCount + (1 if workspaceIndex < spec.rowCount % spec.workspaceCount else 0)
+        if workspaceRowCount > 0:
+            rowList.extend(_generateWorkspaceRowList("WS_" + str(workspaceIndex), workspaceRowCount, spec, rng))
+    return pd.DataFrame(rowList, columns=faq_header)
@@ -0,0 +1,115 @@
+import pandas as pd
+from itertools import islice
+from chatdialogflow import ParsedInputTable, InputTableValidator, DialogFlowForest, first_data_row_number
+
+###############################################################################
+# Streaming ingestion
+#
+# The input table is read and parsed chunk by chunk, every chunk goes through the same columnar parsing as a whole
+# data frame and is dropped once the pre-scan and the forest build have seen it. Peak memory is then the forest plus
+# one chunk instead of the forest plus the whole raw table.
+#
+# Sources are positional like the sheet, the faq_column numbers apply to CSV, Parquet and cursor columns alike.
+
+default_chunk_size = 10000
+
+# Iterable of ParsedRow read from a source one chunk at a time, row numbers continue across chunks as in the sheet.
+# chunkDataFrameFactory returns a fresh iterator of data frames each time, so file sources can be iterated again,
+# a cursor source can only be iterated once.
+class RowChunkStream:
+    _chunkDataFrameFactory = None
+
+    def __init__(self, chunkDataFrameFactory):
+        self._chunkDataFrameFactory = chunkDataFrameFactory
+
+    # lists of ParsedRow, one per chunk
+    def iterChunks(self):
+        firstRowNumber = first_data_row_number
+        for df in self._chunkDataFrameFactory():
+            rowList = ParsedInputTable.fromDataFrame(df, firstRowNumber).getRowList()
+            firstRowNumber += len(df)
+            yield rowList
+
+    def __iter__(self):
+        for rowList in self.iterChunks():
+            yield from rowList
+
+    @staticmethod
+    def fromDataFrameChunks(dataFrameIterable):
+        return RowChunkStream(lambda: iter(dataFrameIterable))
+
+    # cells are read as text, a numeric ID column with blanks would otherwise turn into floats
+    @staticmethod
+    def fromCsv(filePath: str, chunkSize: int = default_chunk_size):
+        return RowChunkStream(lambda: pd.read_csv(filePath, chunksize=chunkSize, dtype=str))
+
+    @staticmethod
+    def fromExcel(filePath: str, chunkSize: int = default_chunk_size):
+        def chunkDataFrameIter():
+            from openpyxl import load_workbook
+            workbook = load_workbook(filePath, read_only=True)
+            try:
+                rowIter = _dropTrailingBlankRows(workbook.worksheets[0].iter_rows(min_row=2, values_only=True))
+                yield from _iterRecordChunks(lambda: list(islice(rowIter, chunkSize)))
+            finally:
+                workbook.close()
+        return RowChunkStream(chunkDataFrameIter)
+
+    # needs pyarrow
+    @staticmethod
+    def fromParquet(filePath: str, chunkSize: int = default_chunk_size):
+        def chunkDataFrameIter():
+            import pyarrow.parquet
+            for recordBatch in pyarrow.parquet.ParquetFile(filePath).iter_batches(batch_size=chunkSize):
+                yield recordBatch.to_pandas()
+        return RowChunkStream(chunkDataFrameIter)
+
+    # DB-API cursor with an executed query, selecting the sheet columns in sheet order
+    @staticmethod
+    def fromCursor(cursor, chunkSize: int = default_chunk_size):
+        return RowChunkStream(lambda: _iterRecordChunks(lambda: cursor.fetchmany(chunkSize)))
+
+# blank rows at the end of a sheet are dropped like read_excel() does, the ones in between keep the row numbers right
+def _dropTrailingBlankRows(rowIter):
+    blankRowList = []
+    for row in rowIter:
+        if all(value == None for value in row):
+            blankRowList.append(row)
+            continue
+        yield from blankRowList
+        blankRowList = []
+        yield row
+
+# data frames of fetched records until fetchChunk() comes back empty
+def _iterRecordChunks(fetchChunk):
+    while True:
+        recordList = fetchChunk()
+        if len(recordList) == 0:
+            return
+        yield pd.DataFrame.from_records(recordList)
+
+# One pass over the stream feeding the pre-scan and node creation chunk by chunk, then the passes that need the whole
+# table: validation on the symbol tables and, for a sheet without errors, linking of the forest. Same order as the
+# batch path, a reference to a missing case is reported as an issue instead of failing the link.
+# Returns True when the forest was linked, a forest of a sheet with errors is left unlinked and must not be used.
+def ingestRowStream(rowStream: RowChunkStream, validator: InputTableValidator = None, forest: DialogFlowForest = None):
+    def preScannedRowIter():
+        for rowList in rowStream.iterChunks():
+            if validator != None:
+                validator.preScanPass(rowList)
+            yield from rowList
+
+    if forest != None:
+        forest.buildForrestFromInputTable(preScannedRowIter(), linkNodes=False)
+    else:
+        for row in preScannedRowIter():
+            pass
+
+    if validator != None:
+        validator.validationPass()
+        if validator.getIssueStore().getErrorCount() > 0:
+            return False
+
+    if forest != None:
+        forest.linkForest()
+    return forest != None
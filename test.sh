@@ -4,5 +4,22 @@ rm -rf htmlcov
 python3 -m coverage run -a process_faq.py 
 python3 -m coverage run -a test_treediff.py
 python3 -m coverage run -a validator_test.py
+python3 -m coverage run -a test_incremental.py
+python3 -m coverage run -a test_dialogengine.py
+python3 -m coverage run -a test_dialogserving.py
+python3 -m coverage run -a test_drlgenerator.py
+python3 -m coverage run -a test_buildcache.py
+python3 -m coverage run -a test_forestsnapshot.py
+python3 -m coverage run -a test_tablestream.py
+python3 -m coverage run -a test_parallelbuild.py
+python3 -m coverage run -a test_flowanalysis.py
+python3 -m coverage run -a test_instrumentation.py
+python3 -m coverage run -a test_benchsuite.py
+python3 -m coverage run -a test_flowrender.py
+python3 -m coverage run -a test_lightruntime.py
+python3 -m coverage run -a test_hotreload.py
+python3 -m coverage run -a test_snapshotstore.py
+python3 -m coverage run -a test_flowindex.py
+python3 -m coverage run -a test_entrypath.py
 python3 -m coverage html
 
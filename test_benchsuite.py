@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, faq_column
+from flowanalysis import DialogFlowAnalyzer
+from syntheticsheet import SyntheticSheetSpec, generateSyntheticSheet
+from benchsuite import runBenchmarkSuite, writeBenchmarkResults, readBenchmarkResults, printBenchmarkResults, compareBenchmarkResults
+
+###############################################################################
+# Synthetic sheets are well formed and reproducible, a tiny suite run round trips through JSON
+
+spec = SyntheticSheetSpec(workspaceCount=3, rowCount=600, depth=4, fanOut=3, sharedChildRatio=0.2, jumpToDensity=0.3)
+df = generateSyntheticSheet(spec)
+assert df.equals(generateSyntheticSheet(spec))
+# depth 4 with fan-out 3 holds 121 cases per workspace
+assert len(df) == 3 * 121
+
+parsedTable = ParsedInputTable.fromDataFrame(df)
+validator = InputTableValidator()
+validator.preScanPass(parsedTable)
+validator.validationPass()
+assert len(validator.getIssueSet()) == 0
+
+forest = DialogFlowForest()
+forest.buildForrestFromInputTable(parsedTable)
+graph = forest.getGraph()
+workspaceCaseIdList = [workspaceCaseId for workspace in graph.getWorkspaceList() for workspaceCaseId in graph.getNodeDict(workspace).keys()]
+assert any([len(graph.getParents(workspaceCaseId)) > 1 for workspaceCaseId in workspaceCaseIdList])
+assert df.iloc[:, faq_column.get("JUMP_TO_CASE")-1].notna().sum() > 0
+analysis = DialogFlowAnalyzer().analyzeWorkspace(forest, "WS_0")
+assert analysis.getMaxDepth() == 4 and analysis.getUnreachableList() == []
+
+resultDict = runBenchmarkSuite(["tiny"], 1, {"tiny": spec})
+printBenchmarkResults(resultDict, sys.stdout)
+scaleResult = resultDict.get("resultList")[0]
+assert scaleResult.get("issueCount") == 0 and scaleResult.get("changedCount") > 0
+assert list(scaleResult.get("stageDict").keys()) == ["ingestion", "validation", "build", "clone", "diff", "drl", "mermaid"]
+
+with tempfile.TemporaryDirectory() as resultDirectory:
+    resultFilePath = os.path.join(resultDirectory, "results.json")
+    writeBenchmarkResults(resultDict, resultFilePath)
+    assert readBenchmarkResults(resultFilePath) == resultDict
+    # no stage is slower than itself
+    assert compareBenchmarkResults(resultDict, readBenchmarkResults(resultFilePath), sys.stdout) == []
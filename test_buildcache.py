@@ -0,0 +1,78 @@
+import io
+import sys
+import tempfile
+import pandas as pd
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, NodeToDrlRulePrinterSingleton, DialogFlowDiffEngine
+from buildcache import BuildCache
+
+###############################################################################
+# Build cache on faq.xlsx: cold build, warm build from the unchanged file, then an edit in one of two workspaces
+
+with tempfile.TemporaryDirectory() as cacheDirectory:
+    buildCache = BuildCache(cacheDirectory)
+
+    coldResult = buildCache.buildFromFile('faq.xlsx')
+    print("cold built " + str(sorted(coldResult.getBuiltWorkspaceSet())))
+    warmResult = buildCache.buildFromFile('faq.xlsx')
+    print("warm hit " + str(sorted(warmResult.getHitWorkspaceSet())))
+    assert warmResult.getBuiltWorkspaceSet() == set()
+
+    # cached artifacts match a plain build
+    parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+    dialogFlowForest = DialogFlowForest()
+    dialogFlowForest.buildForrestFromInputTable(parsedTable)
+    assert warmResult.getWorkspaceBuild("Default").getDrlText() == NodeToDrlRulePrinterSingleton().renderWorkspace(dialogFlowForest, "Default")
+    mermaidStream = io.StringIO()
+    dialogFlowForest.printMermaid(mermaidStream)
+    cachedMermaidStream = io.StringIO()
+    warmResult.printMermaid(cachedMermaidStream)
+    assert cachedMermaidStream.getvalue() == mermaidStream.getvalue()
+    assert DialogFlowDiffEngine().diff(warmResult.getForest(), dialogFlowForest).isEmpty()
+
+    # second workspace with the faq_mod.xlsx flow, only that workspace is rebuilt when it changes
+    modRowList = ParsedInputTable.fromDataFrame(pd.read_excel('faq_mod.xlsx')).getRowList()
+    otherRowList = [row._replace(rowNumber=row.rowNumber + len(parsedTable), workspace="Other") for row in modRowList]
+    twoWorkspaceTable = ParsedInputTable(parsedTable.getRowList() + otherRowList)
+    print("two workspaces built " + str(sorted(buildCache.build(twoWorkspaceTable).getBuiltWorkspaceSet())))
+
+    editedRowList = list(otherRowList)
+    editedRowList[0] = editedRowList[0]._replace(respondIdList=["RESPONSE_999"])
+    editedResult = buildCache.build(ParsedInputTable(parsedTable.getRowList() + editedRowList))
+    print("after edit built " + str(sorted(editedResult.getBuiltWorkspaceSet())) + " hit " + str(sorted(editedResult.getHitWorkspaceSet())))
+    assert editedResult.getBuiltWorkspaceSet() == {"Other"}
+
+    validator = InputTableValidator()
+    validator.preScanPass(ParsedInputTable(parsedTable.getRowList() + editedRowList))
+    validator.validationPass()
+    assert editedResult.getIssueSet() == validator.getIssueSet()
+
+    # rows inserted above every workspace only move them down the sheet, the cached entries are reused with their
+    # rows and issue lines rebased
+    validatorTestTable = ParsedInputTable.fromDataFrame(pd.read_excel('validator_test.xlsx'))
+    buildCache.build(validatorTestTable)
+    shiftedTable = ParsedInputTable([row._replace(rowNumber=row.rowNumber + 5) for row in validatorTestTable])
+    shiftedResult = buildCache.build(shiftedTable)
+    assert shiftedResult.getBuiltWorkspaceSet() == set()
+    shiftedValidator = InputTableValidator()
+    shiftedValidator.preScanPass(shiftedTable)
+    shiftedValidator.validationPass()
+    assert len(shiftedResult.getIssueSet()) > 0 and shiftedResult.getIssueSet() == shiftedValidator.getIssueSet()
+    assert [row.rowNumber for workspace in shiftedResult.getWorkspaceList() for row in shiftedResult.getWorkspaceBuild(workspace).getRowList()] == \
+           sorted([row.rowNumber for row in shiftedTable])
+
+    # a sheet with errors has no forest
+    try:
+        shiftedResult.getForest()
+    except Exception as e:
+        assert "has validation errors" in str(e)
+    else:
+        assert False, "forest built from a sheet with errors"
+
+    # the forest of a warm build comes from the workspace snapshots
+    shiftedTwoWorkspaceTable = ParsedInputTable([row._replace(rowNumber=row.rowNumber + 1) for row in twoWorkspaceTable])
+    shiftedTwoWorkspaceResult = buildCache.build(shiftedTwoWorkspaceTable)
+    assert shiftedTwoWorkspaceResult.getBuiltWorkspaceSet() == set()
+    twoWorkspaceForest = DialogFlowForest()
+    twoWorkspaceForest.buildForrestFromInputTable(twoWorkspaceTable)
+    assert DialogFlowDiffEngine().diff(shiftedTwoWorkspaceResult.getForest(), twoWorkspaceForest).isEmpty()
+    assert shiftedTwoWorkspaceResult.getForest().getGraph().getWorkspaceList() == ["Default", "Other"]
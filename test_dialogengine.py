@@ -0,0 +1,31 @@
+import sys
+import pandas as pd
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, WorkspaceCaseId
+from dialogengine import DialogEngine
+
+###############################################################################
+# Happy flow through the compiled dialog engine on faq.xlsx
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(parsedTable)
+
+dialogEngine = DialogEngine(dialogFlowForest)
+
+def printAction(action):
+    print(str(action.hitWorkspaceCaseId) + " responds " + str(list(action.respondIdList)) + " -> context " + str(action.nextWorkspaceCaseId) + " buttons " + str(list(action.buttonCaseIdList)))
+    if len(action.procedureAdvisoryIdList) > 0:
+        print("    procedure advisory " + str(list(action.procedureAdvisoryIdList)))
+
+# start, pick a menu, pick a leaf that jumps back to the root through 3_JUMP_TO_1
+action = dialogEngine.start("Default")
+printAction(action)
+for buttonCaseId in ["2_NODE_13", "3_LEAF_133", "3_LEAF_11"]:
+    action = dialogEngine.executeTurn(action.nextWorkspaceCaseId, buttonCaseId)
+    printAction(action)
+assert action.nextWorkspaceCaseId == WorkspaceCaseId("Default", "3_LEAF_11")
+
+# intent selecting a node directly
+action = dialogEngine.executeIntent(WorkspaceCaseId("Default", "2_NODE_12"))
+printAction(action)
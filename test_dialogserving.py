@@ -0,0 +1,82 @@
+import asyncio
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable, WorkspaceCaseId
+from dialogengine import DialogEngine
+from dialogserving import DialogSessionServer, DialogTurn, SessionContextStore
+
+###############################################################################
+# Two sessions served side by side on faq.xlsx, batched and single turn submission
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(parsedTable)
+
+def printResult(result):
+    if result.action == None:
+        print(result.sessionId + " error: " + result.error)
+    else:
+        print(result.sessionId + " " + str(result.action.hitWorkspaceCaseId) + " -> context " + str(result.action.nextWorkspaceCaseId) + " buttons " + str(list(result.action.buttonCaseIdList)))
+
+async def main():
+    server = DialogSessionServer(DialogEngine(dialogFlowForest))
+    for result in await server.startSessionBatch([("alice", "Default"), ("bob", "Default")]):
+        printResult(result)
+
+    # stored context, two turns of alice in the same batch, a button bob does not have
+    resultList = await server.executeBatch([DialogTurn("alice", None, "2_NODE_13"),
+                                            DialogTurn("bob", None, "2_NODE_12"),
+                                            DialogTurn("alice", None, "3_LEAF_133"),
+                                            DialogTurn("bob", None, "3_LEAF_133")])
+    for result in resultList:
+        printResult(result)
+    assert resultList[3].action == None
+
+    server.start()
+    resultList = await asyncio.gather(server.submitTurn(DialogTurn("alice", None, "3_LEAF_11")),
+                                      server.submitTurn(DialogTurn("bob", WorkspaceCaseId("Default", "2_NODE_12"), "3_LEAF_121")))
+    await server.stop()
+    for result in resultList:
+        printResult(result)
+
+    contextList = await server.getSessionContextStore().getContextList(["alice", "bob"])
+    assert contextList == [WorkspaceCaseId("Default", "3_LEAF_11"), WorkspaceCaseId("Default", "3_LEAF_121")]
+
+# single turns need the batch task, and stopping it fails the turns it did not get to
+async def startAndStop():
+    server = DialogSessionServer(DialogEngine(dialogFlowForest))
+    await server.startSessionBatch([("carol", "Default")])
+    try:
+        await server.submitTurn(DialogTurn("carol", None, "2_NODE_13"))
+    except Exception as e:
+        assert "not started" in str(e)
+    else:
+        assert False, "turn submitted before start()"
+
+    server.start()
+    pendingTask = asyncio.get_running_loop().create_task(server.submitTurn(DialogTurn("carol", None, "2_NODE_13")))
+    await asyncio.sleep(0)
+    await server.stop()
+    try:
+        await asyncio.wait_for(pendingTask, 1.0)
+    except asyncio.TimeoutError:
+        assert False, "pending turn never resolved after stop()"
+    except Exception as e:
+        assert "stopped" in str(e)
+    else:
+        assert False, "pending turn executed after stop()"
+
+asyncio.run(main())
+asyncio.run(startAndStop())
+
+# a store without every method is refused when it is created
+class IncompleteSessionContextStore(SessionContextStore):
+    async def getContextList(self, sessionIdList: list):
+        return [None] * len(sessionIdList)
+
+try:
+    IncompleteSessionContextStore()
+except TypeError as e:
+    assert "removeSessionList" in str(e) and "setContextDict" in str(e)
+else:
+    assert False, "incomplete session context store was created"
@@ -0,0 +1,32 @@
+import io
+import os
+import tempfile
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable, NodeToDrlRulePrinterSingleton
+
+###############################################################################
+# DRL generation on faq.xlsx: one rule per real node, per workspace files identical whether written serially or in
+# a process pool
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(parsedTable)
+
+printer = NodeToDrlRulePrinterSingleton()
+drlText = printer.renderWorkspace(dialogFlowForest, "Default")
+ruleNameList = [line for line in drlText.splitlines() if line.startswith("rule ")]
+print("\n".join(ruleNameList))
+# 3_LEAF_123 is shared by two menus and still gets a single rule, 3_JUMP_TO_1 is only reachable by a jump
+assert len(ruleNameList) == len(set(ruleNameList))
+assert "rule \"Default:3_JUMP_TO_1\"" in ruleNameList
+assert drlText.count("$dialog.responds(") == sum(1 for node in dialogFlowForest.getGraph().iterNodes("Default") if len(node.getRespondIdList()) > 0)
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as serialDirectory, tempfile.TemporaryDirectory() as parallelDirectory:
+        serialPathDict = printer.generateDrlFiles(dialogFlowForest, serialDirectory)
+        parallelPathDict = printer.generateDrlFiles(dialogFlowForest, parallelDirectory, processCount=2)
+        for workspace, filePath in serialPathDict.items():
+            with open(filePath) as serialFile, open(parallelPathDict.get(workspace)) as parallelFile:
+                assert serialFile.read() == parallelFile.read() == drlText
+            print(workspace + " -> " + os.path.basename(filePath))
@@ -0,0 +1,60 @@
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable, ParsedRow, WorkspaceCaseId
+from dialogengine import DialogEngine
+from entrypath import EntryPathTable
+from flowanalysis import DialogFlowAnalyzer
+
+###############################################################################
+# Entry paths of faq.xlsx plus a workspace with a case no path reaches
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+rowNumber = len(parsedTable) + 2
+extraRowList = [ParsedRow(rowNumber, "Other", "MIN_START", None, ["RESPONSE_1"], ["BUTTON_1"], [], ["LEAF_A"]),
+                ParsedRow(rowNumber + 1, "Other", "LEAF_A", None, ["RESPONSE_2"], [], [], []),
+                ParsedRow(rowNumber + 2, "Other", "DEAD_LEAF", None, ["RESPONSE_3"], [], [], [])]
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(ParsedInputTable(parsedTable.getRowList() + extraRowList))
+entryPathTable = EntryPathTable(dialogFlowForest)
+
+def caseIdPath(pathTuple):
+    return [workspaceCaseId.getCaseId() for workspaceCaseId in pathTuple]
+
+rootWorkspaceCaseId = WorkspaceCaseId("Default", "MIN_START")
+assert entryPathTable.getDepth(rootWorkspaceCaseId) == 0 and entryPathTable.getEntryParent(rootWorkspaceCaseId) == None
+assert entryPathTable.getEntryPath(rootWorkspaceCaseId) == (rootWorkspaceCaseId,)
+
+# 3_LEAF_123 is shared by 2_NODE_12 and 2_NODE_13, both at the same depth
+sharedWorkspaceCaseId = WorkspaceCaseId("Default", "3_LEAF_123")
+assert entryPathTable.getDepth(sharedWorkspaceCaseId) == 2
+assert caseIdPath(entryPathTable.getEntryPath(sharedWorkspaceCaseId)) == ["MIN_START", "2_NODE_12", "3_LEAF_123"]
+assert entryPathTable.getEntryButtonId(sharedWorkspaceCaseId) == "BUTTON_123"
+assert [caseIdPath(pathTuple) for pathTuple in entryPathTable.iterEntryPaths(sharedWorkspaceCaseId)] == [["MIN_START", "2_NODE_12", "3_LEAF_123"],
+                                                                                                         ["MIN_START", "2_NODE_13", "3_LEAF_123"]]
+assert len(list(entryPathTable.iterEntryPaths(sharedWorkspaceCaseId, 1))) == 1
+
+# only a jump leads to 3_JUMP_TO_1, its entry has no action button
+jumpTargetWorkspaceCaseId = WorkspaceCaseId("Default", "3_JUMP_TO_1")
+assert caseIdPath(entryPathTable.getEntryPath(jumpTargetWorkspaceCaseId)) == ["MIN_START", "2_NODE_13", "3_LEAF_133", "3_JUMP_TO_1"]
+assert entryPathTable.getEntryButtonId(jumpTargetWorkspaceCaseId) == None
+
+deadWorkspaceCaseId = WorkspaceCaseId("Other", "DEAD_LEAF")
+assert entryPathTable.hasEntry(deadWorkspaceCaseId) == False and entryPathTable.getEntryPath(deadWorkspaceCaseId) == ()
+assert list(entryPathTable.iterEntryPaths(deadWorkspaceCaseId)) == []
+
+# same depths as the analyzer, every path a chain of turns the engine can take
+report = DialogFlowAnalyzer().analyze(dialogFlowForest)
+dialogEngine = DialogEngine(dialogFlowForest)
+graph = dialogFlowForest.getGraph()
+assert len(entryPathTable) == sum([len(analysis.getDepthDict()) for analysis in report.getWorkspaceAnalysisList()])
+for analysis in report.getWorkspaceAnalysisList():
+    for workspaceCaseId, depth in analysis.getDepthDict().items():
+        assert entryPathTable.getDepth(workspaceCaseId) == depth, workspaceCaseId
+        for pathTuple in entryPathTable.iterEntryPaths(workspaceCaseId):
+            assert len(pathTuple) == depth + 1 and pathTuple[0] == graph.getRootDict().get(workspaceCaseId.getWorkspace())
+            for parent, child in zip(pathTuple, pathTuple[1:]):
+                assert child in graph.getChildren(parent) or graph.getJumpToTarget(parent) == child
+
+# an intent jump, the context is the selected node and the breadcrumb is a lookup
+action = dialogEngine.executeIntent(sharedWorkspaceCaseId)
+print(" > ".join(caseIdPath(entryPathTable.getEntryPath(action.nextWorkspaceCaseId))))
@@ -0,0 +1,48 @@
+import sys
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable, ParsedRow, WorkspaceCaseId, NodeToDrlRulePrinterSingleton
+from flowanalysis import DialogFlowAnalyzer, isJumpLoop
+
+###############################################################################
+# Flow analysis on faq.xlsx (clean) plus a workspace with dead rows and a jump loop, one without root and one with a
+# closed button cycle
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+rowNumber = len(parsedTable) + 2
+extraRowList = [ParsedRow(rowNumber, "Loop", "MIN_START", None, ["RESPONSE_1"], [], [], ["LEAF_A"]),
+                ParsedRow(rowNumber + 1, "Loop", "LEAF_A", None, ["RESPONSE_2"], [], [], []),
+                ParsedRow(rowNumber + 2, "Loop", "JUMP_B", "JUMP_C", ["RESPONSE_3"], [], [], []),
+                ParsedRow(rowNumber + 3, "Loop", "JUMP_C", "JUMP_B", ["RESPONSE_4"], [], [], []),
+                ParsedRow(rowNumber + 4, "Loop", "DEAD_MENU", None, ["RESPONSE_5"], [], [], ["DEAD_LEAF"]),
+                ParsedRow(rowNumber + 5, "Loop", "DEAD_LEAF", None, ["RESPONSE_6"], [], [], []),
+                ParsedRow(rowNumber + 6, "NoRoot", "ORPHAN", None, ["RESPONSE_7"], [], [], []),
+                # two menus only pointing at each other, the user picks every step but never gets out
+                ParsedRow(rowNumber + 7, "Menu", "MIN_START", None, ["RESPONSE_8"], [], [], ["MENU_A"]),
+                ParsedRow(rowNumber + 8, "Menu", "MENU_A", None, ["RESPONSE_9"], [], [], ["MENU_B"]),
+                ParsedRow(rowNumber + 9, "Menu", "MENU_B", None, ["RESPONSE_10"], [], [], ["MENU_A"])]
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(ParsedInputTable(parsedTable.getRowList() + extraRowList))
+
+analyzer = DialogFlowAnalyzer()
+report = analyzer.analyze(dialogFlowForest)
+report.printReport(sys.stdout)
+
+# faq.xlsx: every node reachable, 3_JUMP_TO_1 only through its jump, the loop back to MIN_START has exits
+defaultAnalysis = report.getWorkspaceAnalysis("Default")
+assert defaultAnalysis.getUnreachableList() == [] and defaultAnalysis.getTrapCycleList() == []
+assert defaultAnalysis.getDepthDict().get(WorkspaceCaseId("Default", "3_LEAF_123")) == 2
+
+assert report.getNoRootWorkspaceList() == ["NoRoot"]
+assert [str(workspaceCaseId) for workspaceCaseId in report.getWorkspaceAnalysis("Loop").getUnreachableList()] == ["Loop:JUMP_B", "Loop:JUMP_C", "Loop:DEAD_MENU", "Loop:DEAD_LEAF"]
+trapCycleList = report.getTrapCycleList()
+assert len(trapCycleList) == 1 and isJumpLoop(dialogFlowForest, trapCycleList[0])
+# the button cycle is no jump loop, it is reported apart
+assert report.getWorkspaceAnalysis("Menu").getTrapCycleList() == []
+assert report.getClosedMenuCycleList() == [[WorkspaceCaseId("Menu", "MENU_A"), WorkspaceCaseId("Menu", "MENU_B")]]
+
+prunedNodeList = analyzer.pruneUnreachable(dialogFlowForest, report)
+print("pruned " + str([node.name for node in prunedNodeList]))
+assert len(prunedNodeList) == 5
+assert analyzer.analyze(dialogFlowForest).getUnreachableList() == []
+NodeToDrlRulePrinterSingleton().printWorkspace(dialogFlowForest, "Loop", sys.stdout)
@@ -0,0 +1,82 @@
+import pandas as pd
+from anytree import PreOrderIter, SymlinkNode
+from chatdialogflow import DialogFlowForest, ParsedInputTable, ParsedRow, RowChangeSet, ButtonCaseIdListNode, LeafNode, JumpToNode, WorkspaceCaseId
+from flowanalysis import DialogFlowAnalyzer
+from parallelbuild import parallelBuild
+
+###############################################################################
+# Reverse indexes of faq.xlsx against a scan over every node, before and after an incremental edit to faq_mod.xlsx
+
+# the answers a full scan gives, as dictionaries of key and sorted list of WorkspaceCaseId strings
+def scanIndexes(forest: DialogFlowForest):
+    referrerDict, responseDict, actionButtonDict, advisoryDict = {}, {}, {}, {}
+    for root in forest.getTreeRootsList():
+        # anytree parents, SymlinkNode included
+        for node in PreOrderIter(root):
+            if node.parent != None:
+                target = node.target if isinstance(node, SymlinkNode) else node
+                referrerDict.setdefault(target.getWorkspaceCaseId(), set()).add(node.parent.getWorkspaceCaseId())
+    graph = forest.getGraph()
+    for node in graph.iterNodes():
+        workspaceCaseId = node.getWorkspaceCaseId()
+        if isinstance(node, JumpToNode):
+            referrerDict.setdefault(graph.getJumpToTarget(workspaceCaseId), set()).add(workspaceCaseId)
+        for responseId in node.getRespondIdList():
+            responseDict.setdefault(responseId, set()).add(workspaceCaseId)
+        if isinstance(node, ButtonCaseIdListNode):
+            for actionButtonId in node.getActionButtonIdList():
+                actionButtonDict.setdefault(actionButtonId, set()).add(workspaceCaseId)
+        if isinstance(node, LeafNode):
+            for procedureAdvisoryId in node.getProcedureAdvisoryIdList():
+                advisoryDict.setdefault(procedureAdvisoryId, set()).add(workspaceCaseId)
+    return [{key: sorted([str(workspaceCaseId) for workspaceCaseId in valueSet]) for key, valueSet in scanDict.items()}
+            for scanDict in [referrerDict, responseDict, actionButtonDict, advisoryDict]]
+
+def checkIndexes(forest: DialogFlowForest):
+    referrerDict, responseDict, actionButtonDict, advisoryDict = scanIndexes(forest)
+    graph = forest.getGraph()
+    for node in graph.iterNodes():
+        workspaceCaseId = node.getWorkspaceCaseId()
+        assert sorted([str(referrer) for referrer in forest.getReferrers(workspaceCaseId)]) == referrerDict.get(workspaceCaseId, []), workspaceCaseId
+    assert sorted(graph.getResponseIdList()) == sorted(responseDict.keys())
+    assert sorted(graph.getActionButtonIdList()) == sorted(actionButtonDict.keys())
+    assert sorted(graph.getAdvisoryIdList()) == sorted(advisoryDict.keys())
+    for query, scanDict in [(forest.getNodesByResponseId, responseDict), (forest.getNodesByActionButtonId, actionButtonDict),
+                            (forest.getNodesByAdvisoryId, advisoryDict)]:
+        for indexedId, workspaceCaseIdList in scanDict.items():
+            assert sorted([str(workspaceCaseId) for workspaceCaseId in query(indexedId)]) == workspaceCaseIdList, indexedId
+    assert forest.getNodesByResponseId("NO_SUCH_RESPONSE") == ()
+
+parsedTable1 = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+parsedTable2 = ParsedInputTable.fromDataFrame(pd.read_excel('faq_mod.xlsx'))
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(parsedTable1)
+checkIndexes(dialogFlowForest)
+
+# the jump of 3_JUMP_TO_1 refers to its target
+graph = dialogFlowForest.getGraph()
+jumpWorkspaceCaseId = WorkspaceCaseId("Default", "3_JUMP_TO_1")
+assert jumpWorkspaceCaseId in graph.getJumpSources(graph.getJumpToTarget(jumpWorkspaceCaseId))
+
+# advisories reachable from MIN_START: index lookup plus the analyzer's depth table
+depthDict = DialogFlowAnalyzer().analyze(dialogFlowForest).getWorkspaceAnalysis("Default").getDepthDict()
+reachableAdvisoryIdList = [procedureAdvisoryId for procedureAdvisoryId in graph.getAdvisoryIdList()
+                           if any([workspaceCaseId in depthDict for workspaceCaseId in dialogFlowForest.getNodesByAdvisoryId(procedureAdvisoryId)])]
+print("reachable advisories: " + str(reachableAdvisoryIdList))
+assert len(reachableAdvisoryIdList) > 0
+
+# kept up to date by an incremental edit, same as a full build of the edited sheet
+dialogFlowForest.applyChangeSet(RowChangeSet.fromTables(parsedTable1, parsedTable2))
+checkIndexes(dialogFlowForest)
+fullDialogFlowForest = DialogFlowForest()
+fullDialogFlowForest.buildForrestFromInputTable(parsedTable2)
+assert scanIndexes(dialogFlowForest) == scanIndexes(fullDialogFlowForest)
+
+# shards merged into one forest share the IDs of both workspaces
+rowNumber = len(parsedTable1) + 2
+extraRowList = [ParsedRow(rowNumber, "Other", "MIN_START", None, [parsedTable1.getRowList()[0].respondIdList[0]], [], [], ["LEAF_A"]),
+                ParsedRow(rowNumber + 1, "Other", "LEAF_A", None, ["RESPONSE_2"], [], [], [])]
+mergedForest, mergedValidator = parallelBuild(ParsedInputTable(parsedTable1.getRowList() + extraRowList), 1, validate=False)
+checkIndexes(mergedForest)
+assert len(set([workspaceCaseId.getWorkspace() for workspaceCaseId in mergedForest.getNodesByResponseId(extraRowList[0].respondIdList[0])])) == 2
@@ -0,0 +1,54 @@
+import io
+import sys
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable, DialogFlowDiffEngine
+from flowrender import DialogFlowRenderer
+
+###############################################################################
+# Streaming Mermaid/ASCII views of faq.xlsx: whole forest, subtree, depth limit and the faq.xlsx -> faq_mod.xlsx delta
+
+dialogFlowForest1 = DialogFlowForest()
+dialogFlowForest1.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx')))
+dialogFlowForest2 = DialogFlowForest()
+dialogFlowForest2.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(pd.read_excel('faq_mod.xlsx')))
+
+renderer = DialogFlowRenderer(dialogFlowForest1)
+renderer.printMermaid(sys.stdout)
+renderer.printAscii(sys.stdout)
+
+# every case drawn once, the shared 3_LEAF_132 and 3_LEAF_123 get an edge per parent
+mermaidLineList = list(renderer.iterMermaidLines())
+declarationList = [line for line in mermaidLineList if "[" in line]
+assert len(declarationList) == len(set(declarationList)) == 10
+assert len([line for line in mermaidLineList if "-->" in line]) == 10 and any(["-.->" in line for line in mermaidLineList])
+
+# the ASCII tree matches the anytree dump except for the repeated shared leaves and the jump
+asciiLineList = list(renderer.iterAsciiLines(workspace="Default"))
+forestStream = io.StringIO()
+dialogFlowForest1.printForest(forestStream)
+assert asciiLineList[:4] == forestStream.getvalue().splitlines()[:4]
+
+subtreeLineList = list(renderer.iterAsciiLines(workspace="Default", rootCaseId="2_NODE_12"))
+assert subtreeLineList[0] == "Default:2_NODE_12" and len(subtreeLineList) == 4
+
+depthLineList = list(renderer.iterAsciiLines(workspace="Default", maxDepth=1))
+assert depthLineList == ["Default:MIN_START", "|-- Default:3_LEAF_11", "|-- Default:2_NODE_12 (+3)", "+-- Default:2_NODE_13 (+4)"]
+assert '["Default:2_NODE_12 +3"]' in "".join(renderer.iterMermaidLines(workspace="Default", maxDepth=1))
+
+# the renderer raises a plain Exception, told apart by its message
+try:
+    list(renderer.iterMermaidLines(workspace="Default", rootCaseId="NO_SUCH_CASE"))
+except Exception as e:
+    assert "'NO_SUCH_CASE' is not defined" in str(e)
+else:
+    assert False, "undefined subtree root was rendered"
+
+# delta view: only touched cases and their ancestors
+delta = DialogFlowDiffEngine().diff(dialogFlowForest1, dialogFlowForest2)
+deltaRenderer = DialogFlowRenderer(dialogFlowForest2)
+deltaRenderer.printDeltaMermaid(sys.stdout, delta)
+deltaRenderer.printDeltaAscii(sys.stdout, delta)
+includeSet = deltaRenderer.getDeltaIncludeSet(delta)
+assert set(deltaRenderer.getDeltaClassDict(delta).keys()) <= includeSet
+assert all([parent in includeSet for workspaceCaseId in includeSet for parent in dialogFlowForest2.getGraph().getParents(workspaceCaseId)])
+assert len(includeSet) < sum([len(dialogFlowForest2.getGraph().getNodeDict(workspace)) for workspace in dialogFlowForest2.getGraph().getWorkspaceList()])
@@ -0,0 +1,65 @@
+import tempfile
+import os
+import sys
+import types
+import struct
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable, WorkspaceCaseId, DialogFlowDiffEngine
+import forestsnapshot
+from forestsnapshot import writeForestSnapshot, ForestSnapshot
+
+###############################################################################
+# Binary snapshot of the faq.xlsx forest: lookups from the mapped file, then a full round trip
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(parsedTable)
+
+with tempfile.TemporaryDirectory() as snapshotDirectory:
+    snapshotFilePath = os.path.join(snapshotDirectory, "faq.dfsnap")
+    writeForestSnapshot(dialogFlowForest, snapshotFilePath)
+    print("snapshot bytes " + str(os.path.getsize(snapshotFilePath)))
+
+    with ForestSnapshot(snapshotFilePath) as snapshot:
+        graph = dialogFlowForest.getGraph()
+        assert snapshot.getNodeCount() == len(list(graph.iterNodes()))
+        assert snapshot.getRootDict() == graph.getRootDict()
+
+        # every lookup answered from the arrays, nodes only appear when asked for
+        for node in graph.iterNodes():
+            workspaceCaseId = node.getWorkspaceCaseId()
+            assert snapshot.getChildren(workspaceCaseId) == graph.getChildren(workspaceCaseId)
+            assert snapshot.getJumpToTarget(workspaceCaseId) == graph.getJumpToTarget(workspaceCaseId)
+        assert snapshot.getNode(WorkspaceCaseId("Default", "NOT_A_CASE")) == None
+
+        node = snapshot.getNode(WorkspaceCaseId("Default", "2_NODE_13"))
+        print(node.name + " buttons " + str(list(node.getButtonCaseIdList())))
+        assert node.getFieldList() == graph.getNode(WorkspaceCaseId("Default", "2_NODE_13")).getFieldList()
+
+        snapshotForest = snapshot.toForest()
+    assert DialogFlowDiffEngine().diff(snapshotForest, dialogFlowForest).isEmpty()
+    print("snapshot round trip matches")
+
+    # the arrays are little-endian whatever the host: the string offsets start with 0 and the length of the first string
+    with open(snapshotFilePath, "rb") as snapshotFile:
+        snapshotBytes = snapshotFile.read()
+    stringOffsetsOffset = struct.unpack_from("<Q", snapshotBytes, 16)[0]
+    stringBlobOffset = struct.unpack_from("<Q", snapshotBytes, 32)[0]
+    firstStringEnd = struct.unpack_from("<I", snapshotBytes, stringOffsetsOffset + 4)[0]
+    assert struct.unpack_from("<I", snapshotBytes, stringOffsetsOffset)[0] == 0
+    assert snapshotBytes[stringBlobOffset:stringBlobOffset + firstStringEnd].decode("utf-8") in graph.getRootDict()
+
+    # a big-endian host swaps on the way out and back in
+    forestsnapshot.sys = types.SimpleNamespace(byteorder="big")
+    try:
+        swappedFilePath = os.path.join(snapshotDirectory, "swapped.dfsnap")
+        writeForestSnapshot(dialogFlowForest, swappedFilePath)
+        with open(swappedFilePath, "rb") as snapshotFile:
+            assert (snapshotFile.read() == snapshotBytes) == (sys.byteorder == "big")
+        with ForestSnapshot(swappedFilePath) as snapshot:
+            assert snapshot.getRootDict() == graph.getRootDict()
+            swappedForest = snapshot.toForest()
+        assert DialogFlowDiffEngine().diff(swappedForest, dialogFlowForest).isEmpty()
+    finally:
+        forestsnapshot.sys = sys
@@ -0,0 +1,116 @@
+import gc
+import asyncio
+import pandas as pd
+from chatdialogflow import ParsedInputTable, WorkspaceCaseId
+from dialogserving import DialogSessionServer, DialogTurn
+from hotreload import VersionedForestHolder
+
+###############################################################################
+# faq.xlsx served, faq_mod.xlsx reloaded in the background while sessions keep going, then a broken sheet that is
+# refused and a sheet without the Default workspace that drains its sessions
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+modParsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq_mod.xlsx'))
+
+def printResult(result):
+    if result.action == None:
+        print(result.sessionId + " error: " + result.error)
+    else:
+        print(result.sessionId + " " + str(result.action.hitWorkspaceCaseId) + " -> context " + str(result.action.nextWorkspaceCaseId))
+
+async def main():
+    holder = VersionedForestHolder(parsedTable)
+    firstVersion = holder.getCurrent()
+    server = DialogSessionServer(holder.getDialogEngine())
+    holder.attachSessionServer(server)
+
+    await server.startSessionBatch([("alice", "Default"), ("bob", "Default"), ("carol", "Default")])
+    for result in await server.executeBatch([DialogTurn("alice", None, "2_NODE_13"), DialogTurn("bob", None, "2_NODE_12"),
+                                             DialogTurn("carol", None, "2_NODE_13")]):
+        printResult(result)
+    await server.executeBatch([DialogTurn("carol", None, "3_LEAF_131")])
+
+    # turns keep being answered by version 1 while version 2 builds
+    reloadResultList = []
+    holder.reloadInBackground(modParsedTable, reloadResultList.append)
+    servedCount = 0
+    while len(reloadResultList) == 0:
+        result = (await server.executeBatch([DialogTurn("dave", WorkspaceCaseId("Default", "MIN_START"), "3_LEAF_11")]))[0]
+        assert result.action != None
+        servedCount += 1
+        await asyncio.sleep(0.001)
+    holder.waitForReload()
+    reloadResult = reloadResultList[0]
+    print("served %d turns during the reload, build %.4fs, swap %.6fs" % (servedCount, reloadResult.buildSeconds, reloadResult.swapSeconds))
+    assert reloadResult.version.getVersionNumber() == 2 and holder.getCurrent() is reloadResult.version
+    assert server.getDialogEngine() is reloadResult.version.getDialogEngine()
+    # the old version stays whole for whoever still holds it
+    assert firstVersion.getDialogEngine().getAction(WorkspaceCaseId("Default", "2_NODE_13")) != None
+
+    # 2_NODE_13 and 3_LEAF_131 are gone from faq_mod.xlsx, alice and carol continue from MIN_START
+    assert reloadResult.remapDict.get(WorkspaceCaseId("Default", "2_NODE_13")) == WorkspaceCaseId("Default", "MIN_START")
+    assert reloadResult.remapDict.get(WorkspaceCaseId("Default", "3_LEAF_131")) == WorkspaceCaseId("Default", "MIN_START")
+    resultList = await server.executeBatch([DialogTurn("alice", None, "2_NODE_12"), DialogTurn("bob", None, "3_LEAF_121"),
+                                            DialogTurn("carol", None, None)])
+    for result in resultList:
+        printResult(result)
+    assert all([result.action != None for result in resultList])
+    assert resultList[2].action.hitWorkspaceCaseId == WorkspaceCaseId("Default", "MIN_START")
+
+    # a sheet with errors is refused, version 2 stays
+    brokenResult = holder.reload(ParsedInputTable([row._replace(buttonCaseIdList=row.buttonCaseIdList + ["MISSING_CASE"]) for row in modParsedTable]))
+    assert brokenResult.version == None and len(brokenResult.issueList) > 0
+    assert holder.getCurrent().getVersionNumber() == 2
+
+    # J1 and J2 jump to each other, the sheet is refused with the loop as its issue and the reload thread reports it
+    loopRowList = [row._replace(buttonCaseIdList=row.buttonCaseIdList + ["J1"]) if row.caseId == "MIN_START" else row for row in modParsedTable]
+    lastRow = loopRowList[-1]
+    loopRowList.append(lastRow._replace(rowNumber=lastRow.rowNumber + 1, caseId="J1", jumpToCase="J2", buttonCaseIdList=[], actionButtonIdList=[]))
+    loopRowList.append(lastRow._replace(rowNumber=lastRow.rowNumber + 2, caseId="J2", jumpToCase="J1", buttonCaseIdList=[], actionButtonIdList=[]))
+    loopResultList = []
+    holder.reloadInBackground(ParsedInputTable(loopRowList), loopResultList.append)
+    holder.waitForReload()
+    assert len(loopResultList) == 1 and loopResultList[0].version == None
+    assert any(["loop" in issue.issue for issue in loopResultList[0].issueList])
+    assert holder.getCurrent().getVersionNumber() == 2
+
+    # without the Default workspace there is nothing to continue from, the sessions are drained
+    drainResult = holder.reload(ParsedInputTable([row._replace(workspace="Other") for row in modParsedTable]))
+    assert drainResult.version.getVersionNumber() == 3 and drainResult.remapDict.get(WorkspaceCaseId("Default", "MIN_START"), "kept") == None
+    resultList = await server.executeBatch([DialogTurn("alice", None, None)])
+    printResult(resultList[0])
+    assert resultList[0].action == None and "drained" in resultList[0].error
+    assert await server.getSessionContextStore().getContextList(["alice"]) == [None]
+
+# 3_LEAF_131 turned into a jump to MIN_START, a session idle across two reloads of that sheet still gets remapped
+async def idleAcrossTwoReloads():
+    jumpParsedTable = ParsedInputTable([row._replace(jumpToCase="MIN_START") if row.caseId == "3_LEAF_131" else row for row in parsedTable])
+    holder = VersionedForestHolder(parsedTable)
+    server = DialogSessionServer(holder.getDialogEngine())
+    holder.attachSessionServer(server)
+    await server.startSessionBatch([("erin", "Default")])
+    await server.executeBatch([DialogTurn("erin", None, "2_NODE_13")])
+    await server.executeBatch([DialogTurn("erin", None, "3_LEAF_131")])
+
+    leafWorkspaceCaseId = WorkspaceCaseId("Default", "3_LEAF_131")
+    assert holder.reload(jumpParsedTable).remapDict.get(leafWorkspaceCaseId) == WorkspaceCaseId("Default", "MIN_START")
+    assert holder.reload(jumpParsedTable).remapDict == {}
+    resultList = await server.executeBatch([DialogTurn("erin", None, "2_NODE_12")])
+    printResult(resultList[0])
+    assert resultList[0].action != None and resultList[0].action.hitWorkspaceCaseId == WorkspaceCaseId("Default", "2_NODE_12")
+
+asyncio.run(main())
+asyncio.run(idleAcrossTwoReloads())
+
+# the IDs of a version nobody holds any more leave the intern table
+internCount = len(WorkspaceCaseId._internDict)
+otherHolder = VersionedForestHolder(ParsedInputTable([row._replace(workspace="Released") for row in parsedTable]))
+assert len(WorkspaceCaseId._internDict) > internCount
+assert repr(otherHolder.getCurrent().getForest().getGraph().getRootDict().get("Released")) == "Released:MIN_START"
+del otherHolder
+gc.collect()
+assert len(WorkspaceCaseId._internDict) <= internCount
+
+# a data frame is taken as it comes, like reload() takes it
+dataFrameHolder = VersionedForestHolder(pd.read_excel('faq.xlsx'))
+assert dataFrameHolder.getCurrent().getForest().getNode(WorkspaceCaseId("Default", "2_NODE_13")) != None
@@ -0,0 +1,75 @@
+import sys
+import pandas as pd
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, ParsedRow, RowChangeSet, DialogFlowDiffEngine, WorkspaceCaseId
+
+###############################################################################
+# Incremental rebuild: start from faq.xlsx, apply the rows edited in faq_mod.xlsx, the result must match a full build
+
+parsedTable1 = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+parsedTable2 = ParsedInputTable.fromDataFrame(pd.read_excel('faq_mod.xlsx'))
+
+myValidator = InputTableValidator()
+myValidator.preScanPass(parsedTable1)
+myValidator.validationPass(parsedTable1)
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(parsedTable1)
+# projection exists before the edit, so it has to be redone for the touched workspace
+dialogFlowForest.printForest(sys.stdout)
+
+changeSet = RowChangeSet.fromTables(parsedTable1, parsedTable2)
+print("upsert rows: " + str([row.rowNumber for row in changeSet.getUpsertRowList()]))
+print("removed: " + str([str(workspaceCaseId) for workspaceCaseId in changeSet.getRemovedList()]))
+
+myValidator.applyChangeSet(parsedTable2, changeSet)
+dialogFlowForest.applyChangeSet(changeSet)
+dialogFlowForest.printForest(sys.stdout)
+
+###############################################################################
+# compare against a full rebuild of faq_mod.xlsx
+
+fullValidator = InputTableValidator()
+fullValidator.preScanPass(parsedTable2)
+fullValidator.validationPass(parsedTable2)
+
+fullDialogFlowForest = DialogFlowForest()
+fullDialogFlowForest.buildForrestFromInputTable(parsedTable2)
+
+delta = DialogFlowDiffEngine().diff(dialogFlowForest, fullDialogFlowForest)
+delta.printDelta(sys.stdout)
+assert delta.isEmpty()
+assert myValidator.getIssueSet() == fullValidator.getIssueSet()
+print("incremental forest matches full rebuild")
+
+###############################################################################
+# an add-only change set on a forest whose hashes are already cached, the diff against the old sheet must see it
+
+addedParsedTable = ParsedInputTable(parsedTable1.getRowList() + [ParsedRow(len(parsedTable1) + 2, "Default", "NEW_LEAF", None, ["RESPONSE_NEW"], [], [], [])])
+originalDialogFlowForest = DialogFlowForest()
+originalDialogFlowForest.buildForrestFromInputTable(parsedTable1)
+addedDialogFlowForest = DialogFlowForest()
+addedDialogFlowForest.buildForrestFromInputTable(parsedTable1)
+assert DialogFlowDiffEngine().diff(originalDialogFlowForest, addedDialogFlowForest).isEmpty()
+
+addedDialogFlowForest.applyChangeSet(RowChangeSet.fromTables(parsedTable1, addedParsedTable))
+assert DialogFlowDiffEngine().diff(originalDialogFlowForest, addedDialogFlowForest).getAddedList() == [WorkspaceCaseId("Default", "NEW_LEAF")]
+
+###############################################################################
+# fail-fast re-validation stops at the first broken workspace in sheet order, Zeta comes before Default here
+
+def twoWorkspaceTable(rowList):
+    zetaRowList = [row._replace(workspace="Zeta") for row in rowList]
+    return ParsedInputTable([row._replace(rowNumber=rowNumber) for rowNumber, row in enumerate(zetaRowList + rowList, 2)])
+
+brokenRowList = [row._replace(buttonCaseIdList=row.buttonCaseIdList + ["MISSING_CASE"]) if row.caseId == "MIN_START" else row for row in parsedTable1]
+failFastValidator = InputTableValidator(maxErrorCount=1)
+failFastValidator.preScanPass(twoWorkspaceTable(parsedTable1.getRowList()))
+failFastValidator.validationPass()
+assert failFastValidator.isStopped() == False
+failFastValidator.applyChangeSet(twoWorkspaceTable(brokenRowList), RowChangeSet.fromTables(twoWorkspaceTable(parsedTable1.getRowList()), twoWorkspaceTable(brokenRowList)))
+assert failFastValidator.isStopped() and [issue.workspace for issue in failFastValidator.getIssueStore()] == ["Zeta"]
+
+# once stopped, a change set leaves the validator as it is
+stoppedIssueSet = failFastValidator.getIssueSet()
+failFastValidator.applyChangeSet(twoWorkspaceTable(parsedTable1.getRowList()), RowChangeSet.fromTables(twoWorkspaceTable(brokenRowList), twoWorkspaceTable(parsedTable1.getRowList())))
+assert failFastValidator.getIssueSet() == stoppedIssueSet
@@ -0,0 +1,90 @@
+import io
+import sys
+import json
+import threading
+import tracemalloc
+import pandas as pd
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, ClonedDialogTree, DialogFlowDiffEngine, NodeToDrlRulePrinterSingleton
+from instrumentation import PipelineInstrumentationSingleton, InstrumentationSink, InMemorySink, JsonLinesSink
+
+###############################################################################
+# Stage records of the faq.xlsx pipeline, in memory and as JSON lines
+
+instrumentation = PipelineInstrumentationSingleton()
+memorySink = instrumentation.addSink(InMemorySink())
+jsonStream = io.StringIO()
+jsonSink = instrumentation.addSink(JsonLinesSink(jsonStream, {"release": "test"}))
+instrumentation.setCaptureMemory(True)
+instrumentation.setCaptureProfile(True)
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+validator = InputTableValidator()
+validator.preScanPass(parsedTable)
+validator.validationPass()
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(parsedTable)
+clonedTree = ClonedDialogTree(dialogFlowForest.getTreeRoot("Default"))
+clonedTree.markMyDelta(ClonedDialogTree(dialogFlowForest.getTreeRoot("Default")))
+DialogFlowDiffEngine().diff(dialogFlowForest, dialogFlowForest)
+NodeToDrlRulePrinterSingleton().renderWorkspace(dialogFlowForest, "Default")
+dialogFlowForest.renderWorkspaceMermaid("Default")
+
+instrumentation.removeSink(memorySink)
+instrumentation.removeSink(jsonSink)
+instrumentation.setCaptureMemory(False)
+
+for stage in ["preScanPass", "validationPass", "validateWorkspace", "buildForest", "connectParentChildren", "cloneTree", "markDelta", "diff", "renderDrl", "renderMermaid"]:
+    assert len(memorySink.getRecordList(stage)) > 0, stage
+
+buildRecord = memorySink.getRecordList("buildForest")[0]
+assert buildRecord.itemCount == len(parsedTable) and buildRecord.itemKind == "rows"
+assert buildRecord.detail.get("nodeCountByWorkspace").get("Default") > 0
+assert all([stageRecord.peakBytes != None for stageRecord in memorySink.getRecordList()])
+assert memorySink.getRecordList("connectParentChildren")[0].workspace == "Default"
+
+jsonLineList = [json.loads(line) for line in jsonStream.getvalue().splitlines()]
+assert len(jsonLineList) == len(memorySink.getRecordList()) and jsonLineList[0].get("release") == "test"
+
+for stage, (wallSeconds, itemCount, peakBytes) in memorySink.getStageSummary().items():
+    print("%-22s %8.5fs %6d items %8d bytes" % (stage, wallSeconds, itemCount, peakBytes))
+instrumentation.getProfileStats().sort_stats("cumulative").print_stats(5)
+instrumentation.setCaptureProfile(False)
+
+# nothing recorded once the sinks are gone
+validator.preScanPass(parsedTable)
+assert len(memorySink.getRecordList("preScanPass")) == 1
+
+# sinks must implement record
+try:
+    class IncompleteSink(InstrumentationSink):
+        pass
+    IncompleteSink()
+except TypeError as e:
+    assert "record" in str(e)
+else:
+    assert False
+
+# stages of concurrent threads nest on their own stacks
+threadSink = instrumentation.addSink(InMemorySink())
+instrumentation.setCaptureMemory(True)
+instrumentation.setCaptureProfile(True)
+startBarrier = threading.Barrier(4)
+def validateInThread():
+    threadValidator = InputTableValidator()
+    startBarrier.wait()
+    threadValidator.preScanPass(parsedTable)
+    threadValidator.validationPass()
+threadList = [threading.Thread(target=validateInThread) for _ in range(4)]
+for thread in threadList:
+    thread.start()
+for thread in threadList:
+    thread.join()
+instrumentation.removeSink(threadSink)
+instrumentation.setCaptureMemory(False)
+instrumentation.setCaptureProfile(False)
+
+assert len(threadSink.getRecordList("preScanPass")) == 4 and len(threadSink.getRecordList("validationPass")) == 4
+assert all([stageRecord.peakBytes != None for stageRecord in threadSink.getRecordList()])
+assert instrumentation._activeThreadCount == 0 and instrumentation._profiledThreadId == None
+assert tracemalloc.is_tracing() == False
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import subprocess
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable
+from forestsnapshot import writeForestSnapshot
+
+###############################################################################
+# A serving worker loads the faq.xlsx forest from a snapshot and answers turns without importing pandas, the anytree
+# exporters or the process pool
+
+worker_code = """
+import sys
+from chatdialogflow import WorkspaceCaseId
+from forestsnapshot import ForestSnapshot
+from dialogengine import DialogEngine
+
+with ForestSnapshot(sys.argv[1]) as snapshot:
+    dialogEngine = DialogEngine(snapshot.toForest())
+action = dialogEngine.start("Default")
+action = dialogEngine.executeTurn(action.nextWorkspaceCaseId, "2_NODE_12")
+assert action.nextWorkspaceCaseId == WorkspaceCaseId("Default", "2_NODE_12")
+print(",".join([module for module in ["pandas", "numpy", "anytree.exporter", "concurrent.futures"] if module in sys.modules]))
+"""
+
+dialogFlowForest = DialogFlowForest()
+dialogFlowForest.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx')))
+
+with tempfile.TemporaryDirectory() as snapshotDirectory:
+    snapshotFilePath = os.path.join(snapshotDirectory, "faq.dfsnap")
+    writeForestSnapshot(dialogFlowForest, snapshotFilePath)
+    completedProcess = subprocess.run([sys.executable, "-c", worker_code, snapshotFilePath], capture_output=True, text=True,
+                                      cwd=os.path.dirname(os.path.abspath(__file__)))
+    print(completedProcess.stderr)
+    assert completedProcess.returncode == 0
+    assert completedProcess.stdout.strip() == "", "runtime worker imported " + completedProcess.stdout.strip()
@@ -0,0 +1,34 @@
+import pandas as pd
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, DialogFlowDiffEngine
+from parallelbuild import parallelBuild
+
+###############################################################################
+# Sharded build of faq.xlsx plus a copy of faq_mod.xlsx in a second workspace, and sharded validation of
+# validator_test.xlsx, both must match the serial passes
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+modRowList = ParsedInputTable.fromDataFrame(pd.read_excel('faq_mod.xlsx')).getRowList()
+twoWorkspaceTable = ParsedInputTable(parsedTable.getRowList() + [row._replace(rowNumber=row.rowNumber + len(parsedTable), workspace="Other") for row in modRowList])
+
+if __name__ == "__main__":
+    serialForest = DialogFlowForest()
+    serialForest.buildForrestFromInputTable(twoWorkspaceTable)
+    serialValidator = InputTableValidator()
+    serialValidator.preScanPass(twoWorkspaceTable)
+    serialValidator.validationPass()
+
+    forest, validator = parallelBuild(twoWorkspaceTable, processCount=2)
+    print("workspaces " + str(forest.getGraph().getWorkspaceList()))
+    assert forest.getGraph().getWorkspaceList() == serialForest.getGraph().getWorkspaceList()
+    assert DialogFlowDiffEngine().diff(forest, serialForest).isEmpty()
+    assert validator.getIssueSet() == serialValidator.getIssueSet()
+
+    # validator_test.xlsx is malformed on purpose, it is only validated
+    validatorTestTable = ParsedInputTable.fromDataFrame(pd.read_excel('validator_test.xlsx'))
+    serialValidator = InputTableValidator()
+    serialValidator.preScanPass(validatorTestTable)
+    serialValidator.validationPass()
+    forest, validator = parallelBuild(validatorTestTable, processCount=2, build=False)
+    assert forest == None
+    assert validator.getIssueSet() == serialValidator.getIssueSet()
+    print("sharded build and validation match the serial passes")
@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+import pandas as pd
+from chatdialogflow import DialogFlowForest, ParsedInputTable, ParsedRow, DialogFlowDiffEngine
+from snapshotstore import SnapshotStore
+
+###############################################################################
+# Release history faq.xlsx -> faq_mod.xlsx -> faq.xlsx plus a second workspace, diffs between any two versions
+
+def buildForest(parsedTable):
+    forest = DialogFlowForest()
+    forest.buildForrestFromInputTable(parsedTable)
+    return forest
+
+parsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx'))
+modParsedTable = ParsedInputTable.fromDataFrame(pd.read_excel('faq_mod.xlsx'))
+rowNumber = len(parsedTable) + 2
+extraRowList = [ParsedRow(rowNumber, "Other", "MIN_START", None, ["RESPONSE_1"], ["BUTTON_1"], [], ["LEAF_A"]),
+                ParsedRow(rowNumber + 1, "Other", "LEAF_A", None, ["RESPONSE_2"], [], [], [])]
+
+forest1 = buildForest(parsedTable)
+forest2 = buildForest(modParsedTable)
+forest4 = buildForest(ParsedInputTable(parsedTable.getRowList() + extraRowList))
+
+with tempfile.TemporaryDirectory() as storeDirectory:
+    store = SnapshotStore(storeDirectory)
+    assert store.commit(forest1, "v1") == 1
+    objectCount = store.getObjectCount()
+    store.commit(forest2, "v2")
+    mod2ObjectCount = store.getObjectCount()
+    # the same sheet again adds no object, only the version
+    store.commit(buildForest(parsedTable), "v3")
+    assert store.getObjectCount() == mod2ObjectCount
+    store.commit(forest4, "v4")
+    print("objects %d -> %d -> %d, %d bytes" % (objectCount, mod2ObjectCount, store.getObjectCount(), store.getStoredByteCount()))
+
+    # any two versions give the same delta as diffing the forests themselves
+    for oldVersionNumber, newVersionNumber, oldForest, newForest in [(1, 2, forest1, forest2), (2, 4, forest2, forest4), (4, 1, forest4, forest1)]:
+        storedDelta = store.diff(oldVersionNumber, newVersionNumber)
+        forestDelta = DialogFlowDiffEngine().diff(oldForest, newForest)
+        assert storedDelta.getTouchedSet() == forestDelta.getTouchedSet()
+        assert storedDelta.getChangedDict() == forestDelta.getChangedDict()
+    assert store.diff(1, 3).isEmpty()
+    store.diff(1, 2).printDelta(sys.stdout)
+
+    # only the workspace that differs gets unpacked
+    oldGraph = store.getVersionGraph(3)
+    newGraph = store.getVersionGraph(4)
+    assert DialogFlowDiffEngine().diff(oldGraph, newGraph).getAddedList() != []
+    assert oldGraph.getUnpackedWorkspaceList() == [] and newGraph.getUnpackedWorkspaceList() == ["Other"]
+
+    # reopened from disk, a version comes back as a forest of its own
+    reopenedStore = SnapshotStore(storeDirectory)
+    assert reopenedStore.getVersionCount() == 4 and reopenedStore.getVersion(2).getLabel() == "v2"
+    restoredForest = reopenedStore.getForest(2)
+    assert DialogFlowDiffEngine().diff(forest2, restoredForest).isEmpty()
+    assert restoredForest.getGraph().getRootDict() == forest2.getGraph().getRootDict()
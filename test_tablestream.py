@@ -0,0 +1,48 @@
+import os
+import sqlite3
+import tempfile
+import pandas as pd
+from chatdialogflow import DialogFlowForest, InputTableValidator, ParsedInputTable, DialogFlowDiffEngine
+from tablestream import RowChunkStream, ingestRowStream
+
+###############################################################################
+# Streaming validator_test.xlsx (it has issues to compare) in chunks of 3 rows from excel, CSV and an SQLite cursor,
+# every source must give the same issues and forest as the whole sheet
+
+df = pd.read_excel('validator_test.xlsx')
+parsedTable = ParsedInputTable.fromDataFrame(df)
+
+fullValidator = InputTableValidator()
+fullValidator.preScanPass(parsedTable)
+fullValidator.validationPass()
+print("issues " + str(len(fullValidator.getIssueSet())))
+
+def checkStream(name, rowStream, buildForest = True):
+    validator = InputTableValidator()
+    forest = DialogFlowForest() if buildForest else None
+    # the sheet has reference errors, they are reported and the forest is not linked
+    assert ingestRowStream(rowStream, validator, forest) == False
+    assert validator.getIssueSet() == fullValidator.getIssueSet()
+    print(name + " issues match")
+    return forest
+
+with tempfile.TemporaryDirectory() as streamDirectory:
+    csvFilePath = os.path.join(streamDirectory, "validator_test.csv")
+    df.to_csv(csvFilePath, index=False)
+    checkStream("csv", RowChunkStream.fromCsv(csvFilePath, chunkSize=3), False)
+
+checkStream("excel", RowChunkStream.fromExcel('validator_test.xlsx', chunkSize=3))
+
+connection = sqlite3.connect(":memory:")
+connection.execute("create table faq (" + ", ".join(["c" + str(index) + " text" for index in range(len(df.columns))]) + ")")
+connection.executemany("insert into faq values (" + ", ".join(["?"] * len(df.columns)) + ")",
+                       [tuple(None if pd.isna(value) else str(value) for value in record) for record in df.itertuples(index=False)])
+checkStream("sqlite", RowChunkStream.fromCursor(connection.execute("select * from faq order by rowid"), chunkSize=3), False)
+
+# the forest can only be built from a well formed table
+forest = DialogFlowForest()
+forest.buildForrestFromInputTable(ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx')))
+streamedForest = DialogFlowForest()
+assert ingestRowStream(RowChunkStream.fromExcel('faq.xlsx', chunkSize=3), InputTableValidator(), streamedForest)
+assert DialogFlowDiffEngine().diff(streamedForest, forest).isEmpty()
+print("streamed forest matches")
@@ -3,7 +3,7 @@ import math
 import pandas as pd
 from anytree import Node, PreOrderIter, RenderTree, AsciiStyle
 from anytree.exporter import MermaidExporter
-from chatdialogflow import BaseNode, ButtonCaseIdListNode, JumpToNode, LeafNode, DialogFlowForest, WorkspaceCaseId, NodeToDrlRulePrinterSingleton, isBlank, InputTableValidator, ClonedDialogTree
+from chatdialogflow import BaseNode, ButtonCaseIdListNode, JumpToNode, LeafNode, DialogFlowForest, WorkspaceCaseId, NodeToDrlRulePrinterSingleton, isBlank, InputTableValidator, ClonedDialogTree, ParsedInputTable, DialogFlowDiffEngine
 
 myValidator1 = InputTableValidator()
 myValidator2 = InputTableValidator()
@@ -12,20 +12,23 @@ myValidator2 = InputTableValidator()
 df1 = pd.read_excel('faq.xlsx') # or read_sql()
 df2 = pd.read_excel('faq_mod.xlsx')
 
-myValidator1.preScanPass(df1)
-myValidator1.validationPass(df1)
-myValidator2.preScanPass(df2)
-myValidator2.validationPass(df2)
+parsedTable1 = ParsedInputTable.fromDataFrame(df1)
+parsedTable2 = ParsedInputTable.fromDataFrame(df2)
+
+myValidator1.preScanPass(parsedTable1)
+myValidator1.validationPass(parsedTable1)
+myValidator2.preScanPass(parsedTable2)
+myValidator2.validationPass(parsedTable2)
 
 ###############################################################################
 # main pass building tree
 # loop through the rows using iterrows()
 
 dialogFlowForest1 = DialogFlowForest()
-dialogFlowForest1.buildForrestFromInputTable(df1)
+dialogFlowForest1.buildForrestFromInputTable(parsedTable1)
 
 dialogFlowForest2 = DialogFlowForest()
-dialogFlowForest2.buildForrestFromInputTable(df2)
+dialogFlowForest2.buildForrestFromInputTable(parsedTable2)
 
 
 clonedTree1 = ClonedDialogTree(dialogFlowForest1.getTreeRootsList()[0])
@@ -45,3 +48,26 @@ with open('tree1.md', mode='w') as file_object:
 print("***********************")
 with open('tree2.md', mode='w') as file_object:
     clonedTree2.printMermaid(file_object)
+
+###############################################################################
+# structured delta from the hash based diff engine
+print("***********************")
+delta = DialogFlowDiffEngine().diff(dialogFlowForest1, dialogFlowForest2)
+delta.printDelta(sys.stdout)
+
+###############################################################################
+# MENU_A and MENU_B only point at each other, no parent-less node reaches them, an edit inside is still seen
+
+def cycleForest(menuBRespondIdList):
+    lastRow = parsedTable1.getRowList()[-1]
+    cycleRowList = [lastRow._replace(rowNumber=lastRow.rowNumber + 1, caseId="MENU_A", jumpToCase=None, respondIdList=["RESPONSE_A"], buttonCaseIdList=["MENU_B"], actionButtonIdList=[]),
+                    lastRow._replace(rowNumber=lastRow.rowNumber + 2, caseId="MENU_B", jumpToCase=None, respondIdList=menuBRespondIdList, buttonCaseIdList=["MENU_A"], actionButtonIdList=[])]
+    forest = DialogFlowForest()
+    forest.buildForrestFromInputTable(ParsedInputTable(parsedTable1.getRowList() + cycleRowList))
+    return forest
+
+cycleDelta = DialogFlowDiffEngine().diff(cycleForest(["RESPONSE_B"]), cycleForest(["RESPONSE_B_EDITED"]))
+cycleDelta.printDelta(sys.stdout)
+assert list(cycleDelta.getChangedDict().keys()) == [WorkspaceCaseId("Default", "MENU_B")]
+assert cycleDelta.getAddedList() == [] and cycleDelta.getRemovedList() == [] and len(cycleDelta.getMovedDict()) == 0
+assert DialogFlowDiffEngine().diff(cycleForest(["RESPONSE_B"]), cycleForest(["RESPONSE_B"])).isEmpty()
@@ -2,15 +2,42 @@ import sys
 import math
 import pandas as pd
 from anytree import Node, PreOrderIter
-from chatdialogflow import BaseNode, ButtonCaseIdListNode, JumpToNode, LeafNode, DialogFlowForest, WorkspaceCaseId, NodeToDrlRulePrinterSingleton, isBlank, InputTableValidator
+from chatdialogflow import BaseNode, ButtonCaseIdListNode, JumpToNode, LeafNode, DialogFlowForest, WorkspaceCaseId, NodeToDrlRulePrinterSingleton, isBlank, InputTableValidator, ParsedInputTable, severity_error, faq_column, _toColumnLetter
 
 myValidator = InputTableValidator()
 
 df = pd.read_excel('validator_test.xlsx') # or read_sql()
+parsedTable = ParsedInputTable.fromDataFrame(df)
 
-myValidator.preScanPass(df)
-myValidator.validationPass(df)
+myValidator.preScanPass(parsedTable)
+myValidator.validationPass(parsedTable)
 myIssueSet = myValidator.getIssueSet()
 
 for issue in myIssueSet:
-    print(issue)
\ No newline at end of file
+    print(issue)
+# issues indexed by cell and severity
+print("row 4:")
+for issue in myValidator.getIssueStore().getIssueList(line=4):
+    print(issue)
+assert len(myValidator.getIssueStore().getIssueList(severity=severity_error)) == len(myIssueSet)
+assert _toColumnLetter(26) == "Z" and _toColumnLetter(27) == "AA" and _toColumnLetter(faq_column.get("SET_CONTEXT_EXPRESSION")) == "P"
+
+# fail-fast stops at the first 2 errors
+failFastValidator = InputTableValidator(maxErrorCount=2)
+failFastValidator.preScanPass(parsedTable)
+failFastValidator.validationPass(parsedTable)
+print("fail-fast: " + str(sorted(failFastValidator.getIssueSet())))
+assert failFastValidator.isStopped() and len(failFastValidator.getIssueSet()) == 2
+
+# J1 and J2 jump to each other and J4 to itself, J3 only leads into the J1 loop and is fine
+faqRowList = list(ParsedInputTable.fromDataFrame(pd.read_excel('faq.xlsx')))
+lastRow = faqRowList[-1]
+loopRowList = [lastRow._replace(rowNumber=lastRow.rowNumber + offset, caseId=caseId, jumpToCase=jumpToCase, buttonCaseIdList=[], actionButtonIdList=[])
+               for offset, (caseId, jumpToCase) in enumerate([("J1", "J2"), ("J2", "J1"), ("J3", "J1"), ("J4", "J4")], 1)]
+loopValidator = InputTableValidator()
+loopValidator.preScanPass(ParsedInputTable(faqRowList + loopRowList))
+loopValidator.validationPass()
+loopIssueList = loopValidator.getIssueStore().getIssueList(column=_toColumnLetter(faq_column.get("JUMP_TO_CASE")))
+print("jump to loops: " + str([issue.issue for issue in loopIssueList]))
+assert [issue.line for issue in loopIssueList] == [loopRowList[0].rowNumber, loopRowList[1].rowNumber, loopRowList[3].rowNumber]
+assert all(["without exit" in issue.issue for issue in loopIssueList])